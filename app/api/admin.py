@@ -1,46 +1,51 @@
-from fastapi import APIRouter
-from fastapi.responses import PlainTextResponse
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, FileResponse
+from prometheus_client import CONTENT_TYPE_LATEST
 from datetime import datetime
 
 from app.schemas import HealthResponse
-from app.database import engine
-from app.config import settings
-import redis
+from app.services.health import health_monitor
+from app.utils.metrics import render_metrics
+from app.utils.profiling import list_profiles, profile_path
+from app.utils.security import verify_admin_key
+from typing import Any, Dict, List
 
 router = APIRouter()
 
 @router.get("/healthz", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint."""
-    
-    # Check database
-    db_status = "healthy"
-    try:
-        async with engine.connect() as conn:
-            await conn.execute("SELECT 1")
-    except Exception:
-        db_status = "unhealthy"
-    
-    # Check Redis
-    redis_status = "healthy"
-    try:
-        r = redis.from_url(settings.REDIS_URL)
-        r.ping()
-    except Exception:
-        redis_status = "unhealthy"
-    
-    overall_status = "healthy" if db_status == "healthy" and redis_status == "healthy" else "degraded"
+    """Health check endpoint, served from the background health monitor."""
+    health = await health_monitor.status()
     
     return HealthResponse(
-        status=overall_status,
+        status=health["status"],
         version="1.0.0",
         timestamp=datetime.utcnow(),
-        database=db_status,
-        redis=redis_status
+        checked_at=health["checked_at"],
+        database=health["database"],
+        redis=health["redis"]
     )
 
 @router.get("/metrics", response_class=PlainTextResponse)
 async def metrics():
     """Prometheus metrics endpoint."""
-    return generate_latest().decode('utf-8')
\ No newline at end of file
+    return render_metrics().decode('utf-8')
+
+@router.get("/admin/profiles")
+async def get_profiles(admin_key: str = Depends(verify_admin_key)) -> List[Dict[str, Any]]:
+    """List stored request profiles, newest first."""
+    return list_profiles()
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+    admin_key: str = Depends(verify_admin_key)
+):
+    """Download a profile as collapsed stacks (flamegraph input) or pstats."""
+    path = profile_path(profile_id, format)
+    if not path:
+        raise HTTPException(404, "Profile not found")
+    
+    media_type = "text/plain" if format == "collapsed" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=f"{profile_id}.{format}")
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.schemas import AnalyzeResponse
+from app.services.contract_analyzer import AnalysisFailedError
+from app.services.pipeline import pipeline, DocumentNotFoundError
+from app.utils.logger import logger
+from app.utils.security import verify_api_key
+
+router = APIRouter()
+
+@router.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_contract(
+    document_id: str = Query(...),
+    map_reduce: bool = Query(True, description="Analyze the whole document in concurrent section windows"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Extract fields and audit risks in a single pass over the contract.
+    
+    Uses one LLM call per document section for both, with the rules engine
+    and rule/spaCy extraction fallback alongside. Both results are persisted.
+    """
+    try:
+        result = await pipeline.analyze(document_id, map_reduce=map_reduce)
+        
+        logger.info(f"Analyzed document {document_id}: {len(result.audit.findings)} findings")
+        
+        return result
+    
+    except DocumentNotFoundError:
+        raise HTTPException(404, f"Document {document_id} not found")
+    except AnalysisFailedError as e:
+        logger.error(f"Analysis failed: {str(e)}")
+        raise HTTPException(503, f"Analysis unavailable: {str(e)}")
+    except Exception as e:
+        logger.error(f"Analysis failed: {str(e)}")
+        raise HTTPException(500, f"Analysis failed: {str(e)}")
\ No newline at end of file
@@ -1,31 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import AsyncReadSessionLocal, get_read_db
 from app.schemas import AskRequest, AskResponse
 from app.services.rag_engine import RAGEngine
 from app.utils.logger import logger
 from app.utils.security import verify_api_key
+from app.utils.singleflight import SingleFlight
 
 router = APIRouter()
 rag_engine = RAGEngine()
+singleflight = SingleFlight("ask")
 
 @router.post("/ask", response_model=AskResponse)
 async def ask_question(
     request: AskRequest,
-    db: AsyncSession = Depends(get_db),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Answer questions using RAG over uploaded documents.
+    
+    Identical questions asked concurrently share one retrieval and LLM call.
+    Retrieval reads from the replica when one is configured.
     """
     try:
-        result = await rag_engine.answer_question(
-            question=request.question,
-            document_ids=request.document_ids,
-            top_k=request.top_k,
-            db=db
+        document_ids = sorted(set(request.document_ids)) if request.document_ids else None
+        result = await singleflight.do(
+            SingleFlight.make_key("ask", request.question.strip(), document_ids, request.top_k),
+            lambda: answer_question(request.question, request.document_ids, request.top_k)
         )
         
         logger.info(f"Answered question with {len(result['citations'])} citations")
@@ -40,12 +44,23 @@ async def ask_question(
         logger.error(f"Question answering failed: {str(e)}")
         raise HTTPException(500, f"Question answering failed: {str(e)}")
 
+async def answer_question(question: str, document_ids: Optional[List[str]], top_k: int):
+    # Coalesced runs can outlive the request that started them, so they open
+    # their own session instead of borrowing the request's
+    async with AsyncReadSessionLocal() as db:
+        return await rag_engine.answer_question(
+            question=question,
+            document_ids=document_ids,
+            top_k=top_k,
+            db=db
+        )
+
 @router.get("/ask/stream")
 async def ask_question_stream(
     question: str,
     document_ids: str = None,
     top_k: int = 5,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     api_key: str = Depends(verify_api_key)
 ):
     """
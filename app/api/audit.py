@@ -1,90 +1,129 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from typing import List, Optional
+import json
 
-from app.database import get_db
-from app.schemas import AuditResponse
-from app.services.risk_analyzer import RiskAnalyzer
-from app.models import Document, AuditResult
+from app.database import get_read_db
+from app.schemas import AuditResponse, PortfolioFinding, BatchAuditRequest
+from app.services.pipeline import pipeline, DocumentNotFoundError
+from app.models import RuleFinding
 from app.utils.logger import logger
 from app.utils.security import verify_api_key
-from app.services.webhook_service import WebhookService
 
 router = APIRouter()
-risk_analyzer = RiskAnalyzer()
-webhook_service = WebhookService()
 
 @router.post("/audit", response_model=AuditResponse)
 async def audit_contract(
     document_id: str = Query(...),
     use_llm: bool = Query(True, description="Use LLM analysis in addition to rules"),
-    db: AsyncSession = Depends(get_db),
+    map_reduce: bool = Query(True, description="Analyze the whole document in concurrent section windows"),
+    from_template: bool = Query(False, description="Only analyze sections that differ from an audited near-duplicate"),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Audit contract for risky clauses and compliance issues.
     """
     try:
-        # Get document
-        result = await db.execute(
-            select(Document).where(Document.document_id == document_id)
-        )
-        document = result.scalar_one_or_none()
-        
-        if not document:
-            raise HTTPException(404, f"Document {document_id} not found")
-        
-        # Delete existing audit results
-        await db.execute(
-            select(AuditResult).where(AuditResult.document_id == document_id)
-        )
-        
-        # Run audit
-        audit_results = await risk_analyzer.analyze_risks(
-            document.text_content,
-            use_llm=use_llm
-        )
-        
-        # Store results
-        findings = []
-        for finding in audit_results["findings"]:
-            audit_result = AuditResult(
-                document_id=document_id,
-                risk_type=finding["risk_type"],
-                severity=finding["severity"],
-                description=finding["description"],
-                evidence=finding.get("evidence"),
-                page_number=finding.get("page"),
-                char_start=finding.get("char_start"),
-                char_end=finding.get("char_end"),
-                recommendations=finding.get("recommendations")
-            )
-            db.add(audit_result)
-            findings.append(finding)
-        
-        await db.commit()
-        
-        logger.info(f"Audit completed for document {document_id}: {len(findings)} findings")
-        
-        # Send webhook
-        await webhook_service.dispatch_event(
-            "audit.complete",
-            {
-                "document_id": document_id,
-                "findings_count": len(findings),
-                "risk_score": audit_results["risk_score"]
-            }
-        )
-        
-        return AuditResponse(
-            document_id=document_id,
-            findings=findings,
-            risk_score=audit_results["risk_score"],
-            summary=audit_results["summary"]
+        audit, _ = await pipeline.audit(
+            document_id, use_llm=use_llm, map_reduce=map_reduce, from_template=from_template
         )
+        return audit
     
-    except HTTPException:
-        raise
+    except DocumentNotFoundError:
+        raise HTTPException(404, f"Document {document_id} not found")
     except Exception as e:
         logger.error(f"Audit failed: {str(e)}")
-        raise HTTPException(500, f"Audit failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(500, f"Audit failed: {str(e)}")
+
+@router.get("/audit/stream")
+async def audit_contract_stream(
+    document_id: str = Query(...),
+    use_llm: bool = Query(True, description="Use LLM analysis in addition to rules"),
+    map_reduce: bool = Query(True, description="Analyze the whole document in concurrent section windows"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Audit contract with streaming findings using Server-Sent Events.
+    
+    Rule findings are sent immediately, LLM findings as each document window
+    completes, and the final score and summary last.
+    """
+    try:
+        loaded = await pipeline.load_for_audit(document_id)
+    except DocumentNotFoundError:
+        raise HTTPException(404, f"Document {document_id} not found")
+    
+    async def generate():
+        try:
+            async for event in pipeline.audit_events(loaded, use_llm=use_llm, map_reduce=map_reduce):
+                yield f"data: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logger.error(f"Audit streaming failed: {str(e)}")
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream"
+    )
+
+@router.post("/audit/batch")
+async def audit_contracts_batch(
+    request: BatchAuditRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Audit many documents, streaming one NDJSON line per document.
+    
+    LLM audits whose latest run used the current rule set and prompt are
+    skipped unless force is set.
+    """
+    document_ids = await pipeline.resolve_document_ids(request.document_ids, request.filter)
+    logger.info(f"Batch audit started for {len(document_ids)} documents")
+    
+    async def generate():
+        async for item in pipeline.run_batch(
+            document_ids,
+            lambda document_id: pipeline.audit(
+                document_id,
+                use_llm=request.use_llm,
+                map_reduce=request.map_reduce,
+                force=request.force
+            )
+        ):
+            yield json.dumps(item) + "\n"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/audit/findings", response_model=List[PortfolioFinding])
+async def list_rule_findings(
+    risk_type: Optional[str] = Query(None),
+    severity: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Query stored rule-based findings across the portfolio.
+    """
+    rule_index = pipeline.rule_index
+    query = select(RuleFinding).where(RuleFinding.ruleset_version == rule_index.version)
+    
+    if risk_type:
+        query = query.where(RuleFinding.risk_type == risk_type)
+    if severity:
+        query = query.where(RuleFinding.severity == severity)
+    
+    result = await db.execute(
+        query.order_by(RuleFinding.id).offset(offset).limit(limit)
+    )
+    
+    return [
+        PortfolioFinding(document_id=row.document_id, **rule_index.format_finding(row))
+        for row in result.scalars().all()
+    ]
\ No newline at end of file
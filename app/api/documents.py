@@ -0,0 +1,162 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.schemas import ExtractionResponse, AuditResponse, RevisionResponse, SimilarDocument, ClauseChunk
+from app.services.pipeline import pipeline, DocumentNotFoundError
+from app.services.revisions import DocumentReviser
+from app.services.clause_index import clause_index, CLAUSE_TYPES
+from app.services.file_store import FileTooLargeError
+from app.services.enrichment import enrichment_queue
+from app.utils.logger import logger
+from app.utils.security import verify_api_key
+
+router = APIRouter()
+reviser = DocumentReviser(pipeline)
+
+@router.get("/documents/{document_id}/extraction", response_model=ExtractionResponse)
+async def get_extraction(
+    document_id: str,
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Fetch the stored extraction for a document without recomputing it.
+
+    Supports If-None-Match with the returned ETag.
+    """
+    try:
+        entry = await pipeline.stored_extraction(document_id)
+    except DocumentNotFoundError:
+        raise HTTPException(404, f"Document {document_id} not found")
+
+    if not entry:
+        raise HTTPException(404, f"No extraction for document {document_id}")
+    return cached_response(request, entry)
+
+@router.get("/documents/{document_id}/audit", response_model=AuditResponse)
+async def get_audit(
+    document_id: str,
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Fetch the latest stored audit run for a document without re-running it.
+
+    Supports If-None-Match with the returned ETag.
+    """
+    try:
+        entry = await pipeline.stored_audit(document_id)
+    except DocumentNotFoundError:
+        raise HTTPException(404, f"Document {document_id} not found")
+
+    if not entry:
+        raise HTTPException(404, f"No audit for document {document_id}")
+    return cached_response(request, entry)
+
+@router.get("/documents/{document_id}/clauses", response_model=List[ClauseChunk])
+async def get_clauses(
+    document_id: str,
+    clause_type: Optional[List[str]] = Query(None, description="Clause types to return; all labelled chunks if omitted"),
+    db: AsyncSession = Depends(get_read_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    List a document's chunks by clause type (e.g. indemnity), as tagged at ingest.
+    """
+    unknown = [name for name in clause_type or [] if name not in CLAUSE_TYPES]
+    if unknown:
+        raise HTTPException(400, f"Unknown clause types: {', '.join(unknown)}")
+
+    chunks = await clause_index.chunks(db, document_id, clause_type)
+    return [
+        ClauseChunk(
+            chunk_index=chunk.chunk_index,
+            page=chunk.page_number,
+            char_start=chunk.char_start,
+            char_end=chunk.char_end,
+            clause_types=chunk.clause_labels or [],
+            text=chunk.text
+        )
+        for chunk in chunks
+    ]
+
+@router.get("/documents/{document_id}/similar", response_model=List[SimilarDocument])
+async def get_similar_documents(
+    document_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    List near-duplicates of a document, such as other contracts drafted from
+    the same template, most similar first.
+    """
+    try:
+        matches = await pipeline.similar_documents(document_id)
+    except DocumentNotFoundError:
+        raise HTTPException(404, f"Document {document_id} not found")
+
+    return [
+        SimilarDocument(document_id=match_id, similarity=similarity)
+        for match_id, similarity in matches
+    ]
+
+@router.post("/documents/{document_id}/revisions", response_model=RevisionResponse)
+async def create_revision(
+    document_id: str,
+    file: UploadFile = File(...),
+    enrich: Optional[bool] = Query(None, description="Extract and audit in the background afterwards"),
+    priority: int = Query(settings.ENRICHMENT_DEFAULT_PRIORITY, description="Enrichment priority; lower runs first"),
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Upload a revised version of a document.
+
+    Only pages whose content changed are re-chunked and re-embedded. The
+    stored extraction and audit runs are dropped, since they describe the
+    previous text.
+    """
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(400, f"Only PDF files allowed: {file.filename}")
+
+    try:
+        revision = await reviser.revise(db, document_id, file)
+    except DocumentNotFoundError:
+        raise HTTPException(404, f"Document {document_id} not found")
+    except FileTooLargeError as e:
+        raise HTTPException(413, f"{file.filename}: {str(e)}")
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Revision failed for document {document_id}: {str(e)}")
+        raise HTTPException(500, f"Revision failed: {str(e)}")
+
+    if enrich is None:
+        enrich = settings.ENRICHMENT_ENABLED
+    if enrich and revision["changed"]:
+        enrichment_queue.enqueue(document_id, priority)
+
+    return revision
+
+def cached_response(request: Request, entry: Dict[str, Any]) -> Response:
+    """JSON response with a version ETag, or 304 if the client already has it."""
+    etag = f'"{entry["version"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.RESULT_CACHE_MAX_AGE_SECONDS}"
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry["body"], headers=headers)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
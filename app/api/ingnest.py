@@ -1,25 +1,34 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 import uuid
-import os
-from pathlib import Path
 
+from app.config import settings
 from app.database import get_db
 from app.schemas import IngestResponse
 from app.services.pdf_parser import PDFParser
-from app.services.embeddings import EmbeddingService
+from app.services.file_store import file_store, FileTooLargeError
+from app.services.embeddings import get_embedding_service
+from app.services.rule_index import RuleIndex
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.clause_index import clause_index
+from app.services.enrichment import enrichment_queue
 from app.models import Document, Chunk
 from app.utils.logger import logger
+from app.utils.metrics import DOCUMENTS_INGESTED, time_stage
 from app.utils.security import verify_api_key
 
 router = APIRouter()
 pdf_parser = PDFParser()
-embedding_service = EmbeddingService()
+embedding_service = get_embedding_service()
+rule_index = RuleIndex()
+near_duplicates = NearDuplicateIndex()
 
 @router.post("/ingest", response_model=IngestResponse)
 async def ingest_documents(
     files: List[UploadFile] = File(...),
+    enrich: Optional[bool] = Query(None, description="Extract and audit in the background after ingest"),
+    priority: int = Query(settings.ENRICHMENT_DEFAULT_PRIORITY, description="Enrichment priority; lower runs first"),
     db: AsyncSession = Depends(get_db),
     api_key: str = Depends(verify_api_key)
 ):
@@ -36,27 +45,34 @@ async def ingest_documents(
             # Generate document ID
             doc_id = str(uuid.uuid4())
             
-            # Save file
-            upload_dir = Path("uploads")
-            upload_dir.mkdir(exist_ok=True)
-            file_path = upload_dir / f"{doc_id}_{file.filename}"
-            
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+            # Store file (copied in chunks and hashed on the way in)
+            try:
+                stored = await file_store.save(file.file)
+            except FileTooLargeError as e:
+                raise HTTPException(413, f"{file.filename}: {str(e)}")
             
             # Parse PDF
-            parsed_data = await pdf_parser.parse_pdf(str(file_path))
+            with file_store.open(stored) as source:
+                parsed_data = await pdf_parser.parse_pdf(source)
             
             # Create document record
             document = Document(
                 document_id=doc_id,
                 filename=file.filename,
-                file_path=str(file_path),
+                file_path=stored.path,
+                content_hash=stored.content_hash,
                 mime_type="application/pdf",
-                file_size=len(content),
+                file_size=stored.size,
                 page_count=parsed_data["page_count"],
                 text_content=parsed_data["full_text"],
+                page_offsets=[
+                    {
+                        "page_number": page["page_number"],
+                        "char_start": page["char_start"],
+                        "char_end": page["char_end"]
+                    }
+                    for page in parsed_data["pages"]
+                ],
                 metadata=parsed_data["metadata"]
             )
             db.add(document)
@@ -68,6 +84,7 @@ async def ingest_documents(
                 parsed_data["pages"]
             )
             
+            chunks = []
             for idx, chunk_data in enumerate(chunks_data):
                 embedding = await embedding_service.create_embedding(chunk_data["text"])
                 
@@ -81,11 +98,29 @@ async def ingest_documents(
                     embedding=embedding
                 )
                 db.add(chunk)
+                chunks.append(chunk)
+            
+            # Tag clause types from the embeddings just computed
+            labels = await clause_index.label_chunks([chunk.embedding for chunk in chunks])
+            for chunk, chunk_labels in zip(chunks, labels):
+                chunk.clause_labels = chunk_labels
+            
+            # Precompute rule-based findings for rules-only audits
+            await rule_index.index_document(db, document, chunks_data)
+            await near_duplicates.index_document(db, document)
             
             document_ids.append(doc_id)
             logger.info(f"Ingested document {doc_id}: {file.filename}")
         
-        await db.commit()
+        with time_stage("db_insert"):
+            await db.commit()
+        DOCUMENTS_INGESTED.inc(len(document_ids))
+        
+        if enrich is None:
+            enrich = settings.ENRICHMENT_ENABLED
+        if enrich:
+            for doc_id in document_ids:
+                enrichment_queue.enqueue(doc_id, priority)
         
         return IngestResponse(
             document_ids=document_ids,
@@ -93,6 +128,9 @@ async def ingest_documents(
             total_documents=len(document_ids)
         )
     
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         await db.rollback()
         logger.error(f"Ingestion failed: {str(e)}")
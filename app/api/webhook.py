@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timezone
 
-from app.database import get_db
-from app.schemas import WebhookCreate, WebhookResponse
-from app.models import WebhookSubscription
+from app.database import get_db, get_read_db
+from app.schemas import WebhookCreate, WebhookResponse, WebhookDeliveryResponse
+from app.models import WebhookSubscription, WebhookDelivery
+from app.services.webhook_service import webhook_service
 from app.utils.security import verify_api_key
 import secrets
 
@@ -33,6 +35,7 @@ async def create_webhook(
     db.add(subscription)
     await db.commit()
     await db.refresh(subscription)
+    await webhook_service.routes.invalidate()
     
     return WebhookResponse(
         id=subscription.id,
@@ -44,7 +47,7 @@ async def create_webhook(
 
 @router.get("/webhook/events", response_model=List[WebhookResponse])
 async def list_webhooks(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     api_key: str = Depends(verify_api_key)
 ):
     """List all webhook subscriptions."""
@@ -81,5 +84,65 @@ async def delete_webhook(
     
     await db.delete(webhook)
     await db.commit()
+    await webhook_service.routes.invalidate()
     
     return {"message": "Webhook deleted"}
+
+@router.get("/webhook/deliveries", response_model=List[WebhookDeliveryResponse])
+async def list_deliveries(
+    status: Optional[str] = Query(None, description="pending, delivered or dead"),
+    subscription_id: Optional[int] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """List webhook deliveries, newest first, e.g. dead-lettered ones."""
+    
+    query = select(WebhookDelivery)
+    if status:
+        query = query.where(WebhookDelivery.status == status)
+    if subscription_id is not None:
+        query = query.where(WebhookDelivery.subscription_id == subscription_id)
+    
+    result = await db.execute(query.order_by(WebhookDelivery.id.desc()).limit(limit))
+    
+    return [
+        WebhookDeliveryResponse(
+            id=d.id,
+            subscription_id=d.subscription_id,
+            event_id=d.event_id,
+            event_type=d.event_type,
+            status=d.status,
+            attempts=d.attempts,
+            last_error=d.last_error,
+            created_at=d.created_at,
+            delivered_at=d.delivered_at
+        )
+        for d in result.scalars().all()
+    ]
+
+@router.post("/webhook/deliveries/{delivery_id}/retry")
+async def retry_delivery(
+    delivery_id: int,
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """Requeue a dead-lettered delivery."""
+    
+    result = await db.execute(
+        select(WebhookDelivery).where(WebhookDelivery.id == delivery_id)
+    )
+    delivery = result.scalar_one_or_none()
+    
+    if not delivery:
+        raise HTTPException(404, "Delivery not found")
+    if delivery.status != "dead":
+        raise HTTPException(409, f"Delivery is {delivery.status}, only dead deliveries can be retried")
+    
+    delivery.status = "pending"
+    delivery.attempts = 0
+    delivery.next_attempt_at = datetime.now(timezone.utc)
+    await db.commit()
+    webhook_service.wake()
+    
+    return {"message": "Delivery requeued"}
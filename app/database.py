@@ -2,11 +2,31 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy.orm import declarative_base
 from app.config import settings
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True
-)
+def _create_engine(url: str):
+    connect_args = {}
+    if "+asyncpg" in url:
+        # Both asyncpg's own cache and SQLAlchemy's prepared statement cache
+        connect_args = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        }
+    
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args
+    )
+
+engine = _create_engine(settings.DATABASE_URL)
+
+# Read-only traffic goes to the replica when one is configured
+read_engine = _create_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else engine
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -14,6 +34,12 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 async def get_db():
@@ -23,8 +49,16 @@ async def get_db():
         finally:
             await session.close()
 
+async def get_read_db():
+    """Session for queries that tolerate replica lag; never write through it."""
+    async with AsyncReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
 async def init_db():
     async with engine.begin() as conn:
         # Enable pgvector extension
         await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
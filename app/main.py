@@ -2,12 +2,24 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import time
 
 from app.database import init_db
-from app.api import ingest, extract, ask, audit, webhook, admin
+from app.api import ingest, extract, ask, audit, analyze, documents, webhook, admin
+from app.services.rule_index import RuleIndex
+from app.services.enrichment import enrichment_queue
+from app.services.webhook_service import webhook_service
+from app.services.health import health_monitor
 from app.utils.logger import logger
-from app.utils.metrics import REQUEST_COUNT, REQUEST_DURATION
+from app.utils.redis_client import close_redis
+from app.utils.tracing import start_trace, export_trace
+from app.utils.profiling import RequestProfiler, should_profile, is_admin_key
+from app.utils.rate_limit import RateLimiter, retry_after_header
+from app.utils.load_shedding import load_shedder
+from app.utils.metrics import (
+    REQUEST_COUNT, REQUEST_DURATION, ACTIVE_CONNECTIONS, REQUESTS_REJECTED, route_template, mark_worker_dead
+)
 from app.config import settings
 
 @asynccontextmanager
@@ -16,9 +28,31 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Contract Intelligence API")
     await init_db()
     logger.info("Database initialized")
+    
+    rescan_task = None
+    if settings.RULE_RESCAN_INTERVAL_SECONDS > 0:
+        rescan_task = asyncio.create_task(
+            RuleIndex().run_rescan_loop(settings.RULE_RESCAN_INTERVAL_SECONDS)
+        )
+    health_task = asyncio.create_task(health_monitor.run())
+    if settings.LOAD_SHED_ENABLED:
+        load_shedder.start()
+    enrichment_queue.start()
+    routes_task = asyncio.create_task(webhook_service.routes.run())
+    if settings.WEBHOOK_DISPATCHER_ENABLED:
+        webhook_service.start()
     yield
     # Shutdown
     logger.info("Shutting down Contract Intelligence API")
+    if rescan_task:
+        rescan_task.cancel()
+    await enrichment_queue.stop()
+    routes_task.cancel()
+    await webhook_service.stop()
+    health_task.cancel()
+    await load_shedder.stop()
+    await close_redis()
+    mark_worker_dead()
 
 app = FastAPI(
     title="Contract Intelligence API",
@@ -27,35 +61,150 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Admission control: shed heavy requests while overloaded, then charge the client's bucket
+rate_limiter = RateLimiter()
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    cost = rate_limiter.cost(request.url.path)
+    if cost == 0:
+        return await call_next(request)
+    
+    if settings.LOAD_SHED_ENABLED and cost > 1:
+        reason = load_shedder.overloaded()
+        if reason:
+            REQUESTS_REJECTED.labels(reason=reason).inc()
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Server overloaded, retry shortly"},
+                headers={"Retry-After": "1"}
+            )
+    
+    if settings.RATE_LIMIT_ENABLED:
+        client = RateLimiter.client_key(
+            request.headers.get("x-api-key"),
+            request.client.host if request.client else None
+        )
+        wait = await rate_limiter.acquire(client, cost)
+        if wait > 0:
+            REQUESTS_REJECTED.labels(reason="rate_limited").inc()
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": retry_after_header(wait)}
+            )
+    
+    return await call_next(request)
 
 # Metrics middleware
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     start_time = time.time()
+    status_code = 500
+    
+    ACTIVE_CONNECTIONS.inc()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        ACTIVE_CONNECTIONS.dec()
+        
+        # Label by route template, not raw path, to keep series bounded
+        endpoint = route_template(request)
+        duration = time.time() - start_time
+        REQUEST_COUNT.labels(
+            method=request.method,
+            endpoint=endpoint,
+            status=status_code
+        ).inc()
+        REQUEST_DURATION.labels(
+            method=request.method,
+            endpoint=endpoint
+        ).observe(duration)
+    
+    return response
+
+# Tracing middleware
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    # Forced export writes every span to disk, so like X-Profile it needs the admin key
+    trace = start_trace(
+        force=settings.TRACE_HEADER_ENABLED
+        and request.headers.get("x-trace") == "1"
+        and is_admin_key(request.headers.get("x-admin-key"))
+    )
+    if trace is None:
+        return await call_next(request)
     
     response = await call_next(request)
     
-    duration = time.time() - start_time
-    REQUEST_COUNT.labels(
-        method=request.method,
-        endpoint=request.url.path,
-        status=response.status_code
-    ).inc()
-    REQUEST_DURATION.labels(
-        method=request.method,
-        endpoint=request.url.path
-    ).observe(duration)
+    # Covers the work done before the response starts; streamed bodies are exported in full
+    response.headers["Server-Timing"] = trace.server_timing()
+    if trace.sampled:
+        response.headers["X-Trace-Id"] = trace.trace_id
+        body_iterator = response.body_iterator
+        
+        async def export_after_body():
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                await export_trace(
+                    trace,
+                    method=request.method,
+                    route=route_template(request),
+                    status=response.status_code
+                )
+        
+        response.body_iterator = export_after_body()
     
     return response
 
+# Profiling middleware, only installed when enabled so it costs nothing otherwise
+if settings.PROFILING_ENABLED:
+    @app.middleware("http")
+    async def profiling_middleware(request: Request, call_next):
+        if not should_profile(request.headers, request.query_params):
+            return await call_next(request)
+        
+        profiler = RequestProfiler()
+        if not profiler.start():
+            return await call_next(request)
+        
+        start_time = time.time()
+        try:
+            response = await call_next(request)
+        except Exception:
+            profiler.stop()
+            raise
+        response.headers["X-Profile-Id"] = profiler.profile_id
+        body_iterator = response.body_iterator
+        
+        async def profile_until_body_sent():
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                profiler.stop()
+                await profiler.save(
+                    method=request.method,
+                    route=route_template(request),
+                    status=response.status_code,
+                    duration_ms=round((time.time() - start_time) * 1000, 3)
+                )
+        
+        response.body_iterator = profile_until_body_sent()
+        return response
+
+# CORS, registered last so it wraps the 429 and 503 responses from admission control
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
 # Exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -70,6 +219,8 @@ app.include_router(ingest.router, prefix="/api/v1", tags=["Ingest"])
 app.include_router(extract.router, prefix="/api/v1", tags=["Extract"])
 app.include_router(ask.router, prefix="/api/v1", tags=["Ask"])
 app.include_router(audit.router, prefix="/api/v1", tags=["Audit"])
+app.include_router(analyze.router, prefix="/api/v1", tags=["Analyze"])
+app.include_router(documents.router, prefix="/api/v1", tags=["Documents"])
 app.include_router(webhook.router, prefix="/api/v1", tags=["Webhooks"])
 app.include_router(admin.router, tags=["Admin"])
 
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Float, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
@@ -11,10 +12,15 @@ class Document(Base):
     document_id = Column(String(36), unique=True, index=True, nullable=False)
     filename = Column(String(255), nullable=False)
     file_path = Column(String(512), nullable=False)
+    content_hash = Column(String(64), index=True)  # sha256 of the uploaded file
+    revision = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on each re-upload
+    minhash = Column(JSON)  # MinHash signature of word shingles, for near-duplicate lookup
     mime_type = Column(String(100))
     file_size = Column(Integer)
     page_count = Column(Integer)
     text_content = Column(Text)
+    page_offsets = Column(JSON, default=[])  # [{"page_number", "char_start", "char_end"}]
+    ruleset_version = Column(String(50), index=True)  # Rule set used for stored rule findings
     metadata = Column(JSON, default={})
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -22,6 +28,21 @@ class Document(Base):
     chunks = relationship("Chunk", back_populates="document", cascade="all, delete-orphan")
     extractions = relationship("Extraction", back_populates="document", cascade="all, delete-orphan")
     audit_results = relationship("AuditResult", back_populates="document", cascade="all, delete-orphan")
+    audit_runs = relationship("AuditRun", back_populates="document", cascade="all, delete-orphan")
+    rule_findings = relationship("RuleFinding", back_populates="document", cascade="all, delete-orphan")
+
+class DocumentBand(Base):
+    """One LSH band of a document's MinHash signature."""
+    __tablename__ = "document_lsh_bands"
+    
+    id = Column(Integer, primary_key=True)
+    document_id = Column(String(36), ForeignKey("documents.document_id", ondelete="CASCADE"), nullable=False, index=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(String(16), nullable=False)
+    
+    __table_args__ = (
+        Index('ix_document_lsh_bands_band_bucket', 'band', 'bucket'),
+    )
 
 class Chunk(Base):
     __tablename__ = "chunks"
@@ -34,6 +55,7 @@ class Chunk(Base):
     char_start = Column(Integer)
     char_end = Column(Integer)
     embedding = Column(Vector(384))  # Dimension for all-MiniLM-L6-v2
+    clause_labels = Column(JSONB, default=[])  # Clause types, e.g. ["indemnity"]
     metadata = Column(JSON, default={})
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -41,6 +63,8 @@ class Chunk(Base):
     
     __table_args__ = (
         Index('ix_chunks_document_id', 'document_id'),
+        # Serves clause_labels @> '["<type>"]' lookups
+        Index('ix_chunks_clause_labels', 'clause_labels', postgresql_using='gin'),
     )
 
 class Extraction(Base):
@@ -64,11 +88,33 @@ class Extraction(Base):
     
     document = relationship("Document", back_populates="extractions")
 
+class AuditRun(Base):
+    __tablename__ = "audit_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String(36), unique=True, index=True, nullable=False)
+    document_id = Column(String(36), ForeignKey("documents.document_id"), nullable=False)
+    ruleset_version = Column(String(50))
+    prompt_version = Column(String(64))
+    use_llm = Column(Integer, default=1)
+    risk_score = Column(Float)
+    summary = Column(Text)
+    findings_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    document = relationship("Document", back_populates="audit_runs")
+    findings = relationship("AuditResult", back_populates="run", cascade="all, delete-orphan", passive_deletes=True)
+    
+    __table_args__ = (
+        Index('ix_audit_runs_document_id_id', 'document_id', 'id'),
+    )
+
 class AuditResult(Base):
     __tablename__ = "audit_results"
     
     id = Column(Integer, primary_key=True, index=True)
     document_id = Column(String(36), ForeignKey("documents.document_id"), nullable=False)
+    run_id = Column(String(36), ForeignKey("audit_runs.run_id", ondelete="CASCADE"), nullable=False)
     risk_type = Column(String(100), nullable=False)
     severity = Column(String(20), nullable=False)  # low, medium, high, critical
     description = Column(Text, nullable=False)
@@ -80,13 +126,72 @@ class AuditResult(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     document = relationship("Document", back_populates="audit_results")
+    run = relationship("AuditRun", back_populates="findings")
+    
+    __table_args__ = (
+        Index('ix_audit_results_document_run', 'document_id', 'run_id'),
+    )
+
+class RuleFinding(Base):
+    __tablename__ = "rule_findings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(String(36), ForeignKey("documents.document_id"), nullable=False)
+    ruleset_version = Column(String(50), nullable=False)
+    rule_id = Column(String(100), nullable=False)
+    risk_type = Column(String(100), nullable=False)
+    severity = Column(String(20), nullable=False)
+    description = Column(Text, nullable=False)
+    evidence = Column(Text)
+    page_number = Column(Integer)
+    char_start = Column(Integer)
+    char_end = Column(Integer)
+    recommendations = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    document = relationship("Document", back_populates="rule_findings")
+    
+    __table_args__ = (
+        Index('ix_rule_findings_document_version', 'document_id', 'ruleset_version'),
+        Index('ix_rule_findings_risk_type_severity', 'risk_type', 'severity'),
+    )
 
 class WebhookSubscription(Base):
     __tablename__ = "webhook_subscriptions"
     
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String(512), nullable=False)
-    event_types = Column(JSON, default=[])
+    event_types = Column(JSONB, default=[])
     active = Column(Integer, default=1)
     secret = Column(String(64))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Serves event_types @> '["<type>"]' lookups when the routing table is cold
+        Index('ix_webhook_subscriptions_event_types', 'event_types', postgresql_using='gin'),
+    )
+
+class WebhookDelivery(Base):
+    """Outbox row: one event to deliver to one subscription."""
+    __tablename__ = "webhook_deliveries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    subscription_id = Column(
+        Integer,
+        ForeignKey("webhook_subscriptions.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    event_id = Column(String(36), nullable=False)
+    event_type = Column(String(100), nullable=False)
+    payload = Column(JSON, default={})
+    status = Column(String(20), nullable=False, default="pending")  # pending, delivered, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    delivered_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index('ix_webhook_deliveries_status_next_attempt', 'status', 'next_attempt_at'),
+    )
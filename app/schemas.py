@@ -50,17 +50,68 @@ class Finding(BaseModel):
     risk_type: str
     severity: str
     description: str
-    evidence: str
+    evidence: Optional[str] = None
     page: Optional[int] = None
     char_start: Optional[int] = None
     char_end: Optional[int] = None
     recommendations: Optional[str] = None
 
+class PortfolioFinding(Finding):
+    document_id: str
+
 class AuditResponse(BaseModel):
     document_id: str
     findings: List[Finding]
     risk_score: float
     summary: str
+    run_id: Optional[str] = None
+
+# Revision schemas
+class RevisionResponse(BaseModel):
+    document_id: str
+    revision: int
+    changed: bool
+    page_count: int
+    pages_changed: int
+    chunks_reused: int
+    chunks_embedded: int
+
+class ClauseChunk(BaseModel):
+    chunk_index: int
+    page: Optional[int]
+    char_start: Optional[int]
+    char_end: Optional[int]
+    clause_types: List[str]
+    text: str
+
+class SimilarDocument(BaseModel):
+    document_id: str
+    similarity: float  # Estimated Jaccard similarity of word shingles
+
+# Analyze schemas
+class AnalyzeResponse(BaseModel):
+    document_id: str
+    extraction: ExtractionResponse
+    audit: AuditResponse
+
+# Batch schemas
+class BatchFilter(BaseModel):
+    filename_contains: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    limit: int = Field(default=1000, ge=1, le=10000)
+
+class BatchRequest(BaseModel):
+    document_ids: Optional[List[str]] = None
+    filter: Optional[BatchFilter] = None
+    force: bool = False
+
+class BatchExtractRequest(BatchRequest):
+    targeted: bool = False
+
+class BatchAuditRequest(BatchRequest):
+    use_llm: bool = True
+    map_reduce: bool = True
 
 # Webhook schemas
 class WebhookCreate(BaseModel):
@@ -75,10 +126,22 @@ class WebhookResponse(BaseModel):
     active: bool
     created_at: datetime
 
+class WebhookDeliveryResponse(BaseModel):
+    id: int
+    subscription_id: int
+    event_id: str
+    event_type: str
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    delivered_at: Optional[datetime] = None
+
 # Health schemas
 class HealthResponse(BaseModel):
     status: str
     version: str
     timestamp: datetime
+    checked_at: Optional[datetime] = None
     database: str
     redis: str
\ No newline at end of file
@@ -0,0 +1,130 @@
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert
+
+from app.config import settings
+from app.models import AuditRun, AuditResult
+from app.utils.logger import logger
+
+class AuditStore:
+    """Persists audits as versioned runs.
+    
+    Each audit writes one AuditRun and bulk-inserts its findings in the same
+    transaction; older runs beyond the retention limit are pruned.
+    """
+    
+    def __init__(self, retention: Optional[int] = None):
+        self.retention = settings.AUDIT_RUN_RETENTION if retention is None else retention
+    
+    async def save_run(
+        self,
+        db: AsyncSession,
+        document_id: str,
+        audit_results: Dict[str, Any],
+        ruleset_version: str,
+        prompt_version: Optional[str],
+        use_llm: bool = True
+    ) -> AuditRun:
+        """Record an audit run with its findings and commit."""
+        run = AuditRun(
+            run_id=str(uuid.uuid4()),
+            document_id=document_id,
+            ruleset_version=ruleset_version,
+            prompt_version=prompt_version,
+            use_llm=1 if use_llm else 0,
+            risk_score=audit_results["risk_score"],
+            summary=audit_results["summary"],
+            findings_count=len(audit_results["findings"])
+        )
+        db.add(run)
+        await db.flush()
+        
+        if audit_results["findings"]:
+            await db.execute(
+                insert(AuditResult),
+                [
+                    {
+                        "document_id": document_id,
+                        "run_id": run.run_id,
+                        "risk_type": finding["risk_type"],
+                        "severity": finding["severity"],
+                        "description": finding["description"],
+                        "evidence": finding.get("evidence"),
+                        "page_number": finding.get("page"),
+                        "char_start": finding.get("char_start"),
+                        "char_end": finding.get("char_end"),
+                        "recommendations": finding.get("recommendations")
+                    }
+                    for finding in audit_results["findings"]
+                ]
+            )
+        
+        pruned = await self._prune(db, document_id)
+        await db.commit()
+        
+        if pruned:
+            logger.info(f"Pruned {pruned} old audit runs for document {document_id}")
+        return run
+    
+    async def latest_run(
+        self,
+        db: AsyncSession,
+        document_id: str
+    ) -> Optional[Tuple[AuditRun, List[Dict[str, Any]]]]:
+        """Return the most recent run and its findings, if any."""
+        result = await db.execute(
+            select(AuditRun)
+            .where(AuditRun.document_id == document_id)
+            .order_by(AuditRun.id.desc())
+            .limit(1)
+        )
+        run = result.scalar_one_or_none()
+        if not run:
+            return None
+        
+        result = await db.execute(
+            select(AuditResult)
+            .where(AuditResult.document_id == document_id, AuditResult.run_id == run.run_id)
+            .order_by(AuditResult.id)
+        )
+        findings = [
+            {
+                "risk_type": row.risk_type,
+                "severity": row.severity,
+                "description": row.description,
+                "evidence": row.evidence,
+                "page": row.page_number,
+                "char_start": row.char_start,
+                "char_end": row.char_end,
+                "recommendations": row.recommendations
+            }
+            for row in result.scalars().all()
+        ]
+        return run, findings
+    
+    async def _prune(self, db: AsyncSession, document_id: str) -> int:
+        """Delete runs beyond the retention limit, newest kept."""
+        if self.retention <= 0:
+            return 0
+        
+        result = await db.execute(
+            select(AuditRun.run_id)
+            .where(AuditRun.document_id == document_id)
+            .order_by(AuditRun.id.desc())
+            .offset(self.retention)
+        )
+        stale_run_ids = list(result.scalars().all())
+        if not stale_run_ids:
+            return 0
+        
+        await db.execute(
+            delete(AuditResult).where(
+                AuditResult.document_id == document_id,
+                AuditResult.run_id.in_(stale_run_ids)
+            )
+        )
+        await db.execute(
+            delete(AuditRun).where(AuditRun.run_id.in_(stale_run_ids))
+        )
+        return len(stale_run_ids)
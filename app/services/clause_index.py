@@ -0,0 +1,171 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Chunk
+from app.services.embeddings import get_embedding_service
+
+# Each clause type's prototype is the mean embedding of its example sentences;
+# keywords spot the type in a question.
+CLAUSE_TYPES = {
+    "termination": {
+        "prototypes": [
+            "Either party may terminate this Agreement upon written notice.",
+            "This Agreement may be terminated for material breach that is not cured within thirty days.",
+            "Upon termination or expiration, all rights and licenses granted hereunder shall cease."
+        ],
+        "keywords": ["terminat", "cancel"]
+    },
+    "indemnity": {
+        "prototypes": [
+            "Each party shall indemnify, defend and hold harmless the other party from any third party claims.",
+            "The Supplier shall indemnify the Customer against all losses, damages, costs and expenses.",
+            "The indemnifying party shall control the defense and settlement of the claim."
+        ],
+        "keywords": ["indemn", "hold harmless"]
+    },
+    "limitation_of_liability": {
+        "prototypes": [
+            "In no event shall either party's aggregate liability exceed the fees paid in the preceding twelve months.",
+            "Neither party shall be liable for any indirect, incidental, special or consequential damages.",
+            "The total liability under this Agreement is limited to the amount paid."
+        ],
+        "keywords": ["liabilit", "liable", "damages cap"]
+    },
+    "auto_renewal": {
+        "prototypes": [
+            "This Agreement shall automatically renew for successive one-year terms.",
+            "The term renews automatically unless either party gives notice of non-renewal.",
+            "Unless terminated, the subscription will be renewed for an additional renewal term."
+        ],
+        "keywords": ["renew"]
+    },
+    "governing_law": {
+        "prototypes": [
+            "This Agreement shall be governed by and construed in accordance with the laws of the State.",
+            "The courts of the jurisdiction shall have exclusive jurisdiction over any dispute.",
+            "Any dispute arising out of this Agreement shall be finally resolved by arbitration."
+        ],
+        "keywords": ["governing law", "governed by", "jurisdiction", "venue", "arbitration"]
+    },
+    "confidentiality": {
+        "prototypes": [
+            "The receiving party shall keep the disclosing party's Confidential Information strictly confidential.",
+            "Confidential Information shall not be disclosed to any third party without prior written consent.",
+            "The obligations of confidentiality survive termination of this Agreement."
+        ],
+        "keywords": ["confidential", "non-disclosure"]
+    },
+    "payment": {
+        "prototypes": [
+            "Customer shall pay all invoices within thirty days of the invoice date.",
+            "Fees are payable monthly in advance; late payments accrue interest.",
+            "All amounts are exclusive of taxes, which are payable by the Customer."
+        ],
+        "keywords": ["payment", "invoice", "fees", "pay "]
+    },
+}
+
+def assign_clause_labels(
+    embeddings: np.ndarray,
+    prototypes: Dict[str, np.ndarray],
+    threshold: float,
+    max_labels: int
+) -> List[List[str]]:
+    """Clause types whose prototype is within threshold cosine similarity of each embedding, best first."""
+    if len(embeddings) == 0:
+        return []
+    names = list(prototypes)
+    matrix = np.stack([prototypes[name] for name in names])
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    vectors = np.asarray(embeddings, dtype=float)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    similarities = vectors @ matrix.T
+    labels = []
+    for row in similarities:
+        ranked = np.argsort(row)[::-1][:max_labels]
+        labels.append([names[index] for index in ranked if row[index] >= threshold])
+    return labels
+
+def clause_types_in_question(question: str) -> List[str]:
+    """Clause types a question mentions by keyword."""
+    question = question.lower() + " "
+    return [
+        name for name, clause in CLAUSE_TYPES.items()
+        if any(keyword in question for keyword in clause["keywords"])
+    ]
+
+def rank_with_label_boost(
+    nearest: List[Tuple[Any, float, Any]],
+    nearest_labelled: List[Tuple[Any, float, Any]],
+    top_k: int,
+    boost: float
+) -> List[Any]:
+    """Merge two nearest-neighbour lists of (chunk id, distance, row), labelled rows ranked boost closer."""
+    ranked = {chunk_id: (distance - boost, row) for chunk_id, distance, row in nearest_labelled}
+    for chunk_id, distance, row in nearest:
+        ranked.setdefault(chunk_id, (distance, row))
+    return [row for _, row in sorted(ranked.values(), key=lambda item: item[0])[:top_k]]
+
+def clause_filter(clause_types: List[str]):
+    """Chunks labelled with any of the clause types (served by the GIN index)."""
+    return or_(*[Chunk.clause_labels.contains([clause_type]) for clause_type in clause_types])
+
+class ClauseIndex:
+    """Tags chunks with clause types at ingest and looks chunks up by type.
+
+    Labels come from comparing the chunk embeddings, already computed for
+    retrieval, with one prototype embedding per clause type, so tagging costs
+    a matrix product rather than a model pass per chunk. Prototypes are
+    embedded once per process.
+    """
+
+    def __init__(self):
+        self.threshold = settings.CLAUSE_LABEL_THRESHOLD
+        self.max_labels = settings.CLAUSE_LABELS_PER_CHUNK
+        self._prototypes: Optional[Dict[str, np.ndarray]] = None
+
+    async def prototypes(self) -> Dict[str, np.ndarray]:
+        if self._prototypes is None:
+            sentences = [
+                (name, sentence)
+                for name, clause in CLAUSE_TYPES.items()
+                for sentence in clause["prototypes"]
+            ]
+            vectors = np.asarray(await get_embedding_service().create_embeddings_batch(
+                [sentence for _, sentence in sentences]
+            ))
+            self._prototypes = {
+                name: vectors[[index for index, (label, _) in enumerate(sentences) if label == name]].mean(axis=0)
+                for name in CLAUSE_TYPES
+            }
+        return self._prototypes
+
+    async def label_chunks(self, embeddings: List[List[float]]) -> List[List[str]]:
+        """Clause labels for each chunk embedding."""
+        if not embeddings:
+            return []
+        return assign_clause_labels(
+            np.asarray(embeddings), await self.prototypes(), self.threshold, self.max_labels
+        )
+
+    async def chunks(
+        self,
+        db: AsyncSession,
+        document_id: str,
+        clause_types: Optional[List[str]] = None
+    ) -> List[Chunk]:
+        """A document's chunks labelled with any of clause_types (any label if None), in order."""
+        query = select(Chunk).where(Chunk.document_id == document_id)
+        if clause_types:
+            query = query.where(clause_filter(clause_types))
+        else:
+            query = query.where(Chunk.clause_labels != [])
+        result = await db.execute(query.order_by(Chunk.chunk_index))
+        return list(result.scalars().all())
+
+clause_index = ClauseIndex()
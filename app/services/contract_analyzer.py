@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional
+
+from app.services.extractor import FieldExtractor
+from app.services.risk_analyzer import RiskAnalyzer
+
+LIST_FIELDS = ["parties", "signatories"]
+
+class AnalysisFailedError(Exception):
+    """Raised when the LLM failed on every window of a document."""
+
+class ContractAnalyzer:
+    """Single-pass extraction plus risk analysis.
+    
+    Each section window gets one LLM call that returns both the extraction
+    fields and risk findings. Rule findings and the extractor's rule/spaCy
+    fallback run alongside.
+    """
+    
+    def __init__(self, extractor: FieldExtractor, risk_analyzer: RiskAnalyzer):
+        self.extractor = extractor
+        self.risk_analyzer = risk_analyzer
+        self.prompt_version = hashlib.sha256(self._load_prompt().encode()).hexdigest()[:12]
+    
+    async def analyze(
+        self,
+        text: str,
+        pages: Optional[List[Dict[str, Any]]] = None,
+        rule_findings: Optional[List[Dict[str, Any]]] = None,
+        map_reduce: bool = True
+    ) -> Dict[str, Any]:
+        """Return {"fields": extraction fields, "audit": scored audit results, "failed_windows": count}.
+        
+        Raises AnalysisFailedError if every LLM window failed, since the
+        result would then hold only the rule and fallback output.
+        """
+        prompt_template = self._load_prompt()
+        
+        async def rule_stage():
+            if rule_findings is not None:
+                return rule_findings
+            return await asyncio.to_thread(self.risk_analyzer.rule_engine.scan_document, text, pages)
+        
+        async def llm_stage():
+            return await asyncio.gather(*[
+                self.risk_analyzer.analyze_window(
+                    text, start, end, prompt_template, pages,
+                    max_tokens=3000, operation="analysis_window"
+                )
+                for start, end in self.risk_analyzer.llm_windows(text, map_reduce)
+            ])
+        
+        rule_results, window_results = await asyncio.gather(rule_stage(), llm_stage())
+        
+        failed_windows = sum(1 for result in window_results if result.get("failed"))
+        if window_results and failed_windows == len(window_results):
+            raise AnalysisFailedError(f"LLM analysis failed for all {failed_windows} windows")
+        
+        # Fields: merge windows in document order, then the rule/spaCy fallback
+        fields = self._merge_fields([result.get("fields") or {} for result in window_results])
+        fields = self.extractor.apply_fallback_extraction(text, fields)
+        
+        llm_findings = self.risk_analyzer.merge_findings(
+            [finding for result in window_results for finding in result["findings"]]
+        )
+        
+        return {
+            "fields": fields,
+            "audit": self.risk_analyzer.summarize_findings(rule_results + llm_findings),
+            "failed_windows": failed_windows
+        }
+    
+    def _merge_fields(self, window_fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """First value found wins for scalar fields; list fields are unioned."""
+        merged: Dict[str, Any] = {}
+        for fields in window_fields:
+            for field, value in fields.items():
+                if not value:
+                    continue
+                if field in LIST_FIELDS:
+                    existing = merged.setdefault(field, [])
+                    for item in value if isinstance(value, list) else [value]:
+                        if item not in existing:
+                            existing.append(item)
+                elif field not in merged:
+                    merged[field] = value
+        return merged
+    
+    def _load_prompt(self) -> str:
+        with open("prompts/analysis_prompt.txt", "r") as f:
+            return f.read()
@@ -1,7 +1,11 @@
 from sentence_transformers import SentenceTransformer
 from typing import List
+from functools import lru_cache
+import time
 import numpy as np
 from app.config import settings
+from app.utils.metrics import EMBEDDING_DURATION, batch_size_label
+from app.utils.tracing import record_span
 
 class EmbeddingService:
     def __init__(self):
@@ -9,10 +13,23 @@ class EmbeddingService:
     
     async def create_embedding(self, text: str) -> List[float]:
         """Create embedding for text."""
+        start_time = time.perf_counter()
         embedding = self.model.encode(text, convert_to_numpy=True)
+        duration = time.perf_counter() - start_time
+        EMBEDDING_DURATION.labels(batch_size="1").observe(duration)
+        record_span("embedding", duration, batch_size=1)
         return embedding.tolist()
     
     async def create_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """Create embeddings for multiple texts."""
+        start_time = time.perf_counter()
         embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings.tolist()
\ No newline at end of file
+        duration = time.perf_counter() - start_time
+        EMBEDDING_DURATION.labels(batch_size=batch_size_label(len(texts))).observe(duration)
+        record_span("embedding", duration, batch_size=len(texts))
+        return embeddings.tolist()
+
+@lru_cache(maxsize=1)
+def get_embedding_service() -> EmbeddingService:
+    """Return the shared embedding service so the model is loaded once per process."""
+    return EmbeddingService()
@@ -0,0 +1,81 @@
+import asyncio
+import itertools
+from typing import List, Optional
+
+from app.config import settings
+from app.services.pipeline import DocumentPipeline, pipeline
+from app.utils.logger import logger
+from app.utils.metrics import ENRICHMENT_QUEUE_DEPTH
+
+class EnrichmentQueue:
+    """Background extraction and audit of newly ingested documents.
+
+    Documents are queued by priority (lower runs first, FIFO within a
+    priority) and processed by a fixed pool of workers. Each job goes through
+    the shared pipeline, so a client request for the same document coalesces
+    with the running job and webhooks are sent as usual. The queue lives in
+    process memory; jobs lost on restart are computed on first request.
+    """
+
+    def __init__(self, document_pipeline: DocumentPipeline):
+        self.pipeline = document_pipeline
+        self.workers = settings.ENRICHMENT_WORKERS
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=settings.ENRICHMENT_QUEUE_SIZE)
+        self._tasks = [
+            asyncio.create_task(self._worker(index)) for index in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} enrichment workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, document_id: str, priority: int = 0) -> bool:
+        """Queue a document for enrichment; returns False if it was not queued."""
+        if self._queue is None:
+            logger.warning(f"Enrichment workers not running, skipping document {document_id}")
+            return False
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), document_id))
+        except asyncio.QueueFull:
+            logger.warning(f"Enrichment queue full, skipping document {document_id}")
+            return False
+        ENRICHMENT_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            _, _, document_id = await self._queue.get()
+            ENRICHMENT_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                await self.enrich(document_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Enrichment worker {index} failed for document {document_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def enrich(self, document_id: str):
+        """Materialize the extraction and LLM audit unless already current."""
+        results = await asyncio.gather(
+            self.pipeline.extract(document_id, from_template=settings.TEMPLATE_REUSE_ENABLED),
+            self.pipeline.audit(document_id, force=False, from_template=settings.TEMPLATE_REUSE_ENABLED),
+            return_exceptions=True
+        )
+        for stage, result in zip(("extraction", "audit"), results):
+            if isinstance(result, Exception):
+                logger.error(f"Enrichment {stage} failed for document {document_id}: {str(result)}")
+
+        logger.info(f"Enriched document {document_id}")
+
+enrichment_queue = EnrichmentQueue(pipeline)
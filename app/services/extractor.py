@@ -1,15 +1,70 @@
 from anthropic import AsyncAnthropic
+import asyncio
 import json
 import re
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 import spacy
 
 from app.config import settings
+from app.models import Chunk
+from app.services.embeddings import get_embedding_service
+from app.services.clause_index import clause_filter
 from app.utils.logger import logger
+from app.utils.metrics import CACHE_LOOKUPS, time_stage, record_llm_call
+from app.utils.load_shedding import load_shedder
+from app.utils.tracing import span
+
+FIELD_DESCRIPTIONS = {
+    "parties": "array of party names (companies/individuals)",
+    "effective_date": 'date string (e.g., "January 1, 2024")',
+    "term": 'contract duration (e.g., "12 months", "3 years")',
+    "governing_law": 'jurisdiction (e.g., "State of California")',
+    "payment_terms": "description of payment terms",
+    "termination": "termination conditions",
+    "auto_renewal": "auto-renewal terms if any",
+    "confidentiality": "confidentiality obligations",
+    "indemnity": "indemnification clauses",
+    "liability_cap": 'object with "number" and "currency" fields',
+    "signatories": 'array of objects with "name" and "title"',
+}
+
+# Field groups for retrieval-targeted extraction: each group is answered
+# from the chunks closest to its query, searched among chunks labelled with
+# its clause types first.
+FIELD_GROUPS = {
+    "parties_dates": {
+        "fields": ["parties", "effective_date", "term"],
+        "query": "This agreement is entered into by and between the parties, effective as of the date, for a term of"
+    },
+    "payment": {
+        "fields": ["payment_terms"],
+        "clauses": ["payment"],
+        "query": "Payment terms, fees, invoices, due within days, late payment interest"
+    },
+    "termination_renewal": {
+        "fields": ["termination", "auto_renewal"],
+        "clauses": ["termination", "auto_renewal"],
+        "query": "Termination for convenience or breach, notice of termination, automatic renewal of the term"
+    },
+    "liability_indemnity": {
+        "fields": ["indemnity", "liability_cap", "confidentiality"],
+        "clauses": ["indemnity", "limitation_of_liability", "confidentiality"],
+        "query": "Indemnification, limitation of liability, aggregate liability cap, confidential information obligations"
+    },
+    "signatures": {
+        "fields": ["signatories", "governing_law"],
+        "query": "In witness whereof, signed by name and title; governed by the laws of the state"
+    },
+}
 
 class FieldExtractor:
     def __init__(self):
         self.client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.llm_semaphore = asyncio.Semaphore(settings.EXTRACTION_MAX_CONCURRENCY)
+        self._group_embeddings: Dict[str, List[float]] = {}
         try:
             self.nlp = spacy.load("en_core_web_sm")
         except:
@@ -26,11 +81,14 @@ class FieldExtractor:
         prompt = prompt_template.format(contract_text=text[:10000])  # Limit to first 10k chars
         
         # Call Claude
-        message = await self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        start_time = time.perf_counter()
+        async with load_shedder.llm_call():
+            message = await self.client.messages.create(
+                model="claude-sonnet-4-20250514",
+                max_tokens=2000,
+                messages=[{"role": "user", "content": prompt}]
+            )
+        record_llm_call("extraction", message, time.perf_counter() - start_time)
         
         response_text = message.content[0].text
         
@@ -47,11 +105,152 @@ class FieldExtractor:
             extracted = {}
         
         # Fallback extraction using rules
-        extracted = self._apply_fallback_extraction(text, extracted)
+        extracted = self.apply_fallback_extraction(text, extracted)
+        
+        return extracted
+    
+    async def retrieve_group_contexts(
+        self,
+        document_id: str,
+        db: AsyncSession,
+        changed_spans: Optional[List[Tuple[int, int]]] = None
+    ) -> Dict[str, str]:
+        """Build each field group's context from its top retrieved chunks.
+        
+        With changed_spans, only groups whose chunks overlap one of them are
+        returned; the others can be taken from a near-duplicate's extraction.
+        """
+        
+        # Retrieve the top chunks for each group (sequential: one session)
+        group_contexts = {}
+        for group_name in FIELD_GROUPS:
+            chunks = await self._retrieve_group_chunks(document_id, group_name, db)
+            if changed_spans is not None and not any(
+                chunk.char_start < end and start < chunk.char_end
+                for chunk in chunks
+                for start, end in changed_spans
+            ):
+                continue
+            if chunks:
+                group_contexts[group_name] = "\n\n".join(
+                    f"[Page {chunk.page_number}]\n{chunk.text}" for chunk in chunks
+                )
+        
+        return group_contexts
+    
+    async def extract_fields_from_contexts(
+        self,
+        text: str,
+        group_contexts: Dict[str, str],
+        inherited: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Run the per-group prompts concurrently and merge their fields.
+        
+        Fields of groups without a context are taken from inherited, if given.
+        """
+        if not group_contexts and inherited is None:
+            logger.warning("No chunks available for targeted extraction, using full extraction")
+            return await self.extract_fields(text)
+        
+        with open("prompts/extraction_group_prompt.txt", "r") as f:
+            prompt_template = f.read()
+        
+        # Issue the per-group prompts concurrently
+        with span("extraction_llm", groups=len(group_contexts)):
+            group_results = await asyncio.gather(*[
+                self._extract_group(group_name, context, prompt_template)
+                for group_name, context in group_contexts.items()
+            ])
+        
+        # Merge: each group only contributes the fields it was asked for
+        extracted = {
+            field: value
+            for group_name, group in FIELD_GROUPS.items()
+            if group_name not in group_contexts
+            for field, value in (inherited or {}).items()
+            if field in group["fields"] and value
+        }
+        for group_name, result in zip(group_contexts, group_results):
+            for field in FIELD_GROUPS[group_name]["fields"]:
+                if result.get(field):
+                    extracted[field] = result[field]
+        
+        # Fallback extraction using rules
+        extracted = self.apply_fallback_extraction(text, extracted)
         
         return extracted
     
-    def _apply_fallback_extraction(
+    async def _retrieve_group_chunks(
+        self,
+        document_id: str,
+        group_name: str,
+        db: AsyncSession
+    ) -> List[Chunk]:
+        """Return the chunks most similar to a field group's query, in document order.
+        
+        Chunks labelled with the group's clause types are searched first; all
+        chunks are searched if none are labelled.
+        """
+        if group_name in self._group_embeddings:
+            CACHE_LOOKUPS.labels(cache="query_embedding", result="hit").inc()
+        else:
+            CACHE_LOOKUPS.labels(cache="query_embedding", result="miss").inc()
+            self._group_embeddings[group_name] = await get_embedding_service().create_embedding(
+                FIELD_GROUPS[group_name]["query"]
+            )
+        
+        query = (
+            select(Chunk)
+            .where(Chunk.document_id == document_id)
+            .order_by(Chunk.embedding.cosine_distance(self._group_embeddings[group_name]))
+            .limit(settings.EXTRACTION_TOP_K_CHUNKS)
+        )
+        clause_types = FIELD_GROUPS[group_name].get("clauses")
+        with time_stage("vector_search"):
+            chunks = []
+            if clause_types:
+                result = await db.execute(query.where(clause_filter(clause_types)))
+                chunks = result.scalars().all()
+            if not chunks:
+                result = await db.execute(query)
+                chunks = result.scalars().all()
+        return sorted(chunks, key=lambda chunk: chunk.chunk_index)
+    
+    async def _extract_group(
+        self,
+        group_name: str,
+        context: str,
+        prompt_template: str
+    ) -> Dict[str, Any]:
+        """Ask the LLM for one field group."""
+        field_descriptions = "\n".join(
+            f"- {field}: {FIELD_DESCRIPTIONS[field]}"
+            for field in FIELD_GROUPS[group_name]["fields"]
+        )
+        prompt = prompt_template.format(
+            field_descriptions=field_descriptions,
+            contract_text=context
+        )
+        
+        try:
+            async with load_shedder.llm_call(), self.llm_semaphore:
+                start_time = time.perf_counter()
+                message = await self.client.messages.create(
+                    model="claude-sonnet-4-20250514",
+                    max_tokens=1000,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+                record_llm_call("extraction_group", message, time.perf_counter() - start_time)
+            
+            json_match = re.search(r'\{.*\}', message.content[0].text, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group())
+        except Exception as e:
+            logger.error(f"Extraction failed for field group {group_name}: {str(e)}")
+        
+        return {}
+    
+    def apply_fallback_extraction(
         self, 
         text: str, 
         extracted: Dict[str, Any]
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Union
+
+import zstandard
+
+from app.config import settings
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+class FileTooLargeError(Exception):
+    pass
+
+@dataclass
+class StoredFile:
+    key: str  # Store-relative object name, e.g. "ab/cd/abcd....pdf.zst"
+    path: str
+    content_hash: str  # sha256 of the original bytes
+    size: int  # Original size in bytes
+
+class FileStore:
+    """Content-addressed store for uploaded files.
+
+    Objects are named by the sha256 of their content under two levels of
+    hash-prefix directories, so identical uploads share one object and no
+    directory grows too large. Uploads are copied in chunks and hashed on the
+    way in, optionally zstd-compressed. Only save, open and key-based naming
+    are used by callers, so an object-storage backend can replace it.
+    """
+
+    def __init__(self, root: str = None, compress: bool = None):
+        self.root = root or settings.UPLOAD_DIR
+        self.compress = settings.UPLOAD_COMPRESSION if compress is None else compress
+        self.max_size = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+    async def save(self, source: BinaryIO, extension: str = "pdf") -> StoredFile:
+        """Store the contents of a readable binary file object."""
+        return await asyncio.to_thread(self._save, source, extension)
+
+    @contextmanager
+    def open(self, stored: StoredFile) -> Iterator[Union[str, bytes]]:
+        """The object as a local path, or as bytes when compressed at rest."""
+        if stored.key.endswith(".zst"):
+            with open(stored.path, "rb") as f:
+                yield zstandard.ZstdDecompressor().stream_reader(f).read()
+        else:
+            yield stored.path
+
+    def _save(self, source: BinaryIO, extension: str) -> StoredFile:
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                writer = zstandard.ZstdCompressor(level=settings.UPLOAD_COMPRESSION_LEVEL).stream_writer(
+                    raw, closefd=False
+                ) if self.compress else raw
+                while True:
+                    chunk = source.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise FileTooLargeError(f"File exceeds {settings.MAX_UPLOAD_SIZE_MB} MB")
+                    digest.update(chunk)
+                    writer.write(chunk)
+                if self.compress:
+                    writer.close()
+
+            content_hash = digest.hexdigest()
+            key = self._key(content_hash, extension)
+            path = os.path.join(self.root, key)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return StoredFile(key=key, path=path, content_hash=content_hash, size=size)
+
+    def _key(self, content_hash: str, extension: str) -> str:
+        name = f"{content_hash}.{extension}" + (".zst" if self.compress else "")
+        return os.path.join(content_hash[:2], content_hash[2:4], name)
+
+file_store = FileStore()
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.utils.logger import logger
+from app.utils.redis_client import get_redis
+
+class HealthMonitor:
+    """Dependency health checked in the background.
+
+    Probes read the last result instead of touching the database and Redis
+    themselves, so they return immediately however often they arrive. Each
+    check has a timeout; a result older than a few intervals (the refresher
+    has stalled) is reported as unknown.
+    """
+
+    def __init__(self):
+        self.interval = settings.HEALTH_CHECK_INTERVAL_SECONDS
+        self.timeout = settings.HEALTH_CHECK_TIMEOUT_SECONDS
+        self.checks: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "database": self._check_database,
+            "redis": self._check_redis
+        }
+        self._status: Dict[str, str] = {}
+        self._checked_at: Optional[datetime] = None
+        self._refreshed: float = 0.0
+        self._refresh_lock = asyncio.Lock()
+
+    async def status(self) -> Dict[str, Any]:
+        """Last known status of every dependency; checks once if none is known yet."""
+        if self._checked_at is None:
+            async with self._refresh_lock:
+                if self._checked_at is None:
+                    await self.refresh()
+
+        components = dict(self._status)
+        if time.monotonic() - self._refreshed > self.interval * 3:
+            components = {name: "unknown" for name in components}
+        healthy = all(state == "healthy" for state in components.values())
+        return {
+            "status": "healthy" if healthy else "degraded",
+            "checked_at": self._checked_at,
+            **components
+        }
+
+    async def refresh(self):
+        results = await asyncio.gather(*(self._run_check(check) for check in self.checks.values()))
+        self._status = dict(zip(self.checks, results))
+        self._checked_at = datetime.utcnow()
+        self._refreshed = time.monotonic()
+
+    async def run(self):
+        """Background job: refresh the cached status every interval."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health check refresh failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def _run_check(self, check: Callable[[], Awaitable[Any]]) -> str:
+        try:
+            await asyncio.wait_for(check(), timeout=self.timeout)
+            return "healthy"
+        except Exception:
+            return "unhealthy"
+
+    async def _check_database(self):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _check_redis(self):
+        await get_redis().ping()
+
+health_monitor = HealthMonitor()
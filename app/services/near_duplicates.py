@@ -0,0 +1,158 @@
+import hashlib
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, delete, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Document, DocumentBand
+from app.services.risk_analyzer import SECTION_BOUNDARY_PATTERN
+
+# Changing any of these changes every signature; re-index documents afterwards
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32  # 4 rows per band: pairs above ~0.45 Jaccard usually share a bucket
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_permutations = np.random.RandomState(1)
+_A = _permutations.randint(1, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+_B = _permutations.randint(0, (1 << 61) - 1, NUM_PERM, dtype=np.uint64)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """MinHash of the text's word shingles; None if it is too short to shingle."""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return None
+
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "big") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    # Universal hashing per permutation; uint64 products wrap, as intended
+    with np.errstate(over="ignore"):
+        permuted = ((hashes[:, None] * _A + _B) % _MERSENNE_PRIME) & _MAX_HASH
+    return permuted.min(axis=0).tolist()
+
+def lsh_buckets(signature: List[int]) -> List[str]:
+    """One bucket key per band of the signature."""
+    return [
+        hashlib.blake2b(
+            np.array(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND], dtype=np.uint64).tobytes(),
+            digest_size=8
+        ).hexdigest()
+        for band in range(BANDS)
+    ]
+
+def estimated_similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two documents' shingle sets."""
+    return float(np.mean(np.array(a) == np.array(b)))
+
+def section_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of each article or section, split at the same headings as audit windows."""
+    boundaries = [0] + [
+        m.start() for m in SECTION_BOUNDARY_PATTERN.finditer(text) if m.start() > 0
+    ] + [len(text)]
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+def diff_sections(
+    template_text: str,
+    text: str
+) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int]]]:
+    """Split text into sections shared with a template and sections that differ.
+
+    Sections match when their whitespace- and case-normalized text is equal.
+    Returns shared (start, end, shift) where shift maps template offsets to
+    text offsets, and the differing (start, end) spans with neighbours merged.
+    """
+    def normalized(source: str, start: int, end: int) -> str:
+        return " ".join(source[start:end].lower().split())
+
+    template_sections = {}
+    for start, end in section_spans(template_text):
+        template_sections.setdefault(normalized(template_text, start, end), []).append(start)
+
+    shared: List[Tuple[int, int, int]] = []
+    differing: List[Tuple[int, int]] = []
+    for start, end in section_spans(text):
+        key = normalized(text, start, end)
+        if key and template_sections.get(key):
+            shared.append((start, end, start - template_sections[key].pop(0)))
+        elif not key:
+            continue
+        elif differing and differing[-1][1] == start:
+            differing[-1] = (differing[-1][0], end)
+        else:
+            differing.append((start, end))
+    return shared, differing
+
+def changed_ratio(text: str, differing: List[Tuple[int, int]]) -> float:
+    return sum(end - start for start, end in differing) / max(len(text), 1)
+
+def shift_span(shared: List[Tuple[int, int, int]], start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Map a template span into the text if it lies within one shared section."""
+    for section_start, section_end, shift in shared:
+        if section_start - shift <= start and end <= section_end - shift:
+            return start + shift, end + shift
+    return None
+
+class NearDuplicateIndex:
+    """MinHash signatures with a banded LSH index in the database.
+
+    Each document's signature is split into bands whose hashes are stored as
+    (band, bucket) rows; documents sharing any bucket are candidates, and
+    candidates are confirmed by comparing full signatures.
+    """
+
+    def __init__(self):
+        self.threshold = settings.NEAR_DUPLICATE_THRESHOLD
+
+    async def index_document(self, db: AsyncSession, document: Document):
+        """Compute and store a document's signature and buckets; the caller commits."""
+        signature = minhash_signature(document.text_content or "")
+        document.minhash = signature
+        await db.execute(delete(DocumentBand).where(DocumentBand.document_id == document.document_id))
+        if signature:
+            db.add_all([
+                DocumentBand(document_id=document.document_id, band=band, bucket=bucket)
+                for band, bucket in enumerate(lsh_buckets(signature))
+            ])
+
+    async def similar(
+        self,
+        db: AsyncSession,
+        document: Document,
+        limit: int = 10
+    ) -> List[Tuple[str, float]]:
+        """Near-duplicates of a document as (document_id, similarity), most similar first."""
+        if not document.minhash:
+            return []
+
+        buckets = list(enumerate(lsh_buckets(document.minhash)))
+        result = await db.execute(
+            select(Document.document_id, Document.minhash)
+            .where(
+                Document.document_id.in_(
+                    select(DocumentBand.document_id)
+                    .where(tuple_(DocumentBand.band, DocumentBand.bucket).in_(buckets))
+                ),
+                Document.document_id != document.document_id
+            )
+        )
+
+        matches = []
+        for document_id, signature in result.all():
+            if not signature:
+                continue
+            similarity = estimated_similarity(document.minhash, signature)
+            if similarity >= self.threshold:
+                matches.append((document_id, round(similarity, 3)))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:limit]
@@ -1,38 +1,50 @@
 import fitz  # PyMuPDF
-from typing import List, Dict, Any
+import bisect
+import re
+from typing import List, Dict, Any, Union
 from app.config import settings
+from app.utils.metrics import time_stage
+
+WORD_PATTERN = re.compile(r'\S+')
 
 class PDFParser:
     def __init__(self):
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = settings.CHUNK_OVERLAP
     
-    async def parse_pdf(self, file_path: str) -> Dict[str, Any]:
-        """Extract text and metadata from PDF."""
-        doc = fitz.open(file_path)
-        
-        pages = []
-        full_text = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            text = page.get_text()
-            pages.append({
-                "page_number": page_num + 1,
-                "text": text,
-                "char_start": len("".join(full_text)),
-                "char_end": len("".join(full_text)) + len(text)
-            })
-            full_text.append(text)
-        
-        metadata = {
-            "author": doc.metadata.get("author", ""),
-            "title": doc.metadata.get("title", ""),
-            "subject": doc.metadata.get("subject", ""),
-            "creator": doc.metadata.get("creator", "")
-        }
-        
-        doc.close()
+    async def parse_pdf(self, source: Union[str, bytes]) -> Dict[str, Any]:
+        """Extract text and metadata from a PDF given as a path or in memory."""
+        with time_stage("pdf_parse"):
+            if isinstance(source, str):
+                doc = fitz.open(source)
+            else:
+                doc = fitz.open(stream=source, filetype="pdf")
+            
+            pages = []
+            full_text = []
+            offset = 0
+            
+            for page_num in range(len(doc)):
+                page = doc[page_num]
+                text = page.get_text()
+                # Offsets index into the "\n"-joined full text
+                pages.append({
+                    "page_number": page_num + 1,
+                    "text": text,
+                    "char_start": offset,
+                    "char_end": offset + len(text)
+                })
+                full_text.append(text)
+                offset += len(text) + 1
+            
+            metadata = {
+                "author": doc.metadata.get("author", ""),
+                "title": doc.metadata.get("title", ""),
+                "subject": doc.metadata.get("subject", ""),
+                "creator": doc.metadata.get("creator", "")
+            }
+            
+            doc.close()
         
         return {
             "full_text": "\n".join(full_text),
@@ -46,38 +58,38 @@ class PDFParser:
         text: str, 
         pages: List[Dict]
     ) -> List[Dict[str, Any]]:
-        """Split text into overlapping chunks."""
-        chunks = []
-        words = text.split()
-        
-        current_pos = 0
-        chunk_idx = 0
+        """Split text into overlapping chunks.
         
-        while current_pos < len(words):
-            # Get chunk
-            chunk_words = words[current_pos:current_pos + self.chunk_size]
-            chunk_text = " ".join(chunk_words)
-            
-            # Find page number for this chunk
-            char_start = len(" ".join(words[:current_pos]))
-            char_end = char_start + len(chunk_text)
+        Chunk text is whitespace-normalized; char_start/char_end index into
+        the original text.
+        """
+        with time_stage("chunking"):
+            chunks = []
+            words = list(WORD_PATTERN.finditer(text))
+            page_starts = [page["char_start"] for page in pages]
             
-            page_num = 1
-            for page in pages:
-                if char_start >= page["char_start"] and char_start < page["char_end"]:
-                    page_num = page["page_number"]
-                    break
+            current_pos = 0
+            chunk_idx = 0
             
-            chunks.append({
-                "text": chunk_text,
-                "page": page_num,
-                "char_start": char_start,
-                "char_end": char_end
-            })
-            
-            # Move forward
-            current_pos += self.chunk_size - self.chunk_overlap
-            chunk_idx += 1
+            while current_pos < len(words):
+                chunks.append(
+                    self.make_chunk(words[current_pos:current_pos + self.chunk_size], pages, page_starts)
+                )
+                
+                # Move forward
+                current_pos += self.chunk_size - self.chunk_overlap
+                chunk_idx += 1
         
         return chunks
-
+    
+    def make_chunk(self, chunk_words: List[re.Match], pages: List[Dict], page_starts: List[int]) -> Dict[str, Any]:
+        """Chunk dict for a run of word matches, attributed to the page it starts on."""
+        char_start = chunk_words[0].start()
+        page_idx = bisect.bisect_right(page_starts, char_start) - 1
+        
+        return {
+            "text": " ".join(word.group() for word in chunk_words),
+            "page": pages[page_idx]["page_number"] if page_idx >= 0 else 1,
+            "char_start": char_start,
+            "char_end": chunk_words[-1].end()
+        }
@@ -0,0 +1,602 @@
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple, AsyncGenerator, Callable, Awaitable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Document, Extraction
+from app.schemas import ExtractionResponse, AuditResponse, AnalyzeResponse, BatchFilter
+from app.services.extractor import FieldExtractor
+from app.services.risk_analyzer import RiskAnalyzer
+from app.services.contract_analyzer import ContractAnalyzer
+from app.services.rule_index import RuleIndex
+from app.services.audit_store import AuditStore
+from app.services.result_cache import ResultCache
+from app.services.near_duplicates import NearDuplicateIndex, diff_sections, changed_ratio, shift_span
+from app.services.webhook_service import webhook_service
+from app.utils.logger import logger
+from app.utils.metrics import EXTRACTIONS_COMPLETED, AUDITS_COMPLETED, CACHE_LOOKUPS, time_stage
+from app.utils.singleflight import SingleFlight
+from app.utils.tracing import span
+
+class DocumentNotFoundError(Exception):
+    """Raised when a document id does not exist."""
+
+class DocumentPipeline:
+    """Extraction and audit of stored documents.
+    
+    Every step reads and writes through short-lived sessions, so no database
+    connection is held while waiting on the LLM. Single-document endpoints,
+    batch endpoints and background jobs all share this path, and identical
+    concurrent requests are coalesced onto one run.
+    """
+    
+    def __init__(self):
+        self.extractor = FieldExtractor()
+        self.risk_analyzer = RiskAnalyzer()
+        self.rule_index = RuleIndex()
+        self.audit_store = AuditStore()
+        self.webhook_service = webhook_service
+        self.contract_analyzer = ContractAnalyzer(self.extractor, self.risk_analyzer)
+        self.singleflight = SingleFlight("pipeline")
+        self.result_cache = ResultCache()
+        self.near_duplicates = NearDuplicateIndex()
+    
+    async def extract(
+        self,
+        document_id: str,
+        targeted: bool = False,
+        force: bool = False,
+        from_template: bool = False
+    ) -> Tuple[ExtractionResponse, bool]:
+        """Extract fields for a document.
+        
+        Returns the extraction and whether it was newly computed; an existing
+        extraction is returned as-is unless force is set. With from_template,
+        field groups found only in sections shared with an extracted
+        near-duplicate are copied from it instead of asking the LLM.
+        """
+        return await self.singleflight.do(
+            SingleFlight.make_key("extract", document_id, targeted, force, from_template),
+            lambda: self._extract(document_id, targeted, force, from_template),
+            encode=_encode_result,
+            decode=lambda data: (ExtractionResponse.model_validate(data[0]), data[1])
+        )
+    
+    async def _extract(
+        self,
+        document_id: str,
+        targeted: bool,
+        force: bool,
+        from_template: bool
+    ) -> Tuple[ExtractionResponse, bool]:
+        group_contexts = None
+        template = None
+        async with AsyncSessionLocal() as db:
+            document = await self._get_document(db, document_id)
+            
+            # Check if already extracted
+            result = await db.execute(
+                select(Extraction).where(Extraction.document_id == document_id)
+            )
+            existing = result.scalar_one_or_none()
+            if existing and not force:
+                return format_extraction(document_id, existing), False
+            
+            text = document.text_content
+            if from_template:
+                template = await self._find_template(db, document, "extraction")
+            if template:
+                group_contexts = await self.extractor.retrieve_group_contexts(
+                    document_id, db, changed_spans=template["changed_spans"]
+                )
+            elif targeted:
+                group_contexts = await self.extractor.retrieve_group_contexts(document_id, db)
+        
+        # Extract fields
+        if template:
+            extracted_data = await self.extractor.extract_fields_from_contexts(
+                text, group_contexts, inherited=template["result"]
+            )
+        elif targeted:
+            extracted_data = await self.extractor.extract_fields_from_contexts(text, group_contexts)
+        else:
+            extracted_data = await self.extractor.extract_fields(text)
+        
+        # Store extraction
+        extraction = await self._store_extraction(document_id, extracted_data, replace=bool(existing))
+        
+        return format_extraction(document_id, extraction), True
+    
+    async def analyze(self, document_id: str, map_reduce: bool = True) -> AnalyzeResponse:
+        """Extract fields and audit a document with one LLM call per section."""
+        return await self.singleflight.do(
+            SingleFlight.make_key("analyze", document_id, map_reduce),
+            lambda: self._analyze(document_id, map_reduce),
+            encode=lambda response: response.model_dump(mode="json"),
+            decode=AnalyzeResponse.model_validate
+        )
+    
+    async def _analyze(self, document_id: str, map_reduce: bool) -> AnalyzeResponse:
+        loaded = await self.load_for_audit(document_id)
+        
+        analysis = await self.contract_analyzer.analyze(
+            loaded["text"],
+            pages=loaded["pages"],
+            rule_findings=loaded["rule_findings"],
+            map_reduce=map_reduce
+        )
+        
+        # Fields from a partly failed analysis only fill in a missing extraction
+        extraction = await self._store_extraction(
+            document_id, analysis["fields"], replace=not analysis["failed_windows"]
+        )
+        run_id = await self.complete_audit(
+            document_id,
+            analysis["audit"],
+            prompt_version=self.contract_analyzer.prompt_version
+        )
+        
+        return AnalyzeResponse(
+            document_id=document_id,
+            extraction=format_extraction(document_id, extraction),
+            audit=self._audit_response(document_id, analysis["audit"], run_id)
+        )
+    
+    async def _store_extraction(
+        self,
+        document_id: str,
+        extracted_data: Dict[str, Any],
+        replace: bool = False
+    ) -> Extraction:
+        """Persist extracted fields, replacing any previous extraction.
+        
+        Without replace, or if another worker stored an extraction for the
+        document concurrently, the stored one is kept and returned.
+        """
+        liability_cap = extracted_data.get("liability_cap") or {}
+        extraction = Extraction(
+            document_id=document_id,
+            parties=extracted_data.get("parties", []),
+            effective_date=extracted_data.get("effective_date"),
+            term=extracted_data.get("term"),
+            governing_law=extracted_data.get("governing_law"),
+            payment_terms=extracted_data.get("payment_terms"),
+            termination=extracted_data.get("termination"),
+            auto_renewal=extracted_data.get("auto_renewal"),
+            confidentiality=extracted_data.get("confidentiality"),
+            indemnity=extracted_data.get("indemnity"),
+            liability_cap_number=liability_cap.get("number"),
+            liability_cap_currency=liability_cap.get("currency"),
+            signatories=extracted_data.get("signatories", [])
+        )
+        async with AsyncSessionLocal() as db:
+            try:
+                with time_stage("db_insert"):
+                    if replace:
+                        await db.execute(delete(Extraction).where(Extraction.document_id == document_id))
+                    db.add(extraction)
+                    await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                result = await db.execute(
+                    select(Extraction).where(Extraction.document_id == document_id)
+                )
+                existing = result.scalar_one_or_none()
+                if not existing:
+                    raise
+                logger.info(f"Kept stored extraction for document {document_id}")
+                return existing
+        
+        await self.result_cache.invalidate(document_id, "extraction")
+        EXTRACTIONS_COMPLETED.inc()
+        logger.info(f"Extracted fields for document {document_id}")
+        
+        # Send webhook notification
+        await self.webhook_service.dispatch_event(
+            "extraction.complete",
+            {"document_id": document_id, "status": "success"}
+        )
+        
+        return extraction
+    
+    async def load_for_audit(self, document_id: str) -> Dict[str, Any]:
+        """Load a document's text, page offsets and current rule findings."""
+        async with AsyncSessionLocal() as db:
+            document = await self._get_document(db, document_id)
+            
+            # Rule findings are precomputed at ingest and kept on the current rule set
+            rule_findings = await self.rule_index.get_or_index_findings(db, document)
+            
+            return {
+                "document_id": document_id,
+                "text": document.text_content,
+                "pages": document.page_offsets,
+                "rule_findings": rule_findings
+            }
+    
+    async def audit(
+        self,
+        document_id: str,
+        use_llm: bool = True,
+        map_reduce: bool = True,
+        force: bool = True,
+        from_template: bool = False
+    ) -> Tuple[AuditResponse, bool]:
+        """Audit a document.
+        
+        Returns the audit and whether it was newly computed. Without force, an
+        LLM audit whose latest run used the current rule set and prompt is
+        returned instead of re-running. With from_template, only sections that
+        differ from an audited near-duplicate are sent to the LLM.
+        """
+        return await self.singleflight.do(
+            SingleFlight.make_key("audit", document_id, use_llm, map_reduce, force, from_template),
+            lambda: self._audit(document_id, use_llm, map_reduce, force, from_template),
+            encode=_encode_result,
+            decode=lambda data: (AuditResponse.model_validate(data[0]), data[1])
+        )
+    
+    async def _audit(
+        self,
+        document_id: str,
+        use_llm: bool,
+        map_reduce: bool,
+        force: bool,
+        from_template: bool
+    ) -> Tuple[AuditResponse, bool]:
+        loaded = await self.load_for_audit(document_id)
+        
+        if not use_llm:
+            # Rules-only audits are a lookup of the stored findings
+            audit_results = self.risk_analyzer.summarize_findings(loaded["rule_findings"])
+            await self.complete_audit(document_id, audit_results, persist=False)
+            return self._audit_response(document_id, audit_results), True
+        
+        if not force:
+            latest = await self.latest_audit(document_id)
+            if latest and self.is_current_run(latest[0]):
+                return self._run_response(document_id, *latest), False
+        
+        # Run audit
+        audit_results = None
+        if from_template:
+            audit_results = await self._audit_from_template(loaded)
+        if audit_results is None:
+            audit_results = await self.risk_analyzer.analyze_risks(
+                loaded["text"],
+                use_llm=use_llm,
+                pages=loaded["pages"],
+                map_reduce=map_reduce,
+                rule_findings=loaded["rule_findings"]
+            )
+        
+        # Store results as a new audit run
+        run_id = await self.complete_audit(document_id, audit_results)
+        
+        return self._audit_response(document_id, audit_results, run_id), True
+    
+    async def _audit_from_template(self, loaded: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Audit results inherited from a near-duplicate, or None if there is none to use."""
+        async with AsyncSessionLocal() as db:
+            document = await self._get_document(db, loaded["document_id"])
+            template = await self._find_template(db, document, "audit")
+        if not template:
+            return None
+        
+        # Keep the template's located findings that fall in shared sections
+        inherited = []
+        for finding in template["result"]:
+            if finding.get("char_start") is None or finding.get("char_end") is None:
+                continue
+            shifted = shift_span(template["shared"], finding["char_start"], finding["char_end"])
+            if shifted:
+                inherited.append({**finding, "char_start": shifted[0], "char_end": shifted[1]})
+        
+        return await self.risk_analyzer.analyze_changed_sections(
+            loaded["text"],
+            template["changed_spans"],
+            inherited,
+            pages=loaded["pages"],
+            rule_findings=loaded["rule_findings"]
+        )
+    
+    async def similar_documents(self, document_id: str) -> List[Tuple[str, float]]:
+        """Near-duplicates of a document, most similar first."""
+        async with AsyncSessionLocal() as db:
+            document = await self._get_document(db, document_id)
+            if document.minhash is None:
+                await self.near_duplicates.index_document(db, document)
+                await db.commit()
+            return await self.near_duplicates.similar(db, document)
+    
+    async def _find_template(
+        self,
+        db: AsyncSession,
+        document: Document,
+        kind: str
+    ) -> Optional[Dict[str, Any]]:
+        """The most similar near-duplicate with a current result of kind ("extraction" or "audit").
+        
+        Returns its result with the sections shared with this document and the
+        changed spans, or None if no candidate differs little enough to reuse.
+        """
+        if document.minhash is None:
+            await self.near_duplicates.index_document(db, document)
+            await db.commit()
+        
+        for template_id, similarity in await self.near_duplicates.similar(db, document):
+            if kind == "extraction":
+                result = await db.execute(select(Extraction).where(Extraction.document_id == template_id))
+                extraction = result.scalar_one_or_none()
+                template_result = format_extraction(template_id, extraction).model_dump(mode="json") if extraction else None
+            else:
+                latest = await self.audit_store.latest_run(db, template_id)
+                template_result = latest[1] if latest and self.is_current_run(latest[0]) else None
+            if template_result is None:
+                continue
+            
+            result = await db.execute(select(Document.text_content).where(Document.document_id == template_id))
+            shared, differing = diff_sections(result.scalar_one() or "", document.text_content or "")
+            ratio = changed_ratio(document.text_content or "", differing)
+            if ratio > settings.NEAR_DUPLICATE_MAX_CHANGED_RATIO:
+                continue
+            
+            CACHE_LOOKUPS.labels(cache="template", result="hit").inc()
+            logger.info(
+                f"Reusing {kind} of document {template_id} for {document.document_id} "
+                f"(similarity {similarity}, {ratio:.0%} changed)"
+            )
+            return {
+                "document_id": template_id,
+                "result": template_result,
+                "shared": shared,
+                "changed_spans": differing
+            }
+        
+        CACHE_LOOKUPS.labels(cache="template", result="miss").inc()
+        return None
+    
+    async def audit_events(
+        self,
+        loaded: Dict[str, Any],
+        use_llm: bool = True,
+        map_reduce: bool = True
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream audit events for a loaded document, persisting the final result."""
+        async for event in self.risk_analyzer.analyze_risks_stream(
+            loaded["text"],
+            use_llm=use_llm,
+            pages=loaded["pages"],
+            map_reduce=map_reduce,
+            rule_findings=loaded["rule_findings"]
+        ):
+            if event["type"] == "complete":
+                run_id = await self.complete_audit(loaded["document_id"], event, persist=use_llm)
+                event = {
+                    "type": "complete",
+                    "run_id": run_id,
+                    "risk_score": event["risk_score"],
+                    "summary": event["summary"],
+                    "findings_count": len(event["findings"])
+                }
+            yield event
+    
+    async def complete_audit(
+        self,
+        document_id: str,
+        audit_results: Dict[str, Any],
+        persist: bool = True,
+        prompt_version: Optional[str] = None
+    ) -> Optional[str]:
+        """Persist audit findings as a new run and notify webhook subscribers.
+        
+        Rules-only results are already stored as rule findings, so they are
+        only announced.
+        """
+        run_id = None
+        if persist:
+            async with AsyncSessionLocal() as db:
+                with time_stage("db_insert"):
+                    run = await self.audit_store.save_run(
+                        db,
+                        document_id,
+                        audit_results,
+                        ruleset_version=self.rule_index.version,
+                        prompt_version=prompt_version or self.risk_analyzer.prompt_version
+                    )
+                run_id = run.run_id
+            await self.result_cache.invalidate(document_id, "audit")
+        
+        AUDITS_COMPLETED.inc()
+        logger.info(f"Audit completed for document {document_id}: {len(audit_results['findings'])} findings")
+        
+        # Send webhook
+        await self.webhook_service.dispatch_event(
+            "audit.complete",
+            {
+                "document_id": document_id,
+                "run_id": run_id,
+                "findings_count": len(audit_results["findings"]),
+                "risk_score": audit_results["risk_score"]
+            }
+        )
+        
+        return run_id
+    
+    async def latest_audit(self, document_id: str):
+        """Latest stored audit run and its findings, if any."""
+        async with AsyncSessionLocal() as db:
+            return await self.audit_store.latest_run(db, document_id)
+    
+    async def stored_extraction(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Cached {"version", "body"} of the stored extraction, without recomputing."""
+        entry = await self.result_cache.get("extraction", document_id)
+        if entry:
+            return entry
+        generation = await self.result_cache.generation("extraction", document_id)
+        
+        async with AsyncSessionLocal() as db:
+            await self._get_document(db, document_id)
+            result = await db.execute(
+                select(Extraction).where(Extraction.document_id == document_id)
+            )
+            extraction = result.scalar_one_or_none()
+        if not extraction:
+            return None
+        
+        # Extractions are replaced rather than updated, so the row id is the version
+        entry = {
+            "version": f"extraction-{extraction.id}",
+            "body": format_extraction(document_id, extraction).model_dump(mode="json")
+        }
+        await self.result_cache.set("extraction", document_id, entry, generation)
+        return entry
+    
+    async def stored_audit(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Cached {"version", "body"} of the latest audit run, without recomputing."""
+        entry = await self.result_cache.get("audit", document_id)
+        if entry:
+            return entry
+        generation = await self.result_cache.generation("audit", document_id)
+        
+        async with AsyncSessionLocal() as db:
+            await self._get_document(db, document_id)
+            latest = await self.audit_store.latest_run(db, document_id)
+        if not latest:
+            return None
+        
+        run, findings = latest
+        entry = {
+            "version": f"audit-{run.run_id}",
+            "body": self._run_response(document_id, run, findings).model_dump(mode="json")
+        }
+        await self.result_cache.set("audit", document_id, entry, generation)
+        return entry
+    
+    def is_current_run(self, run) -> bool:
+        """Whether a stored LLM run used the current rule set and the current audit or analysis prompt."""
+        return (
+            bool(run.use_llm)
+            and run.ruleset_version == self.rule_index.version
+            and run.prompt_version in (self.risk_analyzer.prompt_version, self.contract_analyzer.prompt_version)
+        )
+    
+    async def resolve_document_ids(
+        self,
+        document_ids: Optional[List[str]],
+        batch_filter: Optional[BatchFilter]
+    ) -> List[str]:
+        """Document ids named explicitly, or matched by a filter."""
+        if document_ids:
+            return list(dict.fromkeys(document_ids))
+        
+        batch_filter = batch_filter or BatchFilter()
+        query = select(Document.document_id)
+        if batch_filter.filename_contains:
+            query = query.where(Document.filename.contains(batch_filter.filename_contains))
+        if batch_filter.created_after:
+            query = query.where(Document.created_at >= batch_filter.created_after)
+        if batch_filter.created_before:
+            query = query.where(Document.created_at < batch_filter.created_before)
+        
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(query.order_by(Document.id).limit(batch_filter.limit))
+            return list(result.scalars().all())
+    
+    async def run_batch(
+        self,
+        document_ids: List[str],
+        handler: Callable[[str], Awaitable[Tuple[Any, bool]]]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run handler over documents with bounded concurrency, yielding results as they finish."""
+        semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+        
+        async def run_one(document_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    response, computed = await handler(document_id)
+                    return {
+                        "document_id": document_id,
+                        "status": "completed" if computed else "skipped",
+                        "result": response.model_dump(mode="json")
+                    }
+                except DocumentNotFoundError:
+                    return {"document_id": document_id, "status": "not_found"}
+                except Exception as e:
+                    logger.error(f"Batch item failed for document {document_id}: {str(e)}")
+                    return {"document_id": document_id, "status": "error", "error": str(e)}
+        
+        tasks = [asyncio.create_task(run_one(document_id)) for document_id in document_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop remaining work if the client disconnects
+            for task in tasks:
+                task.cancel()
+    
+    async def _get_document(self, db: AsyncSession, document_id: str) -> Document:
+        with span("db.load_document"):
+            result = await db.execute(
+                select(Document).where(Document.document_id == document_id)
+            )
+        document = result.scalar_one_or_none()
+        
+        if not document:
+            raise DocumentNotFoundError(document_id)
+        return document
+    
+    def _audit_response(
+        self,
+        document_id: str,
+        audit_results: Dict[str, Any],
+        run_id: Optional[str] = None
+    ) -> AuditResponse:
+        return AuditResponse(
+            document_id=document_id,
+            findings=audit_results["findings"],
+            risk_score=audit_results["risk_score"],
+            summary=audit_results["summary"],
+            run_id=run_id
+        )
+    
+    def _run_response(self, document_id: str, run, findings: List[Dict[str, Any]]) -> AuditResponse:
+        return AuditResponse(
+            document_id=document_id,
+            findings=findings,
+            risk_score=run.risk_score,
+            summary=run.summary,
+            run_id=run.run_id
+        )
+
+def _encode_result(result: Tuple[Any, bool]) -> List[Any]:
+    response, computed = result
+    return [response.model_dump(mode="json"), computed]
+
+def format_extraction(doc_id: str, extraction: Extraction) -> ExtractionResponse:
+    liability_cap = None
+    if extraction.liability_cap_number:
+        liability_cap = {
+            "number": extraction.liability_cap_number,
+            "currency": extraction.liability_cap_currency
+        }
+    
+    return ExtractionResponse(
+        document_id=doc_id,
+        parties=extraction.parties,
+        effective_date=extraction.effective_date,
+        term=extraction.term,
+        governing_law=extraction.governing_law,
+        payment_terms=extraction.payment_terms,
+        termination=extraction.termination,
+        auto_renewal=extraction.auto_renewal,
+        confidentiality=extraction.confidentiality,
+        indemnity=extraction.indemnity,
+        liability_cap=liability_cap,
+        signatories=extraction.signatories
+    )
+
+pipeline = DocumentPipeline()
@@ -3,15 +3,21 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from anthropic import AsyncAnthropic
 import json
+import time
 
 from app.models import Chunk, Document
-from app.services.embeddings import EmbeddingService
+from app.services.embeddings import get_embedding_service
+from app.services.clause_index import clause_filter, clause_types_in_question, rank_with_label_boost
 from app.config import settings
 from app.utils.logger import logger
+from app.utils.metrics import (
+    QUESTIONS_ANSWERED, LLM_TIME_TO_FIRST_TOKEN, time_stage, record_llm_call
+)
+from app.utils.load_shedding import load_shedder
 
 class RAGEngine:
     def __init__(self):
-        self.embedding_service = EmbeddingService()
+        self.embedding_service = get_embedding_service()
         self.client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
     
     async def answer_question(
@@ -23,27 +29,7 @@ class RAGEngine:
     ) -> Dict[str, Any]:
         """Answer question using RAG."""
         
-        # Create question embedding
-        question_embedding = await self.embedding_service.create_embedding(question)
-        
-        # Build query
-        query = select(
-            Chunk,
-            Document.filename
-        ).join(
-            Document, Chunk.document_id == Document.document_id
-        )
-        
-        if document_ids:
-            query = query.where(Chunk.document_id.in_(document_ids))
-        
-        # Vector similarity search
-        query = query.order_by(
-            Chunk.embedding.cosine_distance(question_embedding)
-        ).limit(top_k)
-        
-        result = await db.execute(query)
-        chunks = result.all()
+        chunks = await self._retrieve(question, document_ids, top_k, db)
         
         if not chunks:
             return {
@@ -53,40 +39,45 @@ class RAGEngine:
             }
         
         # Build context
-        context_parts = []
-        citations = []
-        sources = set()
-        
-        for chunk, filename in chunks:
-            context_parts.append(f"[Document: {filename}, Page {chunk.page_number}]\n{chunk.text}")
-            citations.append({
-                "document_id": chunk.document_id,
-                "page": chunk.page_number,
-                "char_start": chunk.char_start,
-                "char_end": chunk.char_end,
-                "text": chunk.text[:200] + "..." if len(chunk.text) > 200 else chunk.text
-            })
-            sources.add(filename)
-        
-        context = "\n\n".join(context_parts)
-        
-        # Load prompt
-        with open("prompts/qa_prompt.txt", "r") as f:
-            prompt_template = f.read()
-        
-        prompt = prompt_template.format(
-            context=context,
-            question=question
-        )
+        with time_stage("context_build"):
+            context_parts = []
+            citations = []
+            sources = set()
+            
+            for chunk, filename in chunks:
+                context_parts.append(f"[Document: {filename}, Page {chunk.page_number}]\n{chunk.text}")
+                citations.append({
+                    "document_id": chunk.document_id,
+                    "page": chunk.page_number,
+                    "char_start": chunk.char_start,
+                    "char_end": chunk.char_end,
+                    "text": chunk.text[:200] + "..." if len(chunk.text) > 200 else chunk.text
+                })
+                sources.add(filename)
+            
+            context = "\n\n".join(context_parts)
+            
+            # Load prompt
+            with open("prompts/qa_prompt.txt", "r") as f:
+                prompt_template = f.read()
+            
+            prompt = prompt_template.format(
+                context=context,
+                question=question
+            )
         
         # Call Claude
-        message = await self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1000,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        start_time = time.perf_counter()
+        async with load_shedder.llm_call():
+            message = await self.client.messages.create(
+                model="claude-sonnet-4-20250514",
+                max_tokens=1000,
+                messages=[{"role": "user", "content": prompt}]
+            )
+        record_llm_call("qa", message, time.perf_counter() - start_time)
         
         answer = message.content[0].text
+        QUESTIONS_ANSWERED.inc()
         
         return {
             "answer": answer,
@@ -94,53 +85,96 @@ class RAGEngine:
             "sources": list(sources)
         }
     
-    async def answer_question_stream(
+    async def _retrieve(
         self,
         question: str,
         document_ids: Optional[List[str]],
         top_k: int,
         db: AsyncSession
-    ) -> AsyncGenerator[str, None]:
-        """Stream answer using SSE."""
+    ) -> List[Any]:
+        """The top_k (chunk, filename) rows closest to the question.
         
-        # Get context (same as above)
+        A question naming clause types (e.g. "what is the indemnity?") ranks
+        chunks labelled with them CLAUSE_LABEL_BOOST closer; unlabelled chunks
+        still compete, so documents ingested before labelling, or chunks the
+        classifier missed, are not dropped.
+        """
+        
+        # Create question embedding
         question_embedding = await self.embedding_service.create_embedding(question)
         
-        query = select(Chunk, Document.filename).join(
+        # Build query
+        distance = Chunk.embedding.cosine_distance(question_embedding)
+        query = select(
+            Chunk,
+            Document.filename,
+            distance.label("distance")
+        ).join(
             Document, Chunk.document_id == Document.document_id
         )
         
         if document_ids:
             query = query.where(Chunk.document_id.in_(document_ids))
         
-        query = query.order_by(
-            Chunk.embedding.cosine_distance(question_embedding)
-        ).limit(top_k)
+        # Vector similarity search
+        query = query.order_by(distance).limit(top_k)
+        
+        clause_types = clause_types_in_question(question)
+        with time_stage("vector_search"):
+            result = await db.execute(query)
+            rows = [(chunk.id, row_distance, (chunk, filename)) for chunk, filename, row_distance in result.all()]
+            if not clause_types:
+                return [row for _, _, row in rows]
+            
+            result = await db.execute(query.where(clause_filter(clause_types)))
+            labelled = [(chunk.id, row_distance, (chunk, filename)) for chunk, filename, row_distance in result.all()]
+        return rank_with_label_boost(rows, labelled, top_k, settings.CLAUSE_LABEL_BOOST)
+    
+    async def answer_question_stream(
+        self,
+        question: str,
+        document_ids: Optional[List[str]],
+        top_k: int,
+        db: AsyncSession
+    ) -> AsyncGenerator[str, None]:
+        """Stream answer using SSE."""
         
-        result = await db.execute(query)
-        chunks = result.all()
+        # Get context (same as above)
+        chunks = await self._retrieve(question, document_ids, top_k, db)
         
         if not chunks:
             yield json.dumps({"type": "error", "message": "No relevant context found"})
             return
         
-        context_parts = []
-        for chunk, filename in chunks:
-            context_parts.append(f"[Document: {filename}, Page {chunk.page_number}]\n{chunk.text}")
-        
-        context = "\n\n".join(context_parts)
-        
-        with open("prompts/qa_prompt.txt", "r") as f:
-            prompt_template = f.read()
-        
-        prompt = prompt_template.format(context=context, question=question)
+        with time_stage("context_build"):
+            context_parts = []
+            for chunk, filename in chunks:
+                context_parts.append(f"[Document: {filename}, Page {chunk.page_number}]\n{chunk.text}")
+            
+            context = "\n\n".join(context_parts)
+            
+            with open("prompts/qa_prompt.txt", "r") as f:
+                prompt_template = f.read()
+            
+            prompt = prompt_template.format(context=context, question=question)
         
         # Stream response
-        async with self.client.messages.stream(
+        start_time = time.perf_counter()
+        first_token = True
+        async with load_shedder.llm_call(), self.client.messages.stream(
             model="claude-sonnet-4-20250514",
             max_tokens=1000,
             messages=[{"role": "user", "content": prompt}]
         ) as stream:
             async for text in stream.text_stream:
+                if first_token:
+                    LLM_TIME_TO_FIRST_TOKEN.labels(operation="qa_stream").observe(
+                        time.perf_counter() - start_time
+                    )
+                    first_token = False
                 yield json.dumps({"type": "content", "text": text})
+            message = await stream.get_final_message()
+        
+        record_llm_call("qa_stream", message, time.perf_counter() - start_time)
+        QUESTIONS_ANSWERED.inc()
 
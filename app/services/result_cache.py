@@ -0,0 +1,125 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import CACHE_LOOKUPS
+from app.utils.redis_client import get_redis
+
+# Set KEYS[2] only if the generation in KEYS[1] is still ARGV[1] ('' if unset)
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('get', KEYS[1]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('set', KEYS[2], ARGV[2], 'EX', tonumber(ARGV[3]))
+return 1
+"""
+
+# (in-process invalidation count, Redis generation or None if Redis was unreachable)
+Generation = Tuple[int, Optional[str]]
+
+class ResultCache:
+    """Cache of stored extraction and audit results for read endpoints.
+
+    Entries are {"version": ..., "body": ...}. A short-lived in-process layer
+    sits in front of Redis; writers invalidate both when a result changes, and
+    other workers' in-process entries expire within the local TTL.
+
+    Readers fill the cache after a miss, so a reader that loaded a row just
+    before a writer replaced it could put the old entry back. Each key has a
+    generation that invalidation bumps; readers take it before reading the
+    database and set only if it has not moved since.
+    """
+
+    def __init__(self, namespace: str = "results"):
+        self.namespace = namespace
+        self.ttl = settings.RESULT_CACHE_TTL_SECONDS
+        self.local_ttl = settings.RESULT_CACHE_LOCAL_TTL_SECONDS
+        self.local_max_entries = settings.RESULT_CACHE_LOCAL_MAX_ENTRIES
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._invalidations = 0
+        self._set_script = None
+
+    async def get(self, kind: str, document_id: str) -> Optional[Dict[str, Any]]:
+        key = self._key(kind, document_id)
+
+        cached = self._local.get(key)
+        if cached:
+            expires_at, entry = cached
+            if expires_at > time.monotonic():
+                CACHE_LOOKUPS.labels(cache="results", result="hit").inc()
+                return entry
+            del self._local[key]
+
+        try:
+            raw = await get_redis().get(key)
+        except Exception as e:
+            logger.warning(f"Result cache read failed: {str(e)}")
+            return None
+
+        if raw is None:
+            CACHE_LOOKUPS.labels(cache="results", result="miss").inc()
+            return None
+        CACHE_LOOKUPS.labels(cache="results", result="hit").inc()
+        entry = json.loads(raw)
+        self._set_local(key, entry)
+        return entry
+
+    async def generation(self, kind: str, document_id: str) -> Generation:
+        """Token to pass to set; take it before reading the result from the database."""
+        try:
+            current = await get_redis().get(self._generation_key(kind, document_id))
+        except Exception as e:
+            logger.warning(f"Result cache read failed: {str(e)}")
+            return self._invalidations, None
+        return self._invalidations, current or ""
+
+    async def set(self, kind: str, document_id: str, entry: Dict[str, Any], generation: Generation):
+        """Cache an entry unless the key was invalidated since generation was taken."""
+        local_generation, redis_generation = generation
+        key = self._key(kind, document_id)
+        if local_generation == self._invalidations:
+            self._set_local(key, entry)
+        if redis_generation is None:
+            return
+        try:
+            if self._set_script is None:
+                self._set_script = get_redis().register_script(SET_IF_GENERATION_SCRIPT)
+            await self._set_script(
+                keys=[self._generation_key(kind, document_id), key],
+                args=[redis_generation, json.dumps(entry), self.ttl]
+            )
+        except Exception as e:
+            logger.warning(f"Result cache write failed: {str(e)}")
+
+    async def invalidate(self, document_id: str, *kinds: str):
+        keys = [self._key(kind, document_id) for kind in kinds]
+        self._invalidations += 1
+        for key in keys:
+            self._local.pop(key, None)
+        try:
+            async with get_redis().pipeline(transaction=True) as pipe:
+                for kind in kinds:
+                    generation_key = self._generation_key(kind, document_id)
+                    pipe.incr(generation_key)
+                    pipe.expire(generation_key, self.ttl)
+                pipe.delete(*keys)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Result cache invalidation failed: {str(e)}")
+
+    def _set_local(self, key: str, entry: Dict[str, Any]):
+        if self.local_ttl <= 0:
+            return
+        self._local[key] = (time.monotonic() + self.local_ttl, entry)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+    def _key(self, kind: str, document_id: str) -> str:
+        return f"{self.namespace}:{kind}:{document_id}"
+
+    def _generation_key(self, kind: str, document_id: str) -> str:
+        return f"{self.namespace}:generation:{kind}:{document_id}"
@@ -0,0 +1,234 @@
+import bisect
+import difflib
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Document, Chunk, Extraction, AuditRun, AuditResult
+from app.services.embeddings import get_embedding_service
+from app.services.clause_index import clause_index
+from app.services.file_store import file_store
+from app.services.pdf_parser import PDFParser, WORD_PATTERN
+from app.services.pipeline import DocumentPipeline, DocumentNotFoundError
+from app.utils.logger import logger
+from app.utils.metrics import time_stage
+
+def page_hashes(text: str, pages: List[Dict[str, Any]]) -> List[str]:
+    """Content hash of each page's text, from its offsets into the full text."""
+    return [
+        hashlib.sha256(text[page["char_start"]:page["char_end"]].encode()).hexdigest()
+        for page in pages
+    ]
+
+def plan_chunks(
+    parser: PDFParser,
+    old_text: str,
+    old_pages: List[Dict[str, Any]],
+    old_chunks: List[Tuple[Any, int, int]],
+    new_text: str,
+    new_pages: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Chunks for a revised text, reusing old chunks that lie on unchanged pages.
+
+    old_chunks are (id, char_start, char_end). Pages are matched by content
+    hash, so unchanged pages are found even if pages were inserted or removed
+    before them. An old chunk is kept, with its offsets shifted, when every
+    page it touches is unchanged and contiguous in the new text; the changed
+    regions between kept chunks are re-chunked with the usual size and
+    overlap. Returned chunks carry "chunk_id" (None for new ones), and the
+    count of changed pages in the new text.
+    """
+    old_page_starts = [page["char_start"] for page in old_pages]
+    new_page_starts = [page["char_start"] for page in new_pages]
+
+    # Old page index -> (matched block, char shift into the new text)
+    matcher = difflib.SequenceMatcher(
+        None, page_hashes(old_text, old_pages), page_hashes(new_text, new_pages), autojunk=False
+    )
+    page_map: Dict[int, Tuple[int, int]] = {}
+    unchanged_pages = 0
+    for block, (old_start, new_start, size) in enumerate(matcher.get_matching_blocks()):
+        unchanged_pages += size
+        for offset in range(size):
+            page_map[old_start + offset] = (
+                block,
+                new_pages[new_start + offset]["char_start"] - old_pages[old_start + offset]["char_start"]
+            )
+
+    words = list(WORD_PATTERN.finditer(new_text))
+    word_starts = [word.start() for word in words]
+
+    kept: List[Tuple[int, int, Any]] = []  # (first word, last word, chunk id) in the new text
+    for chunk_id, char_start, char_end in sorted(old_chunks, key=lambda chunk: chunk[1]):
+        first_page = bisect.bisect_right(old_page_starts, char_start) - 1
+        last_page = bisect.bisect_right(old_page_starts, char_end - 1) - 1
+        mapped = {page_map.get(page) for page in range(first_page, last_page + 1)}
+        if len(mapped) != 1 or None in mapped:
+            continue
+        _, shift = mapped.pop()
+        first_word = bisect.bisect_left(word_starts, char_start + shift)
+        last_word = bisect.bisect_left(word_starts, char_end + shift) - 1
+        if first_word < len(words) and first_word <= last_word:
+            kept.append((first_word, last_word, chunk_id))
+
+    step = parser.chunk_size - parser.chunk_overlap
+    chunks: List[Dict[str, Any]] = []
+    previous_first: Optional[int] = None
+    previous_last = -1
+    for first_word, last_word, chunk_id in kept + [(len(words), None, None)]:
+        # Fill the words between the previous kept chunk and this one as the chunker
+        # would, overlapping the previous chunk's tail even when it was a short one
+        position = 0 if previous_first is None else min(
+            previous_first + step, max(previous_first + 1, previous_last + 1 - parser.chunk_overlap)
+        )
+        if first_word > previous_last + 1:
+            while position < first_word and position < len(words):
+                end = min(position + parser.chunk_size, len(words))
+                chunks.append(
+                    {**parser.make_chunk(words[position:end], new_pages, new_page_starts), "chunk_id": None}
+                )
+                if chunk_id is not None and end >= first_word + parser.chunk_overlap:
+                    break
+                position += step
+        if chunk_id is not None:
+            chunks.append(
+                {**parser.make_chunk(words[first_word:last_word + 1], new_pages, new_page_starts), "chunk_id": chunk_id}
+            )
+            previous_first, previous_last = first_word, last_word
+
+    return chunks, len(new_pages) - unchanged_pages
+
+class DocumentReviser:
+    """Re-ingests a revised upload of an existing document.
+
+    Only changed pages are re-chunked and re-embedded; chunks on unchanged
+    pages keep their rows and embeddings. Stored extraction and audit runs
+    describe the previous text, so they are removed and the document's cached
+    results invalidated.
+    """
+
+    def __init__(self, document_pipeline: DocumentPipeline):
+        self.pipeline = document_pipeline
+        self.pdf_parser = PDFParser()
+        self.embedding_service = get_embedding_service()
+
+    async def revise(self, db: AsyncSession, document_id: str, file: UploadFile) -> Dict[str, Any]:
+        result = await db.execute(
+            select(Document).where(Document.document_id == document_id).with_for_update()
+        )
+        document = result.scalar_one_or_none()
+        if not document:
+            raise DocumentNotFoundError(document_id)
+
+        stored = await file_store.save(file.file)
+        if stored.content_hash == document.content_hash:
+            return self._summary(document, pages_changed=0, chunks_reused=None, chunks_embedded=0)
+
+        with file_store.open(stored) as source:
+            parsed_data = await self.pdf_parser.parse_pdf(source)
+        pages = [
+            {
+                "page_number": page["page_number"],
+                "char_start": page["char_start"],
+                "char_end": page["char_end"]
+            }
+            for page in parsed_data["pages"]
+        ]
+
+        result = await db.execute(
+            select(Chunk.id, Chunk.char_start, Chunk.char_end).where(Chunk.document_id == document_id)
+        )
+        old_chunks = [tuple(row) for row in result.all()]
+        with time_stage("chunking"):
+            chunks, pages_changed = plan_chunks(
+                self.pdf_parser,
+                document.text_content or "",
+                document.page_offsets or [],
+                old_chunks,
+                parsed_data["full_text"],
+                pages
+            )
+
+        new_chunks = [chunk for chunk in chunks if chunk["chunk_id"] is None]
+        embeddings = await self.embedding_service.create_embeddings_batch(
+            [chunk["text"] for chunk in new_chunks]
+        ) if new_chunks else []
+        clause_labels = await clause_index.label_chunks(embeddings)
+
+        document.file_path = stored.path
+        document.content_hash = stored.content_hash
+        document.file_size = stored.size
+        document.page_count = parsed_data["page_count"]
+        document.text_content = parsed_data["full_text"]
+        document.page_offsets = pages
+        document.metadata = parsed_data["metadata"]
+        document.revision = (document.revision or 1) + 1
+
+        reused = {
+            chunk["chunk_id"]: (index, chunk)
+            for index, chunk in enumerate(chunks)
+            if chunk["chunk_id"] is not None
+        }
+        result = await db.execute(select(Chunk).where(Chunk.document_id == document_id))
+        for row in result.scalars().all():
+            if row.id not in reused:
+                await db.delete(row)
+                continue
+            row.chunk_index, chunk = reused[row.id]
+            row.page_number = chunk["page"]
+            row.char_start = chunk["char_start"]
+            row.char_end = chunk["char_end"]
+
+        embedded = iter(embeddings)
+        labelled = iter(clause_labels)
+        db.add_all([
+            Chunk(
+                document_id=document_id,
+                chunk_index=index,
+                text=chunk["text"],
+                page_number=chunk["page"],
+                char_start=chunk["char_start"],
+                char_end=chunk["char_end"],
+                embedding=next(embedded),
+                clause_labels=next(labelled)
+            )
+            for index, chunk in enumerate(chunks)
+            if chunk["chunk_id"] is None
+        ])
+
+        # Results for the previous text no longer apply
+        await db.execute(delete(Extraction).where(Extraction.document_id == document_id))
+        await db.execute(delete(AuditResult).where(AuditResult.document_id == document_id))
+        await db.execute(delete(AuditRun).where(AuditRun.document_id == document_id))
+        await self.pipeline.rule_index.index_document(db, document, chunks)
+        await self.pipeline.near_duplicates.index_document(db, document)
+
+        with time_stage("db_insert"):
+            await db.commit()
+        await self.pipeline.result_cache.invalidate(document_id, "extraction", "audit")
+
+        logger.info(
+            f"Revised document {document_id}: {pages_changed} pages changed, "
+            f"{len(reused)} chunks reused, {len(new_chunks)} embedded"
+        )
+        return self._summary(document, pages_changed, len(reused), len(new_chunks))
+
+    def _summary(
+        self,
+        document: Document,
+        pages_changed: int,
+        chunks_reused: Optional[int],
+        chunks_embedded: int
+    ) -> Dict[str, Any]:
+        return {
+            "document_id": document.document_id,
+            "revision": document.revision or 1,
+            "changed": chunks_reused is not None,
+            "page_count": document.page_count,
+            "pages_changed": pages_changed,
+            "chunks_reused": chunks_reused or 0,
+            "chunks_embedded": chunks_embedded
+        }
@@ -1,32 +1,155 @@
 from anthropic import AsyncAnthropic
+import asyncio
+import bisect
+import hashlib
 import json
 import re
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional, Tuple, AsyncGenerator
 
 from app.config import settings
+from app.services.rule_engine import get_rule_engine
 from app.utils.logger import logger
+from app.utils.metrics import record_llm_call
+from app.utils.load_shedding import load_shedder
+from app.utils.tracing import span
+
+# Lines that open a new article, section, schedule or exhibit
+SECTION_BOUNDARY_PATTERN = re.compile(
+    r'^[ \t]*(?:(?:ARTICLE|Article|SECTION|Section|SCHEDULE|Schedule|EXHIBIT|Exhibit|'
+    r'ANNEX|Annex|APPENDIX|Appendix)\b|\d+(?:\.\d+)*\.?[ \t]+[A-Z])',
+    re.MULTILINE
+)
+
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
 
 class RiskAnalyzer:
     def __init__(self):
         self.client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.rule_engine = get_rule_engine()
+        self.window_size = settings.AUDIT_WINDOW_SIZE
+        self.window_overlap = settings.AUDIT_WINDOW_OVERLAP
+        self.llm_semaphore = asyncio.Semaphore(settings.AUDIT_MAX_CONCURRENCY)
+        self.prompt_version = hashlib.sha256(self._load_prompt().encode()).hexdigest()[:12]
     
     async def analyze_risks(
         self, 
         text: str, 
-        use_llm: bool = True
+        use_llm: bool = True,
+        pages: Optional[List[Dict[str, Any]]] = None,
+        map_reduce: bool = True,
+        rule_findings: Optional[List[Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
-        """Analyze contract for risks using rules and optionally LLM."""
+        """Analyze contract for risks using rules and optionally LLM.
         
-        # Rule-based detection
-        rule_findings = self._detect_risks_rules(text)
+        With map_reduce the whole document is split into section-aligned
+        windows that are analyzed concurrently; otherwise only the first
+        window is sent to the LLM. Precomputed rule_findings skip the rule scan.
+        """
         
-        # LLM-based detection
-        llm_findings = []
-        if use_llm:
-            llm_findings = await self._detect_risks_llm(text)
+        # Rule and LLM stages run concurrently; the rule scan is CPU-bound
+        async def rule_stage():
+            if rule_findings is not None:
+                return rule_findings
+            with span("rule_scan"):
+                return await asyncio.to_thread(self._detect_risks_rules, text, pages)
+        
+        async def llm_stage():
+            if not use_llm:
+                return []
+            with span("risk_llm"):
+                return await self._detect_risks_llm(text, pages, map_reduce)
+        
+        rule_results, llm_findings = await asyncio.gather(rule_stage(), llm_stage())
         
         # Combine findings
-        all_findings = rule_findings + llm_findings
+        return self.summarize_findings(rule_results + llm_findings)
+    
+    async def analyze_risks_stream(
+        self,
+        text: str,
+        use_llm: bool = True,
+        pages: Optional[List[Dict[str, Any]]] = None,
+        map_reduce: bool = True,
+        rule_findings: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Analyze risks, yielding events as each stage produces findings.
+        
+        Emits rule findings first, then LLM findings per window as windows
+        complete, then a final event with the merged result.
+        """
+        window_tasks = []
+        if use_llm:
+            prompt_template = self._load_prompt()
+            window_tasks = [
+                asyncio.create_task(self._analyze_window(text, start, end, prompt_template, pages))
+                for start, end in self.llm_windows(text, map_reduce)
+            ]
+        
+        try:
+            if rule_findings is None:
+                rule_findings = await asyncio.to_thread(self._detect_risks_rules, text, pages)
+            yield {"type": "rule_findings", "findings": rule_findings}
+            
+            llm_raw = []
+            emitted = []
+            for next_window in asyncio.as_completed(window_tasks):
+                window_findings = await next_window
+                llm_raw.extend(window_findings)
+                
+                # Overlapping windows may report what was already streamed
+                new_findings = [f for f in window_findings if not self._is_duplicate(f, emitted)]
+                emitted.extend(new_findings)
+                if new_findings:
+                    yield {"type": "llm_findings", "findings": new_findings}
+            
+            result = self.summarize_findings(rule_findings + self.merge_findings(llm_raw))
+            yield {"type": "complete", **result}
+        finally:
+            # Stop outstanding LLM calls if the consumer goes away
+            for task in window_tasks:
+                task.cancel()
+    
+    async def analyze_changed_sections(
+        self,
+        text: str,
+        changed_spans: List[Tuple[int, int]],
+        inherited_findings: List[Dict[str, Any]],
+        pages: Optional[List[Dict[str, Any]]] = None,
+        rule_findings: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Audit a near-duplicate: LLM over the changed spans only, the rest inherited.
+        
+        inherited_findings are a template's findings already mapped to this
+        text's offsets, restricted to sections the two documents share.
+        """
+        if rule_findings is None:
+            rule_findings = await asyncio.to_thread(self._detect_risks_rules, text, pages)
+        
+        prompt_template = self._load_prompt()
+        windows = [
+            (start + window_start, start + window_end)
+            for start, end in changed_spans
+            for window_start, window_end in self._split_windows(text[start:end])
+        ]
+        with span("risk_llm", windows=len(windows)):
+            window_results = await asyncio.gather(*[
+                self._analyze_window(text, start, end, prompt_template, pages)
+                for start, end in windows
+            ])
+        
+        # Rule findings are recomputed for this text, so drop inherited copies of them
+        inherited = [f for f in inherited_findings if not self._is_duplicate(f, rule_findings)]
+        if pages:
+            for finding in inherited:
+                finding["page"] = self._page_for_offset(pages, finding["char_start"])
+        llm_findings = self.merge_findings(
+            inherited + [finding for result in window_results for finding in result]
+        )
+        return self.summarize_findings(rule_findings + llm_findings)
+    
+    def summarize_findings(self, all_findings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Score findings and build the audit summary."""
         
         # Calculate risk score
         severity_scores = {"low": 1, "medium": 3, "high": 5, "critical": 10}
@@ -42,86 +165,227 @@ class RiskAnalyzer:
             "summary": summary
         }
     
-    def _detect_risks_rules(self, text: str) -> List[Dict[str, Any]]:
-        """Detect risks using pattern matching."""
-        findings = []
-        
-        # Auto-renewal with short notice
-        auto_renewal_pattern = r'(?:automatically\s+renew|auto-renew).*?(\d+)\s*days?\s*notice'
-        matches = re.finditer(auto_renewal_pattern, text, re.IGNORECASE)
-        for match in matches:
-            days = int(match.group(1))
-            if days < 30:
-                findings.append({
-                    "risk_type": "auto_renewal_short_notice",
-                    "severity": "high",
-                    "description": f"Auto-renewal clause with only {days} days notice (< 30 days recommended)",
-                    "evidence": match.group(0),
-                    "recommendations": "Negotiate for at least 30 days notice period"
-                })
-        
-        # Unlimited liability
-        unlimited_pattern = r'unlimited\s+liability|liability\s+without\s+limit'
-        if re.search(unlimited_pattern, text, re.IGNORECASE):
-            findings.append({
-                "risk_type": "unlimited_liability",
-                "severity": "critical",
-                "description": "Contract contains unlimited liability clause",
-                "evidence": re.search(unlimited_pattern, text, re.IGNORECASE).group(0),
-                "recommendations": "Cap liability at a reasonable multiple of contract value"
-            })
-        
-        # Broad indemnity
-        indemnity_pattern = r'indemnify.*?(?:any|all)\s+(?:claims|losses|damages|liabilities)'
-        matches = re.finditer(indemnity_pattern, text, re.IGNORECASE)
-        for match in matches:
-            findings.append({
-                "risk_type": "broad_indemnity",
-                "severity": "high",
-                "description": "Broad indemnification clause detected",
-                "evidence": match.group(0),
-                "recommendations": "Limit indemnity to direct damages and reasonable legal fees"
-            })
-        
-        # No limitation of liability
-        if not re.search(r'limitation\s+of\s+liability', text, re.IGNORECASE):
-            findings.append({
-                "risk_type": "missing_liability_cap",
-                "severity": "high",
-                "description": "No limitation of liability clause found",
-                "evidence": None,
-                "recommendations": "Add clause capping liability to contract value or reasonable amount"
-            })
-        
-        return findings
-    
-    async def _detect_risks_llm(self, text: str) -> List[Dict[str, Any]]:
-        """Detect risks using LLM analysis."""
-        
-        # Load risk analysis prompt
+    def _detect_risks_rules(
+        self,
+        text: str,
+        pages: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Detect risks using the precompiled rule set."""
+        return self.rule_engine.scan_document(text, pages)
+    
+    async def _detect_risks_llm(
+        self,
+        text: str,
+        pages: Optional[List[Dict[str, Any]]] = None,
+        map_reduce: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Detect risks using LLM analysis over document windows."""
+        prompt_template = self._load_prompt()
+        
+        # Map: analyze windows concurrently, bounded by the semaphore
+        window_results = await asyncio.gather(*[
+            self._analyze_window(text, start, end, prompt_template, pages)
+            for start, end in self.llm_windows(text, map_reduce)
+        ])
+        
+        # Reduce: merge overlapping duplicates
+        return self.merge_findings(
+            [finding for result in window_results for finding in result]
+        )
+    
+    def _load_prompt(self) -> str:
+        """Load risk analysis prompt."""
         with open("prompts/risk_analysis_prompt.txt", "r") as f:
-            prompt_template = f.read()
+            return f.read()
+    
+    def llm_windows(self, text: str, map_reduce: bool) -> List[Tuple[int, int]]:
+        """Windows sent to the LLM: all of them, or only the first."""
+        windows = self._split_windows(text)
+        return windows if map_reduce else windows[:1]
+    
+    async def _analyze_window(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        prompt_template: str,
+        pages: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Run the risk prompt over one window and return its anchored findings."""
+        result = await self.analyze_window(text, start, end, prompt_template, pages)
+        return result["findings"]
+    
+    async def analyze_window(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        prompt_template: str,
+        pages: Optional[List[Dict[str, Any]]] = None,
+        max_tokens: int = 2000,
+        operation: str = "risk_window"
+    ) -> Dict[str, Any]:
+        """Run a prompt over one window and anchor its findings to document offsets.
         
-        prompt = prompt_template.format(contract_text=text[:10000])
+        Returns the parsed JSON response; "findings" is always present, and
+        "failed" is set when the LLM call or its response could not be used.
+        """
+        window_text = text[start:end]
+        prompt = prompt_template.format(contract_text=window_text)
         
         try:
-            message = await self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            async with load_shedder.llm_call(), self.llm_semaphore:
+                start_time = time.perf_counter()
+                message = await self.client.messages.create(
+                    model="claude-sonnet-4-20250514",
+                    max_tokens=max_tokens,
+                    messages=[{"role": "user", "content": prompt}]
+                )
+                record_llm_call(operation, message, time.perf_counter() - start_time)
             
             response_text = message.content[0].text
             
             # Parse JSON
             json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-                return result.get("findings", [])
+            if not json_match:
+                return {"findings": [], "failed": True}
+            result = json.loads(json_match.group())
         except Exception as e:
-            logger.error(f"LLM risk analysis failed: {str(e)}")
+            logger.error(f"LLM risk analysis failed for window {start}-{end}: {str(e)}")
+            return {"findings": [], "failed": True}
+        
+        result["findings"] = result.get("findings") or []
+        for finding in result["findings"]:
+            span = self._locate_evidence(window_text, finding.get("evidence"))
+            if span:
+                finding["char_start"] = start + span[0]
+                finding["char_end"] = start + span[1]
+                if pages:
+                    finding["page"] = self._page_for_offset(pages, finding["char_start"])
+        
+        return result
+    
+    def _split_windows(self, text: str) -> List[Tuple[int, int]]:
+        """Split text into section-aligned (start, end) windows."""
+        if len(text) <= self.window_size:
+            return [(0, len(text))]
         
-        return []
+        boundaries = [0] + [
+            m.start() for m in SECTION_BOUNDARY_PATTERN.finditer(text) if m.start() > 0
+        ] + [len(text)]
+        
+        windows = []
+        window_start = 0
+        window_end = 0
+        for section_end in boundaries[1:]:
+            if section_end - window_start <= self.window_size:
+                window_end = section_end
+                continue
+            
+            # Close the window at the section boundary unless it is mostly empty
+            if window_end - window_start >= self.window_size // 2:
+                windows.append((window_start, window_end))
+                window_start = window_end
+            
+            # Hard-split sections longer than a window, preferring line breaks
+            while section_end - window_start > self.window_size:
+                cut = text.rfind("\n", window_start + self.window_size // 2, window_start + self.window_size)
+                if cut == -1:
+                    cut = window_start + self.window_size
+                windows.append((window_start, cut))
+                window_start = max(cut - self.window_overlap, window_start + 1)
+            window_end = section_end
+        
+        if window_end > window_start:
+            windows.append((window_start, window_end))
+        
+        return windows
+    
+    def _locate_evidence(
+        self,
+        window_text: str,
+        evidence: Optional[str]
+    ) -> Optional[Tuple[int, int]]:
+        """Find the span of quoted evidence within a window."""
+        if not evidence:
+            return None
+        
+        idx = window_text.find(evidence)
+        if idx != -1:
+            return idx, idx + len(evidence)
+        
+        # LLM quotes often differ in whitespace, case or trailing ellipses
+        words = re.findall(r'\w+', evidence)[:12]
+        if not words:
+            return None
+        pattern = r'\W+'.join(re.escape(w) for w in words)
+        match = re.search(pattern, window_text, re.IGNORECASE)
+        if match:
+            return match.start(), match.end()
+        return None
+    
+    def merge_findings(self, findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Deduplicate findings reported by overlapping windows."""
+        located = sorted(
+            (f for f in findings if f.get("char_start") is not None),
+            key=lambda f: (str(f.get("risk_type", "")).lower(), f["char_start"])
+        )
+        
+        merged = []
+        for finding in located:
+            previous = merged[-1] if merged else None
+            if (
+                previous
+                and str(previous.get("risk_type", "")).lower() == str(finding.get("risk_type", "")).lower()
+                and finding["char_start"] < previous["char_end"]
+            ):
+                if SEVERITY_RANK.get(finding.get("severity"), 0) > SEVERITY_RANK.get(previous.get("severity"), 0):
+                    finding["char_end"] = max(finding["char_end"], previous["char_end"])
+                    finding["char_start"] = previous["char_start"]
+                    merged[-1] = finding
+                else:
+                    previous["char_end"] = max(previous["char_end"], finding["char_end"])
+                continue
+            merged.append(finding)
+        
+        merged.sort(key=lambda f: f["char_start"])
+        
+        # Findings without a locatable span are deduplicated by their text
+        seen = set()
+        for finding in findings:
+            if finding.get("char_start") is not None:
+                continue
+            key = (
+                str(finding.get("risk_type", "")).lower(),
+                " ".join(str(finding.get("evidence") or finding.get("description", "")).lower().split())
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(finding)
+        
+        return merged
+    
+    def _is_duplicate(self, finding: Dict[str, Any], existing: List[Dict[str, Any]]) -> bool:
+        """Whether a finding repeats one already reported by another window."""
+        risk_type = str(finding.get("risk_type", "")).lower()
+        for other in existing:
+            if str(other.get("risk_type", "")).lower() != risk_type:
+                continue
+            if finding.get("char_start") is not None and other.get("char_start") is not None:
+                if finding["char_start"] < other["char_end"] and other["char_start"] < finding["char_end"]:
+                    return True
+            elif " ".join(str(finding.get("evidence", "")).lower().split()) == " ".join(str(other.get("evidence", "")).lower().split()):
+                return True
+        return False
+    
+    def _page_for_offset(self, pages: List[Dict[str, Any]], offset: int) -> Optional[int]:
+        """Map a character offset to its 1-based page number."""
+        starts = [page["char_start"] for page in pages]
+        idx = bisect.bisect_right(starts, offset) - 1
+        if idx < 0:
+            return None
+        return pages[idx]["page_number"]
     
     def _generate_summary(
         self, 
@@ -0,0 +1,226 @@
+import bisect
+import json
+import re
+import time
+from typing import Dict, Any, List, Optional, Iterable
+from functools import lru_cache
+
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.metrics import RULE_EVALUATION_DURATION
+
+CONDITION_OPS = {
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "eq": lambda a, b: a == b,
+}
+
+# Words (hyphenated words count as one) are the unit of the keyword index
+TOKEN_PATTERN = re.compile(r'[A-Za-z][A-Za-z-]*')
+
+class RiskRule:
+    """A compiled declarative risk rule."""
+    
+    def __init__(self, spec: Dict[str, Any]):
+        self.id = spec["id"]
+        self.risk_type = spec.get("risk_type", spec["id"])
+        self.severity = spec["severity"]
+        self.type = spec.get("type", "match")  # match | absence
+        self.keywords = [keyword.lower() for keyword in spec["keywords"]]
+        self.trigger = re.compile(spec["trigger"], re.IGNORECASE)
+        self.pattern = re.compile(spec["pattern"], re.IGNORECASE) if spec.get("pattern") else None
+        self.window = spec.get("window", 500)
+        self.once = spec.get("once", False)
+        self.condition = spec.get("condition")
+        self.description = spec["description"]
+        self.recommendations = spec.get("recommendations")
+    
+    def evaluate(self, text: str, pos: int) -> Optional[Dict[str, Any]]:
+        """Evaluate the rule at a keyword hit, within its bounded window."""
+        trigger = self.trigger.match(text, pos)
+        if not trigger:
+            return None
+        trigger_end = trigger.end()
+        
+        if self.type == "absence":
+            return {}
+        
+        if self.pattern is None:
+            start, end, groups = pos, trigger_end, {}
+        else:
+            match = self.pattern.match(text, pos, min(len(text), pos + self.window))
+            if not match:
+                return None
+            start, end, groups = match.start(), match.end(), match.groupdict()
+        
+        if self.condition:
+            value = groups.get(self.condition["group"])
+            try:
+                if not CONDITION_OPS[self.condition["op"]](int(value), self.condition["value"]):
+                    return None
+            except (TypeError, ValueError):
+                return None
+        
+        return {
+            "rule_id": self.id,
+            "risk_type": self.risk_type,
+            "severity": self.severity,
+            "description": self.description.format(**groups),
+            "evidence": text[start:end],
+            "char_start": start,
+            "char_end": end,
+            "recommendations": self.recommendations
+        }
+    
+    def absence_finding(self) -> Dict[str, Any]:
+        """Finding reported when an absence rule's trigger never appears."""
+        return {
+            "rule_id": self.id,
+            "risk_type": self.risk_type,
+            "severity": self.severity,
+            "description": self.description,
+            "evidence": None,
+            "recommendations": self.recommendations
+        }
+
+class RuleEngine:
+    """Runs a precompiled rule set over text in a single pass.
+    
+    Text is tokenized once and every word is looked up in a keyword index,
+    so scan cost does not grow with the number of rules. A rule's trigger
+    and full pattern are only evaluated at its own keyword hits, anchored
+    and bounded by the rule's window.
+    """
+    
+    def __init__(self, rules_path: Optional[str] = None):
+        with open(rules_path or settings.RISK_RULES_PATH, "r") as f:
+            spec = json.load(f)
+        
+        self.version = spec["version"]
+        self.rules = [RiskRule(rule) for rule in spec["rules"]]
+        
+        # Exact keywords map straight to rules; "word*" keywords match by prefix
+        self._keyword_index: Dict[str, List[RiskRule]] = {}
+        self._prefix_index: Dict[str, List[RiskRule]] = {}
+        for rule in self.rules:
+            for keyword in rule.keywords:
+                if keyword.endswith("*"):
+                    self._prefix_index.setdefault(keyword[:-1], []).append(rule)
+                else:
+                    self._keyword_index.setdefault(keyword, []).append(rule)
+        self._prefix_lengths = sorted({len(prefix) for prefix in self._prefix_index})
+        
+        logger.info(f"Loaded {len(self.rules)} risk rules (version {self.version})")
+    
+    def _candidates(self, word: str) -> List[RiskRule]:
+        """Rules whose keywords match a lowercased word."""
+        candidates = self._keyword_index.get(word, [])
+        for length in self._prefix_lengths:
+            if len(word) < length:
+                break
+            prefixed = self._prefix_index.get(word[:length])
+            if prefixed:
+                candidates = candidates + prefixed
+        return candidates
+    
+    def scan(self, text: str, base_offset: int = 0) -> Dict[str, Any]:
+        """Scan one chunk of text.
+        
+        Returns match findings with offsets shifted by base_offset, the set of
+        rule ids whose trigger fired, and per-rule evaluation time in seconds.
+        """
+        findings = []
+        triggered = set()
+        timings: Dict[str, float] = {}
+        
+        scan_start = time.perf_counter()
+        for token in TOKEN_PATTERN.finditer(text):
+            candidates = self._candidates(token.group().lower())
+            if not candidates:
+                continue
+            
+            for rule in candidates:
+                if rule.type == "absence" and rule.id in triggered:
+                    continue
+                
+                rule_start = time.perf_counter()
+                finding = rule.evaluate(text, token.start())
+                timings[rule.id] = timings.get(rule.id, 0.0) + time.perf_counter() - rule_start
+                
+                if finding is None:
+                    continue
+                triggered.add(rule.id)
+                if finding:
+                    finding["char_start"] += base_offset
+                    finding["char_end"] += base_offset
+                    findings.append(finding)
+        timings["_scan"] = time.perf_counter() - scan_start
+        
+        return {"findings": findings, "triggered": triggered, "timings": timings}
+    
+    def scan_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        pages: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Scan chunks ({"text", "char_start"}) and return document-level findings."""
+        findings = []
+        triggered = set()
+        timings: Dict[str, float] = {}
+        
+        for chunk in chunks:
+            result = self.scan(chunk["text"], chunk.get("char_start") or 0)
+            findings.extend(result["findings"])
+            triggered |= result["triggered"]
+            for rule_id, elapsed in result["timings"].items():
+                timings[rule_id] = timings.get(rule_id, 0.0) + elapsed
+        
+        for rule_id, elapsed in timings.items():
+            RULE_EVALUATION_DURATION.labels(rule_id=rule_id).observe(elapsed)
+        
+        # Overlapping chunks report the same match more than once
+        unique = {}
+        for finding in findings:
+            unique.setdefault((finding["rule_id"], finding["char_start"]), finding)
+        findings = sorted(unique.values(), key=lambda f: f["char_start"])
+        
+        # Rules limited to one finding per document keep the earliest
+        once_rules = {rule.id for rule in self.rules if rule.once}
+        seen_once = set()
+        deduped = []
+        for finding in findings:
+            if finding["rule_id"] in once_rules:
+                if finding["rule_id"] in seen_once:
+                    continue
+                seen_once.add(finding["rule_id"])
+            deduped.append(finding)
+        findings = deduped
+        
+        for rule in self.rules:
+            if rule.type == "absence" and rule.id not in triggered:
+                findings.append(rule.absence_finding())
+        
+        if pages:
+            starts = [page["char_start"] for page in pages]
+            for finding in findings:
+                if finding.get("char_start") is None:
+                    continue
+                idx = bisect.bisect_right(starts, finding["char_start"]) - 1
+                finding["page"] = pages[idx]["page_number"] if idx >= 0 else None
+        
+        return findings
+    
+    def scan_document(
+        self,
+        text: str,
+        pages: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Scan a whole document as a single chunk."""
+        return self.scan_chunks([{"text": text, "char_start": 0}], pages)
+
+@lru_cache(maxsize=1)
+def get_rule_engine() -> RuleEngine:
+    """Return the shared rule engine so every stage uses the same rule set version."""
+    return RuleEngine()
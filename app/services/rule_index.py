@@ -0,0 +1,177 @@
+import asyncio
+from typing import List, Dict, Any, Optional, Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, or_
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Document, RuleFinding
+from app.services.rule_engine import get_rule_engine
+from app.utils.logger import logger
+
+class RuleIndex:
+    """Stores rule-based findings per document, tagged with the rule set version.
+    
+    Rule findings are deterministic on chunk text, so they are computed once
+    at ingest and read back on rules-only audits until the rule set changes.
+    """
+    
+    def __init__(self):
+        self.rule_engine = get_rule_engine()
+    
+    @property
+    def version(self) -> str:
+        return self.rule_engine.version
+    
+    async def index_document(
+        self,
+        db: AsyncSession,
+        document: Document,
+        chunks: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Scan a document's chunks and replace its stored rule findings.
+        
+        Chunks need char_start/char_end into document.text_content; the
+        caller commits.
+        """
+        text = document.text_content or ""
+        # A whole-document scan is CPU-bound; keep it off the event loop
+        findings = await asyncio.to_thread(
+            self.rule_engine.scan_chunks,
+            (
+                {"text": text[chunk["char_start"]:chunk["char_end"]], "char_start": chunk["char_start"]}
+                for chunk in chunks
+            ),
+            document.page_offsets
+        )
+        
+        await db.execute(
+            delete(RuleFinding).where(RuleFinding.document_id == document.document_id)
+        )
+        db.add_all([
+            RuleFinding(
+                document_id=document.document_id,
+                ruleset_version=self.version,
+                rule_id=finding["rule_id"],
+                risk_type=finding["risk_type"],
+                severity=finding["severity"],
+                description=finding["description"],
+                evidence=finding.get("evidence"),
+                page_number=finding.get("page"),
+                char_start=finding.get("char_start"),
+                char_end=finding.get("char_end"),
+                recommendations=finding.get("recommendations")
+            )
+            for finding in findings
+        ])
+        document.ruleset_version = self.version
+        
+        return findings
+    
+    async def get_findings(
+        self,
+        db: AsyncSession,
+        document: Document
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return stored rule findings, or None if they are missing or stale."""
+        if document.ruleset_version != self.version:
+            return None
+        
+        result = await db.execute(
+            select(RuleFinding)
+            .where(
+                RuleFinding.document_id == document.document_id,
+                RuleFinding.ruleset_version == self.version
+            )
+            .order_by(RuleFinding.id)
+        )
+        return [self.format_finding(row) for row in result.scalars().all()]
+    
+    async def get_or_index_findings(
+        self,
+        db: AsyncSession,
+        document: Document
+    ) -> List[Dict[str, Any]]:
+        """Return stored rule findings, rescanning the document first if stale."""
+        findings = await self.get_findings(db, document)
+        if findings is not None:
+            return findings
+        
+        findings = await self.index_document(db, document, self._whole_document(document))
+        await db.commit()
+        return findings
+    
+    async def rescan_stale(self, batch_size: int, failed: Optional[Set[str]] = None) -> int:
+        """Re-index documents whose rule findings predate the current rule set.
+        
+        The batch is locked with SKIP LOCKED so workers running the loop
+        concurrently take different documents. A document that fails is
+        rolled back on its own, logged and added to failed, which later
+        batches skip. Returns the number of documents taken.
+        """
+        failed = set() if failed is None else failed
+        async with AsyncSessionLocal() as db:
+            query = (
+                select(Document)
+                .where(or_(
+                    Document.ruleset_version.is_(None),
+                    Document.ruleset_version != self.version
+                ))
+                .order_by(Document.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            if failed:
+                query = query.where(Document.document_id.notin_(failed))
+            result = await db.execute(query)
+            documents = result.scalars().all()
+            
+            indexed = 0
+            for document in documents:
+                # Read before a rollback expires the instance
+                document_id = document.document_id
+                try:
+                    async with db.begin_nested():
+                        await self.index_document(db, document, self._whole_document(document))
+                    indexed += 1
+                except Exception as e:
+                    failed.add(document_id)
+                    logger.error(f"Rule findings rescan failed for document {document_id}: {str(e)}")
+            await db.commit()
+        
+        if indexed:
+            logger.info(f"Re-indexed rule findings for {indexed} documents (rule set {self.version})")
+        return len(documents)
+    
+    async def run_rescan_loop(self, interval_seconds: int):
+        """Background job: keep every document's rule findings on the current rule set."""
+        while True:
+            try:
+                # Drain the backlog in batches, then wait for the next interval;
+                # documents that fail are retried on the next pass only
+                failed: Set[str] = set()
+                while await self.rescan_stale(settings.RULE_RESCAN_BATCH_SIZE, failed) == settings.RULE_RESCAN_BATCH_SIZE:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Rule findings rescan failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+    
+    def _whole_document(self, document: Document) -> List[Dict[str, Any]]:
+        """A single chunk spanning the stored text, for rescans outside ingest."""
+        return [{"char_start": 0, "char_end": len(document.text_content or "")}]
+    
+    @staticmethod
+    def format_finding(row: RuleFinding) -> Dict[str, Any]:
+        return {
+            "rule_id": row.rule_id,
+            "risk_type": row.risk_type,
+            "severity": row.severity,
+            "description": row.description,
+            "evidence": row.evidence,
+            "page": row.page_number,
+            "char_start": row.char_start,
+            "char_end": row.char_end,
+            "recommendations": row.recommendations
+        }
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import WebhookSubscription
+from app.utils.logger import logger
+from app.utils.redis_client import get_redis
+
+INVALIDATION_CHANNEL = "webhook:subscriptions:invalidate"
+
+class SubscriptionRoutes:
+    """In-process routing table from event type to active subscription ids.
+
+    The full table is built at startup. After an invalidation (subscription
+    created or deleted here, or announced by another worker over Redis
+    pub/sub) entries are refilled per event type with a query on the GIN
+    index over event_types. Entries also expire after a TTL in case an
+    invalidation message is missed.
+    """
+
+    def __init__(self):
+        self.ttl = settings.WEBHOOK_ROUTES_TTL_SECONDS
+        self._routes: Dict[str, List[int]] = {}
+        self._complete = False  # Every event type is in _routes
+        self._loaded_at = 0.0
+        self._generation = 0
+
+    async def subscribers(self, event_type: str) -> List[int]:
+        """Active subscription ids for an event type."""
+        if time.monotonic() - self._loaded_at > self.ttl:
+            self._clear()
+
+        routes = self._routes.get(event_type)
+        if routes is not None:
+            return routes
+        if self._complete:
+            return []
+
+        generation = self._generation
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(WebhookSubscription.id).where(
+                    WebhookSubscription.active == 1,
+                    WebhookSubscription.event_types.contains([event_type])
+                )
+            )
+            routes = list(result.scalars().all())
+
+        # Drop the result if the table was invalidated while querying
+        if generation == self._generation:
+            self._routes[event_type] = routes
+        return routes
+
+    async def load(self):
+        """Build the full table from all active subscriptions."""
+        generation = self._generation
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(WebhookSubscription.id, WebhookSubscription.event_types)
+                .where(WebhookSubscription.active == 1)
+            )
+            routes: Dict[str, List[int]] = defaultdict(list)
+            for row in result:
+                for event_type in row.event_types or []:
+                    routes[event_type].append(row.id)
+
+        if generation == self._generation:
+            self._routes = dict(routes)
+            self._complete = True
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded webhook routes for {len(routes)} event types")
+
+    async def invalidate(self):
+        """Drop the table here and in every other worker."""
+        self._clear()
+        try:
+            await get_redis().publish(INVALIDATION_CHANNEL, "1")
+        except Exception as e:
+            logger.warning(f"Webhook route invalidation not published: {str(e)}")
+
+    async def run(self):
+        """Background job: build the table, then follow invalidations from other workers."""
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Loading webhook routes failed: {str(e)}")
+
+        while True:
+            try:
+                pubsub = get_redis().pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                try:
+                    # Poll rather than listen: an idle subscription would hit the socket timeout
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message and message["type"] == "message":
+                            self._clear()
+                finally:
+                    await pubsub.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Webhook route invalidation listener failed: {str(e)}")
+            # Anything may have changed while disconnected
+            self._clear()
+            await asyncio.sleep(5)
+
+    def _clear(self):
+        self._generation += 1
+        self._routes = {}
+        self._complete = False
+        self._loaded_at = time.monotonic()
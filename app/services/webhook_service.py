@@ -1,29 +1,271 @@
+import asyncio
 import httpx
 import hashlib
 import hmac
 import json
-from typing import Dict, Any, List
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models import WebhookSubscription
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from sqlalchemy import select, insert, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import WebhookSubscription, WebhookDelivery
+from app.services.webhook_routes import SubscriptionRoutes
 from app.utils.logger import logger
+from app.utils.metrics import WEBHOOK_DELIVERIES, WEBHOOK_DELIVERY_DURATION
+
+# (deliveries, error or None on success, whether a failure may be retried)
+DeliveryOutcome = Tuple[List[WebhookDelivery], Optional[str], bool]
 
 class WebhookService:
+    """Webhook delivery through a durable outbox.
+
+    dispatch_event only writes one outbox row per matching subscription, so
+    request latency never depends on subscribers. A background dispatcher
+    claims due rows, POSTs them over a pooled HTTP client with per-endpoint
+    concurrency limits and HMAC signatures, and retries failures with
+    exponential backoff until they are dead-lettered.
+    """
+
     def __init__(self):
-        self.client = httpx.AsyncClient(timeout=10.0)
-    
+        self.routes = SubscriptionRoutes()
+        self.client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._endpoint_limits: Dict[str, asyncio.Semaphore] = {}
+
     async def dispatch_event(
         self,
         event_type: str,
         payload: Dict[str, Any]
     ):
-        """Dispatch webhook event to all subscribers."""
-        # This is a simplified version
-        # In production, you'd use a task queue like Celery
-        
-        # For now, we'll just log the event
-        logger.info(f"Webhook event: {event_type} - {payload}")
-    
+        """Queue webhook event for all subscribers."""
+        try:
+            subscription_ids = await self.routes.subscribers(event_type)
+            if not subscription_ids:
+                return
+
+            event_id = str(uuid.uuid4())
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    insert(WebhookDelivery),
+                    [
+                        {
+                            "subscription_id": subscription_id,
+                            "event_id": event_id,
+                            "event_type": event_type,
+                            "payload": payload,
+                            "status": "pending",
+                            "attempts": 0,
+                            "next_attempt_at": _utcnow()
+                        }
+                        for subscription_id in subscription_ids
+                    ]
+                )
+                await db.commit()
+        except Exception as e:
+            # A notification failure must not fail the operation it reports on
+            logger.error(f"Failed to queue webhook event {event_type}: {str(e)}")
+            return
+
+        logger.info(f"Webhook event: {event_type} queued for {len(subscription_ids)} subscribers")
+        self._wakeup.set()
+
+    def start(self):
+        """Start the background dispatcher."""
+        if self._task:
+            return
+        self.client = httpx.AsyncClient(
+            timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS
+            )
+        )
+        self._task = asyncio.create_task(self.run_dispatcher())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    def wake(self):
+        """Check for due deliveries now instead of at the next poll."""
+        self._wakeup.set()
+
+    async def run_dispatcher(self):
+        """Background job: deliver due outbox rows until cancelled."""
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Webhook dispatch failed: {str(e)}")
+                claimed = 0
+
+            # Keep draining a backlog; otherwise wait for new events or the next poll
+            if claimed >= settings.WEBHOOK_CLAIM_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), settings.WEBHOOK_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch_due(self) -> int:
+        """Claim due deliveries, send them and record the outcomes; returns the number claimed."""
+        deliveries, subscriptions = await self._claim()
+        if not deliveries:
+            return 0
+
+        by_subscription: Dict[int, List[WebhookDelivery]] = defaultdict(list)
+        for delivery in deliveries:
+            by_subscription[delivery.subscription_id].append(delivery)
+
+        batch_size = max(1, settings.WEBHOOK_BATCH_MAX_EVENTS)
+        outcomes = await asyncio.gather(*[
+            self.deliver(subscriptions.get(subscription_id), group[start:start + batch_size])
+            for subscription_id, group in by_subscription.items()
+            for start in range(0, len(group), batch_size)
+        ])
+
+        await self._record(outcomes)
+        return len(deliveries)
+
+    async def _claim(self) -> Tuple[List[WebhookDelivery], Dict[int, WebhookSubscription]]:
+        now = _utcnow()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(WebhookDelivery)
+                .where(WebhookDelivery.status == "pending", WebhookDelivery.next_attempt_at <= now)
+                .order_by(WebhookDelivery.id)
+                .limit(settings.WEBHOOK_CLAIM_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            deliveries = list(result.scalars().all())
+            if not deliveries:
+                return [], {}
+
+            result = await db.execute(
+                select(WebhookSubscription).where(
+                    WebhookSubscription.id.in_({delivery.subscription_id for delivery in deliveries})
+                )
+            )
+            subscriptions = {subscription.id: subscription for subscription in result.scalars().all()}
+
+            # Lease the rows so other dispatchers skip them while they are in flight,
+            # for as long as the slowest endpoint's share can take to send
+            per_url: Dict[str, int] = defaultdict(int)
+            for delivery in deliveries:
+                subscription = subscriptions.get(delivery.subscription_id)
+                if subscription is not None:
+                    per_url[subscription.url] += 1
+            await db.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id.in_([delivery.id for delivery in deliveries]))
+                .values(next_attempt_at=now + timedelta(seconds=claim_lease_seconds(per_url.values())))
+            )
+            await db.commit()
+
+        return deliveries, subscriptions
+
+    async def deliver(
+        self,
+        subscription: Optional[WebhookSubscription],
+        deliveries: List[WebhookDelivery]
+    ) -> DeliveryOutcome:
+        """POST one event, or a batch of events, to a subscription."""
+        if subscription is None or not subscription.active:
+            return deliveries, "Subscription inactive", False
+
+        events = [self._event(delivery) for delivery in deliveries]
+        if settings.WEBHOOK_BATCH_MAX_EVENTS > 1:
+            body = json.dumps({"events": events})
+            event_header = "batch"
+        else:
+            body = json.dumps(events[0])
+            event_header = events[0]["type"]
+
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            "X-Webhook-Event": event_header,
+            "X-Webhook-Timestamp": timestamp
+        }
+        if subscription.secret:
+            signature = self._create_signature(f"{timestamp}.{body}", subscription.secret)
+            headers["X-Webhook-Signature"] = f"sha256={signature}"
+
+        async with self._endpoint_limit(subscription.url):
+            start_time = time.time()
+            try:
+                # Bound the whole POST, not just each read, so claim leases hold
+                response = await asyncio.wait_for(
+                    self.client.post(subscription.url, content=body, headers=headers),
+                    settings.WEBHOOK_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                return deliveries, "Timed out", True
+            except httpx.HTTPError as e:
+                return deliveries, f"{type(e).__name__}: {str(e)}", True
+            finally:
+                WEBHOOK_DELIVERY_DURATION.observe(time.time() - start_time)
+
+        if response.is_success:
+            return deliveries, None, False
+        return deliveries, f"HTTP {response.status_code}", True
+
+    async def _record(self, outcomes: List[DeliveryOutcome]):
+        now = _utcnow()
+        rows = []
+        for deliveries, error, retry in outcomes:
+            for delivery in deliveries:
+                attempts = delivery.attempts + 1
+                row = {"id": delivery.id, "attempts": attempts, "last_error": error}
+                if error is None:
+                    row.update(status="delivered", delivered_at=now)
+                    WEBHOOK_DELIVERIES.labels(outcome="delivered").inc()
+                elif retry and attempts < settings.WEBHOOK_MAX_ATTEMPTS:
+                    row.update(next_attempt_at=now + timedelta(seconds=backoff_delay(attempts)))
+                    WEBHOOK_DELIVERIES.labels(outcome="retry").inc()
+                else:
+                    row.update(status="dead")
+                    WEBHOOK_DELIVERIES.labels(outcome="dead").inc()
+                    logger.warning(
+                        f"Webhook delivery {delivery.id} dead-lettered after {attempts} attempts: {error}"
+                    )
+                rows.append(row)
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(WebhookDelivery), rows)
+            await db.commit()
+
+    def _endpoint_limit(self, url: str) -> asyncio.Semaphore:
+        limit = self._endpoint_limits.get(url)
+        if limit is None:
+            limit = asyncio.Semaphore(settings.WEBHOOK_PER_ENDPOINT_CONCURRENCY)
+            self._endpoint_limits[url] = limit
+        return limit
+
+    @staticmethod
+    def _event(delivery: WebhookDelivery) -> Dict[str, Any]:
+        return {
+            "id": delivery.event_id,
+            "type": delivery.event_type,
+            "created_at": delivery.created_at.isoformat() if delivery.created_at else None,
+            "data": delivery.payload
+        }
+
     def _create_signature(self, payload: str, secret: str) -> str:
         """Create HMAC signature for webhook payload."""
         return hmac.new(
@@ -32,3 +274,29 @@ class WebhookService:
             hashlib.sha256
         ).hexdigest()
 
+def claim_lease_seconds(deliveries_per_url: Iterable[int]) -> float:
+    """Lease for claimed rows: the slowest endpoint's worst-case send time plus a margin.
+    
+    Each endpoint sends its rows in POSTs of up to WEBHOOK_BATCH_MAX_EVENTS,
+    WEBHOOK_PER_ENDPOINT_CONCURRENCY at a time, each bounded by the timeout.
+    """
+    batch_size = max(1, settings.WEBHOOK_BATCH_MAX_EVENTS)
+    concurrency = max(1, settings.WEBHOOK_PER_ENDPOINT_CONCURRENCY)
+    rounds = max(
+        (math.ceil(math.ceil(count / batch_size) / concurrency) for count in deliveries_per_url),
+        default=0
+    )
+    return settings.WEBHOOK_CLAIM_LEASE_SECONDS + rounds * settings.WEBHOOK_TIMEOUT_SECONDS
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter before the next attempt."""
+    delay = min(
+        settings.WEBHOOK_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.WEBHOOK_BACKOFF_MAX_SECONDS
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+webhook_service = WebhookService()
@@ -0,0 +1,66 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.config import settings
+from app.utils.metrics import EVENT_LOOP_LAG, LLM_PENDING
+
+class LoadShedder:
+    """Tracks how overloaded this worker is.
+
+    Event loop lag is measured by a background task as how late a short sleep
+    wakes up, smoothed so one slow callback does not trip it. LLM backlog
+    counts calls waiting for a concurrency slot or in flight. While either is
+    over its threshold, heavy requests are refused early with 503 so the ones
+    already admitted keep their latency.
+    """
+
+    def __init__(self):
+        self.interval = settings.LOAD_SHED_SAMPLE_INTERVAL_MS / 1000
+        self.max_loop_lag = settings.LOAD_SHED_MAX_LOOP_LAG_MS / 1000
+        self.max_llm_pending = settings.LOAD_SHED_MAX_LLM_PENDING
+        self.loop_lag = 0.0
+        self.llm_pending = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def overloaded(self) -> Optional[str]:
+        """Reason to shed load now, or None."""
+        if self.loop_lag > self.max_loop_lag:
+            return "loop_lag"
+        if self.llm_pending >= self.max_llm_pending:
+            return "llm_backlog"
+        return None
+
+    @asynccontextmanager
+    async def llm_call(self):
+        """Count an LLM call from before it queues for a slot until it finishes."""
+        self.llm_pending += 1
+        LLM_PENDING.inc()
+        try:
+            yield
+        finally:
+            self.llm_pending -= 1
+            LLM_PENDING.dec()
+
+    def observe_lag(self, lag: float):
+        self.loop_lag = 0.5 * self.loop_lag + 0.5 * max(0.0, lag)
+        EVENT_LOOP_LAG.set(self.loop_lag)
+
+    async def _monitor(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.observe_lag(time.perf_counter() - start - self.interval)
+
+load_shedder = LoadShedder()
@@ -1,33 +1,92 @@
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
 import re
-from typing import Any
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from app.config import settings
 
 class PIIRedactor(logging.Filter):
     """Filter to redact PII from logs."""
-    
-    PII_PATTERNS = [
-        (r'\b\d{3}-\d{2}-\d{4}\b', '[SSN]'),  # SSN
-        (r'\b\d{16}\b', '[CARD]'),  # Credit card
-        (r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]'),  # Email
-        (r'\b\d{3}-\d{3}-\d{4}\b', '[PHONE]'),  # Phone
-    ]
-    
+
+    PII_PATTERNS = {
+        'SSN': r'\b\d{3}-\d{2}-\d{4}\b',
+        'CARD': r'\b\d{16}\b',
+        'EMAIL': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+        'PHONE': r'\b\d{3}-\d{3}-\d{4}\b',
+    }
+
+    # One pass over the message; the matching group names the replacement
+    PII_REGEX = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in PII_PATTERNS.items()))
+
+    @classmethod
+    def redact(cls, message: str) -> str:
+        return cls.PII_REGEX.sub(lambda match: f'[{match.lastgroup}]', message)
+
     def filter(self, record: logging.LogRecord) -> bool:
-        message = record.getMessage()
-        for pattern, replacement in self.PII_PATTERNS:
-            message = re.sub(pattern, replacement, message)
-        record.msg = message
+        record.msg = self.redact(record.getMessage())
+        record.args = None
         return True
 
-# Configure logger
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler()
-    ]
-)
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class LogQueueHandler(QueueHandler):
+    """Queues records with the message rendered and the traceback kept separate."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _build_handlers():
+    if settings.LOG_FORMAT == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    handlers = [logging.StreamHandler()]
+    if settings.LOG_FILE:
+        os.makedirs(os.path.dirname(settings.LOG_FILE) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(settings.LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+# Configure logger: records are queued and written by a background thread,
+# so request handlers never block on stream or disk I/O
+log_queue = queue.SimpleQueue()
+queue_handler = LogQueueHandler(log_queue)
+if settings.LOG_PII_REDACTION:
+    queue_handler.addFilter(PIIRedactor())
+
+listener = QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
 
 logger = logging.getLogger('contract_intelligence')
-logger.addFilter(PIIRedactor())
\ No newline at end of file
+logger.setLevel(settings.LOG_LEVEL)  # Disabled levels return before a record is created
+logger.addHandler(queue_handler)
+logger.propagate = False
@@ -1,6 +1,15 @@
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import (
+    Counter, Histogram, Gauge, CollectorRegistry, REGISTRY, generate_latest, multiprocess
+)
+from contextlib import contextmanager
+import os
 import time
 
+from app.utils.tracing import span, record_span
+
+# Set by the launcher (and wiped before workers start) to aggregate all workers
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
 # Request metrics
 REQUEST_COUNT = Counter(
     'http_requests_total',
@@ -37,5 +46,140 @@ AUDITS_COMPLETED = Counter(
 
 ACTIVE_CONNECTIONS = Gauge(
     'active_connections',
-    'Number of active connections'
-)    
\ No newline at end of file
+    'Number of in-flight HTTP requests',
+    multiprocess_mode='livesum'
+)
+
+# Pipeline metrics
+STAGE_DURATION = Histogram(
+    'pipeline_stage_duration_seconds',
+    'Time spent in each pipeline stage',
+    ['stage'],  # pdf_parse, chunking, db_insert, vector_search, context_build
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+EMBEDDING_DURATION = Histogram(
+    'embedding_duration_seconds',
+    'Time spent embedding one call, by batch size',
+    ['batch_size'],  # 1, 2-8, 9-32, 33-128, 129+
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    'llm_request_duration_seconds',
+    'Total LLM call latency',
+    ['operation'],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    'llm_time_to_first_token_seconds',
+    'Time until the first streamed LLM token',
+    ['operation'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+)
+
+LLM_TOKENS = Counter(
+    'llm_tokens_total',
+    'LLM tokens used',
+    ['operation', 'direction']  # input, output
+)
+
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total',
+    'Cache lookups by outcome',
+    ['cache', 'result']  # hit, miss
+)
+
+RULE_EVALUATION_DURATION = Histogram(
+    'risk_rule_evaluation_seconds',
+    'Time spent evaluating each risk rule per scan',
+    ['rule_id'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+)
+
+ENRICHMENT_QUEUE_DEPTH = Gauge(
+    'enrichment_queue_depth',
+    'Documents waiting for background extraction and audit',
+    multiprocess_mode='livesum'
+)
+
+WEBHOOK_DELIVERIES = Counter(
+    'webhook_deliveries_total',
+    'Webhook delivery attempts by outcome',
+    ['outcome']  # delivered, retry, dead
+)
+
+WEBHOOK_DELIVERY_DURATION = Histogram(
+    'webhook_delivery_duration_seconds',
+    'Time spent POSTing one webhook request'
+)
+
+REQUESTS_REJECTED = Counter(
+    'http_requests_rejected_total',
+    'Requests rejected before reaching a handler',
+    ['reason']  # rate_limited, loop_lag, llm_backlog
+)
+
+EVENT_LOOP_LAG = Gauge(
+    'event_loop_lag_seconds',
+    'Smoothed event loop scheduling delay',
+    multiprocess_mode='max'
+)
+
+LLM_PENDING = Gauge(
+    'llm_requests_pending',
+    'LLM calls waiting for a slot or in flight',
+    multiprocess_mode='livesum'
+)
+
+@contextmanager
+def time_stage(stage: str):
+    """Observe the duration of a pipeline stage, also as a trace span."""
+    start_time = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    finally:
+        STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start_time)
+
+def batch_size_label(size: int) -> str:
+    """Bucket a batch size so the label set stays small."""
+    for upper, label in ((1, "1"), (8, "2-8"), (32, "9-32"), (128, "33-128")):
+        if size <= upper:
+            return label
+    return "129+"
+
+def record_llm_call(operation: str, message, duration: float):
+    """Record latency and token usage of a completed LLM call."""
+    LLM_REQUEST_DURATION.labels(operation=operation).observe(duration)
+    usage = getattr(message, "usage", None)
+    if usage:
+        LLM_TOKENS.labels(operation=operation, direction="input").inc(usage.input_tokens)
+        LLM_TOKENS.labels(operation=operation, direction="output").inc(usage.output_tokens)
+        record_span(
+            f"llm.{operation}",
+            duration,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens
+        )
+    else:
+        record_span(f"llm.{operation}", duration)
+
+def route_template(request) -> str:
+    """Matched route path (e.g. /api/v1/webhook/events/{webhook_id}) for labels."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def render_metrics() -> bytes:
+    """Metrics of this worker, or of all workers in multiprocess mode."""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def mark_worker_dead():
+    """Drop this worker's live gauges from the multiprocess aggregate on shutdown."""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,133 @@
+import asyncio
+import cProfile
+import hmac
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+_request_counter = itertools.count(1)
+
+class RequestProfiler:
+    """Profiles one request.
+
+    cProfile gives deterministic per-function totals (saved as pstats) and a
+    background thread samples every thread's stack for a flamegraph-compatible
+    collapsed-stack file. Both see everything the process runs meanwhile, so
+    only one request is profiled at a time. If a response is abandoned before
+    its body is sent, a watchdog stops the profiler after PROFILE_MAX_SECONDS
+    so the slot is not held forever.
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self):
+        self.profile_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self._profile = cProfile.Profile()
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._watchdog: Optional[asyncio.TimerHandle] = None
+        self._stopped = False
+
+    def start(self) -> bool:
+        """Start profiling from the event loop; False if another request is being profiled."""
+        if not self._active.acquire(blocking=False):
+            return False
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        self._watchdog = asyncio.get_running_loop().call_later(settings.PROFILE_MAX_SECONDS, self.stop)
+        self._profile.enable()
+        return True
+
+    def stop(self):
+        """Stop profiling and free the slot; safe to call more than once.
+
+        The sampler is only signalled here; save waits for it off the event loop.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        self._profile.disable()
+        self._stop.set()
+        if self._watchdog:
+            self._watchdog.cancel()
+        self._active.release()
+
+    async def save(self, **meta: Any):
+        await asyncio.to_thread(self._save, meta)
+
+    def _sample(self):
+        interval = settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        while not self._stop.wait(interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+
+    def _save(self, meta: Dict[str, Any]):
+        self._sampler.join()
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        base = os.path.join(settings.PROFILE_DIR, self.profile_id)
+
+        self._profile.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", "w") as f:
+            for stack, count in self._stacks.items():
+                f.write(f"{stack} {count}\n")
+        with open(f"{base}.json", "w") as f:
+            json.dump({"profile_id": self.profile_id, "started_at": self.started_at, **meta}, f)
+
+        _prune(settings.PROFILE_MAX_STORED)
+
+def should_profile(headers, query_params) -> bool:
+    """Profile on an admin's explicit request, or every Nth request when sampling."""
+    if headers.get("x-profile") == "1" or query_params.get("profile") == "1":
+        return is_admin_key(headers.get("x-admin-key"))
+    every = settings.PROFILE_SAMPLE_EVERY_N
+    return every > 0 and next(_request_counter) % every == 0
+
+def is_admin_key(key: Optional[str]) -> bool:
+    return bool(settings.ADMIN_API_KEY and key and hmac.compare_digest(key, settings.ADMIN_API_KEY))
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Stored profile metadata, newest first."""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(settings.PROFILE_DIR):
+        if name.endswith(".json"):
+            with open(os.path.join(settings.PROFILE_DIR, name)) as f:
+                profiles.append(json.load(f))
+    return sorted(profiles, key=lambda profile: profile["started_at"], reverse=True)
+
+def profile_path(profile_id: str, extension: str) -> Optional[str]:
+    # Ids are generated hex strings; anything else cannot name a stored file
+    if not profile_id.isalnum():
+        return None
+    path = os.path.join(settings.PROFILE_DIR, f"{profile_id}.{extension}")
+    return path if os.path.isfile(path) else None
+
+def _prune(keep: int):
+    profiles = list_profiles()
+    for profile in profiles[keep:]:
+        for extension in ("json", "pstats", "collapsed"):
+            path = profile_path(profile["profile_id"], extension)
+            if path:
+                os.remove(path)
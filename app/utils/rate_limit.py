@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.redis_client import get_redis
+
+API_PREFIX = "/api/v1"
+
+# Refill and take cost tokens atomically; returns seconds until enough are available (0 if taken)
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = redis.call('time')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local state = redis.call('hmget', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('expire', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+class RateLimiter:
+    """Token buckets per client, refilled at RATE_LIMIT_PER_MINUTE.
+
+    With the Redis backend all workers share a client's bucket; if Redis is
+    unreachable or slow each worker falls back to its own in-process buckets
+    rather than letting traffic through unmetered or waiting on Redis, and
+    stays local for RATE_LIMIT_REDIS_RETRY_SECONDS before trying again.
+    """
+
+    _LOCAL_MAX_BUCKETS = 10000
+
+    def __init__(self, namespace: str = "ratelimit"):
+        self.namespace = namespace
+        self.rate = settings.RATE_LIMIT_PER_MINUTE / 60
+        self.capacity = settings.RATE_LIMIT_BURST or settings.RATE_LIMIT_PER_MINUTE
+        self.use_redis = settings.RATE_LIMIT_BACKEND == "redis"
+        # Longest prefix first so e.g. /audit/batch wins over /audit
+        self.costs: List[Tuple[str, int]] = sorted(
+            settings.RATE_LIMIT_ENDPOINT_COSTS.items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.redis_timeout = settings.RATE_LIMIT_REDIS_TIMEOUT_MS / 1000
+        self.redis_retry_after = settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+        self._redis_down_until = 0.0
+        self._script = None
+
+    def cost(self, path: str) -> int:
+        """Tokens a request to path costs; 0 for paths outside the API (health, metrics, docs).
+        
+        Prefixes may contain {param} segments matching any one path segment,
+        e.g. /documents/{document_id}/revisions.
+        """
+        if not path.startswith(API_PREFIX + "/"):
+            return 0
+        segments = path[len(API_PREFIX):].strip("/").split("/")
+        for prefix, cost in self.costs:
+            if _matches_prefix(prefix.strip("/").split("/"), segments):
+                return cost
+        return 1
+
+    @staticmethod
+    def client_key(api_key: Optional[str], client_host: Optional[str]) -> str:
+        """Bucket per API key (hashed, never stored in clear), else per client address."""
+        if api_key:
+            return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+        return f"ip:{client_host or 'unknown'}"
+
+    async def acquire(self, client: str, cost: int) -> float:
+        """Take cost tokens; returns 0 if allowed, else seconds to wait."""
+        # A request costing more than the bucket holds must still be possible
+        cost = min(cost, self.capacity)
+        if self.use_redis and time.monotonic() >= self._redis_down_until:
+            try:
+                if self._script is None:
+                    # Sent once, then called by SHA
+                    self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+                wait = await asyncio.wait_for(
+                    self._script(keys=[f"{self.namespace}:{client}"], args=[self.capacity, self.rate, cost]),
+                    self.redis_timeout
+                )
+                return float(wait)
+            except Exception as e:
+                self._redis_down_until = time.monotonic() + self.redis_retry_after
+                logger.warning(
+                    f"Rate limiter using local buckets for {self.redis_retry_after}s: "
+                    f"{str(e) or type(e).__name__}"
+                )
+        return self._acquire_local(client, cost)
+
+    def _acquire_local(self, client: str, cost: int) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+
+        if len(self._buckets) > self._LOCAL_MAX_BUCKETS:
+            self._prune(now)
+        return wait
+
+    def _prune(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket
+        full_after = self.capacity / self.rate
+        self._buckets = {
+            client: state for client, state in self._buckets.items()
+            if now - state[1] < full_after
+        }
+
+def _matches_prefix(prefix: List[str], segments: List[str]) -> bool:
+    return len(prefix) <= len(segments) and all(
+        part == segment or (part.startswith("{") and part.endswith("}"))
+        for part, segment in zip(prefix, segments)
+    )
+
+def retry_after_header(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
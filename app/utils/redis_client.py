@@ -0,0 +1,35 @@
+import redis.asyncio as aioredis
+from typing import Optional
+
+from app.config import settings
+
+_client: Optional[aioredis.Redis] = None
+
+def get_redis() -> aioredis.Redis:
+    """Return the shared async Redis client, created on first use.
+
+    All caches, locks and pub/sub share one bounded pool; callers wait up to
+    REDIS_POOL_TIMEOUT_SECONDS for a free connection instead of opening more.
+    Commands fail after REDIS_SOCKET_TIMEOUT_SECONDS, so a Redis that hangs
+    after connecting degrades callers to their uncached path.
+    """
+    global _client
+    if _client is None:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            health_check_interval=30,
+            decode_responses=True
+        )
+        _client = aioredis.Redis(connection_pool=pool)
+    return _client
+
+async def close_redis():
+    """Close the shared client and its pool on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.close(close_connection_pool=True)
+        _client = None
@@ -3,6 +3,7 @@ from fastapi.security import APIKeyHeader
 from app.config import settings
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
 
 async def verify_api_key(api_key: str = Security(api_key_header)):
     """Verify API key from header."""
@@ -11,4 +12,13 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
         )
-    return api_key
\ No newline at end of file
+    return api_key
+
+async def verify_admin_key(admin_key: str = Security(admin_key_header)):
+    """Verify admin key from header; admin endpoints are off without ADMIN_API_KEY."""
+    if not settings.ADMIN_API_KEY or admin_key != settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key"
+        )
+    return admin_key
\ No newline at end of file
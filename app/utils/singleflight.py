@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.utils.logger import logger
+from app.utils.redis_client import get_redis
+
+# Delete the lock only if this worker still holds it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class SingleFlight:
+    """Coalesces concurrent identical calls onto one in-flight computation.
+
+    Callers in the same process with the same key await the same task. Across
+    workers, a Redis lock elects one leader; the other workers wait for the
+    leader's result, published under its lock token for a short TTL. If Redis
+    is unavailable, coalescing falls back to in-process only.
+    """
+
+    def __init__(self, namespace: str, poll_interval: float = 0.1):
+        self.namespace = namespace
+        self.poll_interval = poll_interval
+        self.lock_ttl = settings.SINGLEFLIGHT_LOCK_TTL_SECONDS
+        self.result_ttl = settings.SINGLEFLIGHT_RESULT_TTL_SECONDS
+        self.use_redis = settings.SINGLEFLIGHT_REDIS_ENABLED
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable key for an operation and its inputs."""
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda value: value
+    ) -> Any:
+        """Run fn once per key among concurrent callers and share its result.
+
+        encode/decode convert the result to and from JSON-compatible data for
+        callers waiting in other workers.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn, encode, decode))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # A cancelled caller must not cancel the computation others await
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved when no caller is left to await it
+
+    async def _run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any]
+    ) -> Any:
+        if not self.use_redis:
+            return await fn()
+
+        redis = get_redis()
+        lock_key = f"singleflight:{self.namespace}:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = await redis.set(lock_key, token, nx=True, px=self.lock_ttl * 1000)
+            leader_token = token if acquired else await redis.get(lock_key)
+        except Exception as e:
+            logger.warning(f"Singleflight lock unavailable, running locally: {str(e)}")
+            return await fn()
+
+        if acquired:
+            return await self._lead(lock_key, token, fn, encode)
+
+        # Another worker is computing: wait for its result or for the lock to go
+        if leader_token:
+            result = await self._follow(lock_key, leader_token)
+            if result is not None:
+                return decode(json.loads(result))
+        return await fn()
+
+    async def _lead(
+        self,
+        lock_key: str,
+        token: str,
+        fn: Callable[[], Awaitable[Any]],
+        encode: Callable[[Any], Any]
+    ) -> Any:
+        redis = get_redis()
+        try:
+            value = await fn()
+            try:
+                await redis.set(
+                    f"{lock_key}:result:{token}",
+                    json.dumps(encode(value)),
+                    px=self.result_ttl * 1000
+                )
+            except Exception as e:
+                logger.warning(f"Singleflight result not shared: {str(e)}")
+            return value
+        finally:
+            try:
+                await redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                logger.warning(f"Singleflight lock not released: {str(e)}")
+
+    async def _follow(self, lock_key: str, leader_token: str) -> Optional[str]:
+        """Poll for the leader's result until it appears or the lock is gone."""
+        redis = get_redis()
+        result_key = f"{lock_key}:result:{leader_token}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl
+
+        try:
+            while loop.time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                result = await redis.get(result_key)
+                if result is not None:
+                    return result
+                if await redis.get(lock_key) != leader_token:
+                    # Leader finished without a result (e.g. it failed) or expired
+                    return await redis.get(result_key)
+        except Exception as e:
+            logger.warning(f"Singleflight wait failed, running locally: {str(e)}")
+        return None
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+class Trace:
+    """Spans recorded while serving one request."""
+
+    def __init__(self, sampled: bool):
+        self.trace_id = uuid.uuid4().hex
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.spans: List[Dict[str, Any]] = []
+
+    def summary(self) -> "OrderedDict[str, float]":
+        """Total milliseconds per span name, in order of first appearance."""
+        totals: "OrderedDict[str, float]" = OrderedDict()
+        for span in self.spans:
+            totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration_ms"]
+        return totals
+
+    def server_timing(self) -> str:
+        """Server-Timing header value for the spans finished so far."""
+        entries = [f"{name};dur={duration:.1f}" for name, duration in self.summary().items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self, **attributes: Any) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            **attributes,
+            "spans": self.spans
+        }
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span_id: ContextVar[Optional[str]] = ContextVar("current_span_id", default=None)
+_export_lock = threading.Lock()
+
+def start_trace(force: bool = False) -> Optional[Trace]:
+    """Begin a trace for the current request; sampled traces are exported."""
+    if not settings.TRACING_ENABLED:
+        return None
+    sampled = force or random.random() < settings.TRACE_SAMPLE_RATE
+    trace = Trace(sampled)
+    _current_trace.set(trace)
+    return trace
+
+@contextmanager
+def span(name: str, **attributes: Any):
+    """Record a span in the current request's trace; a no-op outside one."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    span_id = uuid.uuid4().hex[:16]
+    parent_id = _current_span_id.get()
+    token = _current_span_id.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _current_span_id.reset(token)
+        trace.spans.append({
+            "name": name,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "start_ms": round((start - trace.start) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+            **({"attributes": attributes} if attributes else {})
+        })
+
+def record_span(name: str, duration: float, **attributes: Any):
+    """Record a span that ends now and lasted duration seconds."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    end = time.perf_counter()
+    trace.spans.append({
+        "name": name,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": _current_span_id.get(),
+        "start_ms": round((end - duration - trace.start) * 1000, 3),
+        "duration_ms": round(duration * 1000, 3),
+        **({"attributes": attributes} if attributes else {})
+    })
+
+async def export_trace(trace: Trace, **attributes: Any):
+    """Append a sampled trace to the local JSONL sink."""
+    if not trace.sampled:
+        return
+    line = json.dumps(trace.to_dict(**attributes), default=str)
+    await asyncio.to_thread(_write_line, settings.TRACE_EXPORT_PATH, line)
+
+def _write_line(path: str, line: str):
+    with _export_lock:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Keep the sink bounded: roll over to a single ".1" backup when full
+        max_bytes = settings.TRACE_EXPORT_MAX_MB * 1024 * 1024
+        if max_bytes > 0 and os.path.exists(path) and os.path.getsize(path) + len(line) + 1 > max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a") as f:
+            f.write(line + "\n")
@@ -0,0 +1,76 @@
+-- Upgrades a database created before audit runs, rule findings, document
+-- revisions, near-duplicate lookup, clause labels and the webhook outbox.
+-- init_db only creates missing tables, so existing tables are altered here.
+-- Safe to run more than once:
+--   psql -U postgres -d contract_intel -f migrations/001_runs_revisions_and_indexes.sql
+
+BEGIN;
+
+-- Documents: content-addressed uploads, revisions, page offsets, rule set, MinHash
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS revision INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS minhash JSON;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS page_offsets JSON;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS ruleset_version VARCHAR(50);
+CREATE INDEX IF NOT EXISTS ix_documents_content_hash ON documents (content_hash);
+CREATE INDEX IF NOT EXISTS ix_documents_ruleset_version ON documents (ruleset_version);
+
+CREATE TABLE IF NOT EXISTS document_lsh_bands (
+    id SERIAL PRIMARY KEY,
+    document_id VARCHAR(36) NOT NULL REFERENCES documents (document_id) ON DELETE CASCADE,
+    band INTEGER NOT NULL,
+    bucket VARCHAR(16) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_document_lsh_bands_document_id ON document_lsh_bands (document_id);
+CREATE INDEX IF NOT EXISTS ix_document_lsh_bands_band_bucket ON document_lsh_bands (band, bucket);
+
+-- Chunks: clause labels, served by a GIN index
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS clause_labels JSONB DEFAULT '[]';
+CREATE INDEX IF NOT EXISTS ix_chunks_clause_labels ON chunks USING gin (clause_labels);
+
+-- Audit runs: existing findings become one legacy run per document. Legacy
+-- runs have no rule set or prompt version, so they never count as current.
+CREATE TABLE IF NOT EXISTS audit_runs (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(36) NOT NULL,
+    document_id VARCHAR(36) NOT NULL REFERENCES documents (document_id),
+    ruleset_version VARCHAR(50),
+    prompt_version VARCHAR(64),
+    use_llm INTEGER DEFAULT 1,
+    risk_score FLOAT,
+    summary TEXT,
+    findings_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_audit_runs_id ON audit_runs (id);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_audit_runs_run_id ON audit_runs (run_id);
+CREATE INDEX IF NOT EXISTS ix_audit_runs_document_id_id ON audit_runs (document_id, id);
+
+ALTER TABLE audit_results ADD COLUMN IF NOT EXISTS run_id VARCHAR(36);
+
+INSERT INTO audit_runs (run_id, document_id, use_llm, findings_count, created_at)
+SELECT md5('legacy-run:' || document_id)::uuid::text, document_id, 1, count(*), max(created_at)
+FROM audit_results
+WHERE run_id IS NULL
+GROUP BY document_id
+ON CONFLICT (run_id) DO NOTHING;
+
+UPDATE audit_results
+SET run_id = md5('legacy-run:' || document_id)::uuid::text
+WHERE run_id IS NULL;
+
+ALTER TABLE audit_results ALTER COLUMN run_id SET NOT NULL;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'audit_results_run_id_fkey') THEN
+        ALTER TABLE audit_results ADD CONSTRAINT audit_results_run_id_fkey
+            FOREIGN KEY (run_id) REFERENCES audit_runs (run_id) ON DELETE CASCADE;
+    END IF;
+END $$;
+CREATE INDEX IF NOT EXISTS ix_audit_results_document_run ON audit_results (document_id, run_id);
+
+-- Webhook subscriptions: JSONB event types, served by a GIN index
+ALTER TABLE webhook_subscriptions ALTER COLUMN event_types TYPE JSONB USING event_types::jsonb;
+CREATE INDEX IF NOT EXISTS ix_webhook_subscriptions_event_types ON webhook_subscriptions USING gin (event_types);
+
+COMMIT;
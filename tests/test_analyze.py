@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.contract_analyzer import ContractAnalyzer, AnalysisFailedError
+
+class FailingRiskAnalyzer:
+    def llm_windows(self, text, map_reduce):
+        return [(0, len(text) // 2), (len(text) // 2, len(text))]
+    
+    async def analyze_window(self, text, start, end, *args, **kwargs):
+        return {"findings": [], "failed": True}
+
+@pytest.mark.asyncio
+async def test_analyze_contract(client):
+    """Test combined extraction and audit."""
+    response = await client.post(
+        "/api/v1/analyze?document_id=test-doc-id",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    assert response.status_code in [200, 404]
+    if response.status_code == 200:
+        data = response.json()
+        assert "parties" in data["extraction"]
+        assert "signatories" in data["extraction"]
+        assert "findings" in data["audit"]
+        assert "risk_score" in data["audit"]
+        assert data["audit"]["run_id"]
+
+@pytest.mark.asyncio
+async def test_analyze_nonexistent_document(client):
+    """Test analysis with invalid document ID."""
+    response = await client.post(
+        "/api/v1/analyze?document_id=nonexistent",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_analysis_fails_when_every_window_fails():
+    """Test an LLM outage raises instead of returning rule-only results."""
+    analyzer = ContractAnalyzer(extractor=None, risk_analyzer=FailingRiskAnalyzer())
+    
+    with pytest.raises(AnalysisFailedError):
+        await analyzer.analyze("Vendor shall indemnify Customer.", rule_findings=[])
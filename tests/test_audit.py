@@ -1,4 +1,8 @@
 import pytest
+import json
+from types import SimpleNamespace
+
+from app.services import pipeline as pipeline_module
 
 @pytest.mark.asyncio
 async def test_audit_contract(client):
@@ -23,4 +27,130 @@ async def test_audit_with_llm_toggle(client):
     )
     
     # Should work regardless of toggle
-    assert response.status_code in [200, 404]
\ No newline at end of file
+    assert response.status_code in [200, 404]
+
+@pytest.mark.asyncio
+async def test_audit_first_window_only(client):
+    """Test audit with map-reduce over the full document disabled."""
+    response = await client.post(
+        "/api/v1/audit?document_id=test-doc-id&use_llm=true&map_reduce=false",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    assert response.status_code in [200, 404]
+
+
+@pytest.mark.asyncio
+async def test_list_rule_findings(client):
+    """Test portfolio query over precomputed rule findings."""
+    response = await client.get(
+        "/api/v1/audit/findings?severity=critical&limit=10",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    if response.status_code == 200:
+        data = response.json()
+        assert isinstance(data, list)
+        for finding in data:
+            assert finding["severity"] == "critical"
+            assert "document_id" in finding
+
+
+@pytest.mark.asyncio
+async def test_audit_stream(client):
+    """Test streaming audit using Server-Sent Events."""
+    response = await client.get(
+        "/api/v1/audit/stream?document_id=test-doc-id&use_llm=false",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    assert response.status_code in [200, 404]
+    if response.status_code == 200:
+        assert response.headers["content-type"] == "text/event-stream; charset=utf-8"
+        assert '"type": "rule_findings"' in response.text
+        assert '"type": "complete"' in response.text
+
+
+@pytest.mark.asyncio
+async def test_audit_records_versioned_run(client):
+    """Test each LLM audit is stored as a new run."""
+    first = await client.post(
+        "/api/v1/audit?document_id=test-doc-id&use_llm=true",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    second = await client.post(
+        "/api/v1/audit?document_id=test-doc-id&use_llm=true",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    if first.status_code == 200 and second.status_code == 200:
+        assert first.json()["run_id"]
+        assert first.json()["run_id"] != second.json()["run_id"]
+
+
+@pytest.mark.asyncio
+async def test_audit_batch(client):
+    """Test batch audit streams one NDJSON line per document."""
+    response = await client.post(
+        "/api/v1/audit/batch",
+        json={"document_ids": ["nonexistent"], "use_llm": False},
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert lines == [{"document_id": "nonexistent", "status": "not_found"}]
+
+@pytest.mark.asyncio
+async def test_complete_audit_persists_run(monkeypatch):
+    """Test a finished LLM audit is saved as a run, invalidated and announced."""
+    document_pipeline = pipeline_module.pipeline
+    saved, invalidated, dispatched = [], [], []
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    async def save_run(db, document_id, audit_results, ruleset_version, prompt_version):
+        saved.append((document_id, ruleset_version))
+        return SimpleNamespace(run_id="run-1")
+
+    async def invalidate(document_id, *kinds):
+        invalidated.append((document_id, kinds))
+
+    async def dispatch_event(event_type, data):
+        dispatched.append((event_type, data))
+
+    monkeypatch.setattr(pipeline_module, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(document_pipeline.audit_store, "save_run", save_run)
+    monkeypatch.setattr(document_pipeline.result_cache, "invalidate", invalidate)
+    monkeypatch.setattr(document_pipeline.webhook_service, "dispatch_event", dispatch_event)
+
+    run_id = await document_pipeline.complete_audit(
+        "doc-1",
+        {"findings": [{"risk_type": "uncapped_liability"}], "risk_score": 7.5, "summary": {}}
+    )
+
+    assert run_id == "run-1"
+    assert saved == [("doc-1", document_pipeline.rule_index.version)]
+    assert invalidated == [("doc-1", ("audit",))]
+    assert dispatched[0][0] == "audit.complete"
+    assert dispatched[0][1]["run_id"] == "run-1"
+
+def test_analysis_run_is_current():
+    """Test runs written by /analyze count as current like LLM audit runs."""
+    document_pipeline = pipeline_module.pipeline
+    ruleset_version = document_pipeline.rule_index.version
+
+    for prompt_version in (
+        document_pipeline.risk_analyzer.prompt_version,
+        document_pipeline.contract_analyzer.prompt_version
+    ):
+        run = SimpleNamespace(use_llm=True, ruleset_version=ruleset_version, prompt_version=prompt_version)
+        assert document_pipeline.is_current_run(run)
+
+    stale = SimpleNamespace(use_llm=True, ruleset_version=ruleset_version, prompt_version="old-prompt")
+    assert not document_pipeline.is_current_run(stale)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from app.services.clause_index import assign_clause_labels, clause_types_in_question, rank_with_label_boost
+
+PROTOTYPES = {
+    "indemnity": np.array([1.0, 0.0, 0.0]),
+    "termination": np.array([0.0, 1.0, 0.0]),
+    "payment": np.array([0.0, 0.0, 1.0])
+}
+
+def test_labels_follow_prototype_similarity():
+    """Test each chunk gets the clause types it is close to, best first."""
+    embeddings = np.array([
+        [0.9, 0.1, 0.0],   # Mostly indemnity
+        [0.6, 0.8, 0.0],   # Termination, then indemnity
+        [-1.0, 0.0, 0.0]   # Unrelated
+    ])
+
+    labels = assign_clause_labels(embeddings, PROTOTYPES, threshold=0.5, max_labels=2)
+
+    assert labels == [["indemnity"], ["termination", "indemnity"], []]
+
+def test_labels_capped_per_chunk():
+    """Test a chunk close to every prototype keeps only max_labels of them."""
+    embeddings = np.array([[1.0, 1.0, 0.9]])
+
+    labels = assign_clause_labels(embeddings, PROTOTYPES, threshold=0.3, max_labels=2)
+
+    assert len(labels[0]) == 2
+    assert sorted(labels[0]) == ["indemnity", "termination"]
+
+def test_clause_types_in_question():
+    """Test questions are mapped to the clause types they mention."""
+    assert clause_types_in_question("Who indemnifies whom?") == ["indemnity"]
+    assert clause_types_in_question("Can we terminate early, and does it auto-renew?") == [
+        "termination", "auto_renewal"
+    ]
+    assert clause_types_in_question("Who are the parties?") == []
+
+def test_labelled_chunks_are_boosted_not_filtered():
+    """Test labelled chunks rank higher while close unlabelled chunks are kept."""
+    nearest = [(1, 0.10, "unlabelled-close"), (2, 0.20, "labelled"), (3, 0.25, "unlabelled")]
+    nearest_labelled = [(2, 0.20, "labelled"), (4, 0.30, "labelled-far")]
+
+    ranked = rank_with_label_boost(nearest, nearest_labelled, top_k=3, boost=0.15)
+
+    assert ranked == ["labelled", "unlabelled-close", "labelled-far"]
@@ -0,0 +1,44 @@
+import pytest
+
+from app.api.documents import etag_matches
+
+@pytest.mark.asyncio
+async def test_get_stored_extraction(client):
+    """Test fetching a stored extraction."""
+    response = await client.get(
+        "/api/v1/documents/test-doc-id/extraction",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+
+    assert response.status_code in [200, 404]
+    if response.status_code == 200:
+        assert "ETag" in response.headers
+        assert "Cache-Control" in response.headers
+
+@pytest.mark.asyncio
+async def test_get_stored_audit_not_modified(client):
+    """Test If-None-Match with the current ETag returns 304."""
+    response = await client.get(
+        "/api/v1/documents/test-doc-id/audit",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+
+    assert response.status_code in [200, 404]
+    if response.status_code == 200:
+        revalidated = await client.get(
+            "/api/v1/documents/test-doc-id/audit",
+            headers={
+                "X-API-Key": "dev-secret-key",
+                "If-None-Match": response.headers["ETag"]
+            }
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["ETag"] == response.headers["ETag"]
+
+def test_etag_matching():
+    """Test If-None-Match parsing."""
+    assert etag_matches('"audit-1"', '"audit-1"')
+    assert etag_matches('"other", W/"audit-1"', '"audit-1"')
+    assert etag_matches("*", '"audit-1"')
+    assert not etag_matches('"audit-2"', '"audit-1"')
+    assert not etag_matches(None, '"audit-1"')
@@ -0,0 +1,47 @@
+import pytest
+import asyncio
+
+from app.config import settings
+from app.services.enrichment import EnrichmentQueue
+
+class RecordingPipeline:
+    def __init__(self):
+        self.calls = []
+        self.from_template = []
+    
+    async def extract(self, document_id, from_template=False):
+        self.calls.append(("extract", document_id))
+        self.from_template.append(from_template)
+    
+    async def audit(self, document_id, force=True, from_template=False):
+        self.calls.append(("audit", document_id))
+        self.from_template.append(from_template)
+
+@pytest.mark.asyncio
+async def test_enrichment_runs_by_priority(monkeypatch):
+    """Test queued documents are extracted and audited, lowest priority first."""
+    monkeypatch.setattr(settings, "TEMPLATE_REUSE_ENABLED", True)
+    pipeline = RecordingPipeline()
+    queue = EnrichmentQueue(pipeline)
+    queue.workers = 1
+    queue.start()
+    
+    # Occupy the single worker so the rest queue up
+    queue.enqueue("first", priority=5)
+    await asyncio.sleep(0)
+    queue.enqueue("low", priority=20)
+    queue.enqueue("high", priority=1)
+    
+    await asyncio.wait_for(queue._queue.join(), timeout=5)
+    await queue.stop()
+    
+    order = [document_id for stage, document_id in pipeline.calls if stage == "extract"]
+    assert order == ["first", "high", "low"]
+    assert ("audit", "high") in pipeline.calls
+    # Template reuse is forwarded to both stages
+    assert pipeline.from_template and all(pipeline.from_template)
+
+def test_enqueue_without_workers_is_skipped():
+    """Test enqueueing before the workers start does not raise."""
+    queue = EnrichmentQueue(RecordingPipeline())
+    assert queue.enqueue("doc") is False
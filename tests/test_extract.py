@@ -1,4 +1,5 @@
 import pytest
+import json
 
 @pytest.mark.asyncio
 async def test_extract_fields(client, test_db):
@@ -25,4 +26,36 @@ async def test_extract_nonexistent_document(client):
         headers={"X-API-Key": "dev-secret-key"}
     )
     
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_extract_targeted(client):
+    """Test retrieval-targeted extraction mode."""
+    response = await client.post(
+        "/api/v1/extract?document_id=test-doc-id&targeted=true",
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    assert response.status_code in [200, 404]
+    if response.status_code == 200:
+        data = response.json()
+        assert "parties" in data
+        assert "governing_law" in data
+        assert "signatories" in data
+
+
+@pytest.mark.asyncio
+async def test_extract_batch(client):
+    """Test batch extraction streams one NDJSON line per document."""
+    response = await client.post(
+        "/api/v1/extract/batch",
+        json={"document_ids": ["test-doc-id", "nonexistent"]},
+        headers={"X-API-Key": "dev-secret-key"}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert {line["document_id"] for line in lines} == {"test-doc-id", "nonexistent"}
+    statuses = {line["document_id"]: line["status"] for line in lines}
+    assert statuses["nonexistent"] == "not_found"
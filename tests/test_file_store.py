@@ -0,0 +1,49 @@
+import pytest
+import hashlib
+import io
+import os
+
+from app.services.file_store import FileStore, FileTooLargeError
+
+CONTENT = b"%PDF-1.4 sample contract " * 1000
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_object(tmp_path):
+    """Test files are stored once under sharded, content-hash names."""
+    store = FileStore(root=str(tmp_path), compress=False)
+    
+    first = await store.save(io.BytesIO(CONTENT))
+    second = await store.save(io.BytesIO(CONTENT))
+    
+    content_hash = hashlib.sha256(CONTENT).hexdigest()
+    assert first.content_hash == content_hash
+    assert first.size == len(CONTENT)
+    assert first.path == second.path
+    assert first.key == os.path.join(content_hash[:2], content_hash[2:4], f"{content_hash}.pdf")
+    with store.open(first) as source:
+        assert open(source, "rb").read() == CONTENT
+    # No temporary files left behind
+    assert sorted(os.listdir(tmp_path)) == [content_hash[:2]]
+
+@pytest.mark.asyncio
+async def test_compressed_objects_round_trip(tmp_path):
+    """Test zstd-compressed objects are smaller at rest and read back intact."""
+    store = FileStore(root=str(tmp_path), compress=True)
+    
+    stored = await store.save(io.BytesIO(CONTENT))
+    
+    assert stored.key.endswith(".pdf.zst")
+    assert os.path.getsize(stored.path) < len(CONTENT)
+    with store.open(stored) as source:
+        assert source == CONTENT
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_rejected(tmp_path):
+    """Test uploads over the size limit fail without leaving partial files."""
+    store = FileStore(root=str(tmp_path), compress=False)
+    store.max_size = 1000
+    
+    with pytest.raises(FileTooLargeError):
+        await store.save(io.BytesIO(CONTENT))
+    
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,43 @@
+import pytest
+import asyncio
+
+from app.services.health import HealthMonitor
+
+async def _ok():
+    pass
+
+async def _hangs():
+    await asyncio.sleep(60)
+
+@pytest.mark.asyncio
+async def test_health_checks_time_out():
+    """Test a hanging dependency is reported unhealthy after the timeout."""
+    monitor = HealthMonitor()
+    monitor.timeout = 0.05
+    monitor.checks = {"database": _ok, "redis": _hangs}
+    
+    health = await monitor.status()
+    
+    assert health["database"] == "healthy"
+    assert health["redis"] == "unhealthy"
+    assert health["status"] == "degraded"
+
+@pytest.mark.asyncio
+async def test_health_status_is_served_from_cache():
+    """Test probes reuse the last result and report a stalled refresher as unknown."""
+    calls = []
+    
+    async def counted():
+        calls.append(1)
+    
+    monitor = HealthMonitor()
+    monitor.checks = {"database": counted, "redis": counted}
+    
+    assert (await monitor.status())["status"] == "healthy"
+    await monitor.status()
+    assert len(calls) == 2
+    
+    monitor._refreshed -= monitor.interval * 4
+    health = await monitor.status()
+    assert health["database"] == "unknown"
+    assert health["status"] == "degraded"
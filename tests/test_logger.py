@@ -0,0 +1,36 @@
+import json
+import logging
+import sys
+
+from app.utils.logger import PIIRedactor, JSONFormatter, LogQueueHandler
+
+def test_redacts_all_pii_in_one_pass():
+    """Test every PII pattern is replaced by its label."""
+    message = PIIRedactor.redact(
+        "SSN 123-45-6789, card 4111111111111111, mail jane.doe@example.com, phone 555-123-4567"
+    )
+    
+    assert message == "SSN [SSN], card [CARD], mail [EMAIL], phone [PHONE]"
+
+def test_redaction_covers_interpolated_args():
+    """Test redaction applies to the formatted message, not just the template."""
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "Contact %s", ("a@b.com",), None)
+    
+    PIIRedactor().filter(record)
+    
+    assert record.getMessage() == "Contact [EMAIL]"
+
+def test_queued_record_keeps_exception_for_json():
+    """Test queued records render as JSON with the traceback in its own field."""
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+    record = logging.LogRecord("test", logging.ERROR, __file__, 1, "Failed %d", (3,), exc_info)
+    
+    queued = LogQueueHandler(None).prepare(record)
+    entry = json.loads(JSONFormatter().format(queued))
+    
+    assert entry["message"] == "Failed 3"
+    assert entry["level"] == "ERROR"
+    assert "ValueError: boom" in entry["exception"]
@@ -0,0 +1,35 @@
+from app.utils.metrics import batch_size_label, record_llm_call, route_template, LLM_TOKENS
+
+def test_batch_size_labels_are_bucketed():
+    """Test embedding batch sizes map onto a small label set."""
+    assert batch_size_label(1) == "1"
+    assert batch_size_label(8) == "2-8"
+    assert batch_size_label(32) == "9-32"
+    assert batch_size_label(100) == "33-128"
+    assert batch_size_label(1000) == "129+"
+
+def test_llm_tokens_are_counted():
+    """Test LLM usage is added to the token counters."""
+    class Usage:
+        input_tokens = 120
+        output_tokens = 30
+    
+    class Message:
+        usage = Usage()
+    
+    counter = LLM_TOKENS.labels(operation="test", direction="input")
+    before = counter._value.get()
+    record_llm_call("test", Message(), 0.5)
+    assert counter._value.get() == before + 120
+
+def test_route_template_labels():
+    """Test requests are labelled by route template, not raw path."""
+    class Route:
+        path = "/api/v1/webhook/events/{webhook_id}"
+    
+    class Request:
+        def __init__(self, scope):
+            self.scope = scope
+    
+    assert route_template(Request({"route": Route()})) == "/api/v1/webhook/events/{webhook_id}"
+    assert route_template(Request({})) == "unmatched"
@@ -0,0 +1,65 @@
+from app.services.near_duplicates import (
+    minhash_signature,
+    lsh_buckets,
+    estimated_similarity,
+    diff_sections,
+    changed_ratio,
+    shift_span,
+    BANDS
+)
+
+def _contract(**overrides):
+    sections = {
+        "payment": "1. Payment\nCustomer shall pay all invoices within thirty days of receipt.\n",
+        "term": "2. Term\nThis Agreement continues for twelve months and renews annually.\n",
+        "indemnity": "3. Indemnity\nSupplier shall indemnify Customer against third party claims.\n",
+        "law": "4. Governing Law\nThis Agreement is governed by the laws of England.\n"
+    }
+    sections.update(overrides)
+    return "Master Services Agreement\n" + "".join(sections.values())
+
+def test_near_identical_texts_have_similar_signatures():
+    """Test a lightly edited copy scores far above an unrelated text."""
+    base = " ".join(f"clause{index} applies to the services" for index in range(200))
+    edited = base.replace("clause7 applies", "clause7 never applies")
+    unrelated = " ".join(f"term{index} governs the licence" for index in range(200))
+
+    signature = minhash_signature(base)
+    assert estimated_similarity(signature, minhash_signature(edited)) > 0.9
+    assert estimated_similarity(signature, minhash_signature(unrelated)) < 0.1
+    assert len(lsh_buckets(signature)) == BANDS
+    assert lsh_buckets(signature) == lsh_buckets(minhash_signature(base))
+
+def test_short_text_has_no_signature():
+    """Test texts shorter than one shingle are not indexed."""
+    assert minhash_signature("Too short") is None
+
+def test_diff_sections_finds_changed_section():
+    """Test only the edited section is reported as differing."""
+    template = _contract()
+    text = _contract(term="2. Term\nThis Agreement continues for   thirty-six months.\n")
+
+    shared, differing = diff_sections(template, text)
+
+    assert len(differing) == 1
+    start, end = differing[0]
+    assert text[start:end].startswith("2. Term")
+    assert 0 < changed_ratio(text, differing) < 0.5
+    assert len(shared) == 4  # Title and the three unchanged sections
+
+def test_shift_span_maps_offsets_past_an_edit():
+    """Test a finding after a lengthened section moves with its section."""
+    template = _contract()
+    text = _contract(payment="1. Payment\nCustomer shall pay all invoices within sixty (60) days of receipt.\n")
+    shared, _ = diff_sections(template, text)
+
+    phrase = "indemnify Customer"
+    template_start = template.index(phrase)
+    shifted = shift_span(shared, template_start, template_start + len(phrase))
+
+    assert shifted is not None
+    assert text[shifted[0]:shifted[1]] == phrase
+
+    # A finding in the changed section has no counterpart
+    payment_start = template.index("thirty days")
+    assert shift_span(shared, payment_start, payment_start + 11) is None
@@ -0,0 +1,54 @@
+import pytest
+import asyncio
+import time
+
+from app.config import settings
+from app.utils.profiling import RequestProfiler, should_profile, list_profiles, profile_path
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+@pytest.mark.asyncio
+async def test_profile_is_stored(tmp_path, monkeypatch):
+    """Test a profiled request stores pstats and collapsed stacks."""
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    
+    profiler = RequestProfiler()
+    assert profiler.start()
+    # Only one request is profiled at a time
+    assert not RequestProfiler().start()
+    busy(0.05)
+    profiler.stop()
+    await profiler.save(route="/api/v1/audit", status=200)
+    
+    assert list_profiles()[0]["profile_id"] == profiler.profile_id
+    assert profile_path(profiler.profile_id, "pstats")
+    with open(profile_path(profiler.profile_id, "collapsed")) as f:
+        assert any("busy" in line for line in f)
+    assert profile_path("../etc/passwd", "pstats") is None
+
+@pytest.mark.asyncio
+async def test_abandoned_profile_frees_slot(monkeypatch):
+    """Test a profile whose body is never sent is stopped by the watchdog."""
+    monkeypatch.setattr(settings, "PROFILE_MAX_SECONDS", 0.05)
+    
+    profiler = RequestProfiler()
+    assert profiler.start()
+    await asyncio.sleep(0.2)
+    
+    next_profiler = RequestProfiler()
+    assert next_profiler.start()
+    next_profiler.stop()
+    profiler.stop()  # A late stop is a no-op
+
+def test_profile_requires_admin_key(monkeypatch):
+    """Test the X-Profile header only works with the admin key."""
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "admin-secret")
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_EVERY_N", 0)
+    
+    assert should_profile({"x-profile": "1", "x-admin-key": "admin-secret"}, {})
+    assert not should_profile({"x-profile": "1", "x-admin-key": "wrong"}, {})
+    assert not should_profile({}, {"profile": "1"})
+    assert not should_profile({}, {})
@@ -0,0 +1,114 @@
+import pytest
+
+from app import main
+from app.config import settings
+from app.utils import rate_limit
+from app.utils.rate_limit import RateLimiter, retry_after_header
+from app.utils.load_shedding import LoadShedder
+
+def _local_limiter(per_minute: int) -> RateLimiter:
+    limiter = RateLimiter()
+    limiter.use_redis = False
+    limiter.rate = per_minute / 60
+    limiter.capacity = per_minute
+    return limiter
+
+def test_endpoint_costs_use_longest_prefix():
+    """Test heavier endpoints cost more and non-API paths are free."""
+    limiter = RateLimiter()
+    limiter.costs = [("/audit/batch", 20), ("/audit", 5)]
+    
+    assert limiter.cost("/api/v1/audit") == 5
+    assert limiter.cost("/api/v1/audit/stream") == 5
+    assert limiter.cost("/api/v1/audit/batch") == 20
+    assert limiter.cost("/api/v1/auditing") == 1
+    assert limiter.cost("/healthz") == 0
+    assert limiter.cost("/metrics") == 0
+
+def test_endpoint_costs_match_path_parameters():
+    """Test a {param} segment targets one route without charging its siblings."""
+    limiter = RateLimiter()
+    limiter.costs = [("/documents/{document_id}/revisions", 5)]
+    
+    assert limiter.cost("/api/v1/documents/abc-123/revisions") == 5
+    assert limiter.cost("/api/v1/documents/abc-123/audit") == 1
+    assert limiter.cost("/api/v1/documents") == 1
+
+@pytest.mark.asyncio
+async def test_bucket_rejects_until_refilled():
+    """Test a client is limited once its bucket is empty, with a retry delay."""
+    limiter = _local_limiter(per_minute=10)
+    client = RateLimiter.client_key("key-a", None)
+    
+    assert await limiter.acquire(client, 5) == 0
+    assert await limiter.acquire(client, 5) == 0
+    wait = await limiter.acquire(client, 5)
+    
+    assert 0 < wait <= 30
+    assert retry_after_header(wait) == "30"
+    # Other clients have their own bucket
+    assert await limiter.acquire(RateLimiter.client_key("key-b", None), 5) == 0
+
+@pytest.mark.asyncio
+async def test_redis_failure_stays_local_until_retry(monkeypatch):
+    """Test one Redis failure switches to local buckets without retrying Redis per request."""
+    calls = []
+    
+    def unreachable_redis():
+        calls.append(1)
+        raise ConnectionError("Redis unavailable")
+    
+    monkeypatch.setattr(rate_limit, "get_redis", unreachable_redis)
+    limiter = _local_limiter(per_minute=10)
+    limiter.use_redis = True
+    client = RateLimiter.client_key("key-a", None)
+    
+    assert await limiter.acquire(client, 5) == 0
+    assert await limiter.acquire(client, 5) == 0
+    assert await limiter.acquire(client, 5) > 0  # Still metered, locally
+    assert len(calls) == 1
+    
+    limiter._redis_down_until = 0.0
+    await limiter.acquire(client, 1)
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_rate_limited_response_allows_cross_origin(client, monkeypatch):
+    """Test browsers can read a 429 and its Retry-After from another origin."""
+    async def exhausted(client_key, cost):
+        return 12.0
+    
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(main.rate_limiter, "acquire", exhausted)
+    
+    response = await client.get(
+        "/api/v1/documents",
+        headers={"X-API-Key": "dev-secret-key", "Origin": "https://app.example.com"}
+    )
+    
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "12"
+    assert response.headers["access-control-allow-origin"]
+
+def test_client_key_does_not_expose_api_key():
+    """Test buckets are keyed by a hash of the API key, or the client address."""
+    assert "secret" not in RateLimiter.client_key("secret", "10.0.0.1")
+    assert RateLimiter.client_key(None, "10.0.0.1") == "ip:10.0.0.1"
+
+@pytest.mark.asyncio
+async def test_load_shedder_thresholds():
+    """Test shedding starts on sustained loop lag or LLM backlog."""
+    shedder = LoadShedder()
+    shedder.max_loop_lag = 0.1
+    shedder.max_llm_pending = 2
+    assert shedder.overloaded() is None
+    
+    async with shedder.llm_call(), shedder.llm_call():
+        assert shedder.overloaded() == "llm_backlog"
+    assert shedder.overloaded() is None
+    
+    shedder.observe_lag(0.15)
+    assert shedder.overloaded() is None  # One slow tick is smoothed away
+    shedder.observe_lag(0.15)
+    shedder.observe_lag(0.15)
+    assert shedder.overloaded() == "loop_lag"
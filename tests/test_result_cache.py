@@ -0,0 +1,32 @@
+import pytest
+
+from app.services import result_cache as result_cache_module
+from app.services.result_cache import ResultCache
+
+def _unreachable_redis():
+    raise ConnectionError("Redis unavailable")
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(result_cache_module, "get_redis", _unreachable_redis)
+    cache = ResultCache()
+    cache.local_ttl = 60
+    return cache
+
+@pytest.mark.asyncio
+async def test_set_after_read_is_cached(cache):
+    """Test an entry read with an unchanged generation is cached."""
+    generation = await cache.generation("audit", "doc-1")
+    await cache.set("audit", "doc-1", {"version": "audit-1", "body": {}}, generation)
+
+    assert (await cache.get("audit", "doc-1"))["version"] == "audit-1"
+
+@pytest.mark.asyncio
+async def test_stale_read_is_not_cached_after_invalidation(cache):
+    """Test a reader that loaded the old row before a write cannot re-cache it."""
+    generation = await cache.generation("audit", "doc-1")
+    # A writer replaces the result and invalidates while the reader is in the database
+    await cache.invalidate("doc-1", "audit")
+    await cache.set("audit", "doc-1", {"version": "audit-old", "body": {}}, generation)
+
+    assert await cache.get("audit", "doc-1") is None
@@ -0,0 +1,74 @@
+import pytest
+
+from app.services.pdf_parser import PDFParser
+from app.services.revisions import plan_chunks
+
+def _document(page_texts):
+    pages, offset = [], 0
+    for number, text in enumerate(page_texts, start=1):
+        pages.append({"page_number": number, "char_start": offset, "char_end": offset + len(text)})
+        offset += len(text) + 1
+    return "\n".join(page_texts), pages
+
+def _page(label, words=25):
+    return " ".join(f"{label}{index}" for index in range(words))
+
+@pytest.fixture
+def parser():
+    parser = PDFParser()
+    parser.chunk_size = 10
+    parser.chunk_overlap = 2
+    return parser
+
+async def _old_chunks(parser, text, pages):
+    chunks = await parser.create_chunks(text, pages)
+    return chunks, [(index, chunk["char_start"], chunk["char_end"]) for index, chunk in enumerate(chunks)]
+
+@pytest.mark.asyncio
+async def test_unchanged_revision_reuses_every_chunk(parser):
+    """Test a revision with identical pages keeps all chunks as they were."""
+    text, pages = _document([_page("a"), _page("b"), _page("c")])
+    old, old_rows = await _old_chunks(parser, text, pages)
+    
+    chunks, pages_changed = plan_chunks(parser, text, pages, old_rows, text, pages)
+    
+    assert pages_changed == 0
+    assert [chunk["chunk_id"] for chunk in chunks] == list(range(len(old)))
+    assert [chunk["text"] for chunk in chunks] == [chunk["text"] for chunk in old]
+
+@pytest.mark.asyncio
+async def test_only_changed_pages_are_rechunked(parser):
+    """Test chunks on unchanged pages are reused with shifted offsets."""
+    old_text, old_pages = _document([_page("a"), _page("b"), _page("c"), _page("d")])
+    _, old_rows = await _old_chunks(parser, old_text, old_pages)
+    new_text, new_pages = _document([_page("a"), _page("x", words=40), _page("c"), _page("d")])
+    
+    chunks, pages_changed = plan_chunks(parser, old_text, old_pages, old_rows, new_text, new_pages)
+    
+    assert pages_changed == 1
+    reused = [chunk for chunk in chunks if chunk["chunk_id"] is not None]
+    fresh = [chunk for chunk in chunks if chunk["chunk_id"] is None]
+    assert reused and fresh
+    assert all("x" in chunk["text"] for chunk in fresh)
+    for chunk in chunks:
+        assert chunk["text"] == " ".join(new_text[chunk["char_start"]:chunk["char_end"]].split())
+    # Every word of the new text is still covered, in order
+    covered = set()
+    for chunk in chunks:
+        covered.update(range(chunk["char_start"], chunk["char_end"]))
+    assert all(index in covered for index, char in enumerate(new_text) if not char.isspace())
+    assert [chunk["char_start"] for chunk in chunks] == sorted(chunk["char_start"] for chunk in chunks)
+
+@pytest.mark.asyncio
+async def test_appended_page_is_chunked(parser):
+    """Test a page added after a short tail chunk is chunked, not dropped."""
+    old_text, old_pages = _document([_page("a"), _page("b"), _page("c")])
+    _, old_rows = await _old_chunks(parser, old_text, old_pages)
+    new_text, new_pages = _document([_page("a"), _page("b"), _page("c"), _page("z", words=5)])
+    
+    chunks, pages_changed = plan_chunks(parser, old_text, old_pages, old_rows, new_text, new_pages)
+    
+    assert pages_changed == 1
+    chunked_words = {word for chunk in chunks for word in chunk["text"].split()}
+    assert {f"z{index}" for index in range(5)} <= chunked_words
+    assert all(chunk["chunk_id"] is not None for chunk in chunks if "z0" not in chunk["text"])
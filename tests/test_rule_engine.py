@@ -0,0 +1,56 @@
+from app.services.rule_engine import RuleEngine
+
+def test_rules_report_offsets_and_pages():
+    """Test rule findings carry char offsets and page numbers."""
+    engine = RuleEngine()
+    text = (
+        "This Agreement shall automatically renew unless either party gives 15 days notice.\n"
+        "Vendor shall indemnify Customer against all claims arising from the Services."
+    )
+    pages = [
+        {"page_number": 1, "char_start": 0, "char_end": 83},
+        {"page_number": 2, "char_start": 84, "char_end": len(text)}
+    ]
+    
+    findings = engine.scan_document(text, pages)
+    by_rule = {f["risk_type"]: f for f in findings}
+    
+    renewal = by_rule["auto_renewal_short_notice"]
+    assert text[renewal["char_start"]:renewal["char_end"]] == renewal["evidence"]
+    assert renewal["page"] == 1
+    assert by_rule["broad_indemnity"]["page"] == 2
+    assert "missing_liability_cap" in by_rule
+
+def test_rules_respect_conditions():
+    """Test auto-renewal with a long notice period is not flagged."""
+    engine = RuleEngine()
+    findings = engine.scan_document(
+        "The term will auto-renew with 60 days prior written notice. Limitation of Liability applies."
+    )
+    
+    assert findings == []
+
+class _RecordingPattern:
+    """Wraps a compiled pattern and records the span each match is given."""
+    
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.spans = []
+    
+    def match(self, text, pos, endpos):
+        self.spans.append((pos, endpos))
+        return self.pattern.match(text, pos, endpos)
+
+def test_rules_bounded_on_long_unbroken_text():
+    """Test indemnity rule only matches within its window on long texts without line breaks."""
+    engine = RuleEngine()
+    text = "indemnify " + "lorem ipsum " * 50000
+    rule = next(rule for rule in engine.rules if rule.id == "broad_indemnity")
+    rule.pattern = _RecordingPattern(rule.pattern)
+    
+    findings = engine.scan_document(text * 3)
+    
+    assert "broad_indemnity" not in {f["risk_type"] for f in findings}
+    # One anchored evaluation per keyword hit, never past the rule's window
+    assert len(rule.pattern.spans) == 3
+    assert all(endpos - pos <= rule.window for pos, endpos in rule.pattern.spans)
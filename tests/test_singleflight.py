@@ -0,0 +1,53 @@
+import pytest
+import asyncio
+
+from app.utils.singleflight import SingleFlight
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_run():
+    """Test identical concurrent calls run the function once."""
+    singleflight = SingleFlight("test")
+    singleflight.use_redis = False
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    key = SingleFlight.make_key("ask", "question", None, 5)
+    results = await asyncio.gather(*[singleflight.do(key, compute) for _ in range(10)])
+
+    assert calls == 1
+    assert all(result == {"answer": 42} for result in results)
+
+    # Later calls run again
+    await singleflight.do(key, compute)
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_errors_reach_all_waiters():
+    """Test a failed run raises for every coalesced caller."""
+    singleflight = SingleFlight("test")
+    singleflight.use_redis = False
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *[singleflight.do("key", fail) for _ in range(3)],
+        return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+@pytest.mark.asyncio
+async def test_runs_locally_without_redis():
+    """Test coalescing degrades to in-process when Redis is unreachable."""
+    singleflight = SingleFlight("test")
+
+    async def compute():
+        return "ok"
+
+    assert await singleflight.do("key", compute) == "ok"
@@ -0,0 +1,66 @@
+import pytest
+import contextvars
+import json
+
+from app.config import settings
+from app.utils.tracing import start_trace, span, record_span, export_trace, _write_line
+
+def test_spans_are_nested_and_summarized():
+    """Test spans record parents and sum into Server-Timing entries."""
+    trace = start_trace(force=True)
+    
+    with span("vector_search"):
+        record_span("embedding", 0.002, batch_size=1)
+    with span("embedding"):
+        pass
+    
+    outer = next(s for s in trace.spans if s["name"] == "vector_search")
+    inner = trace.spans[0]
+    assert inner["parent_id"] == outer["span_id"]
+    assert inner["attributes"] == {"batch_size": 1}
+    
+    header = trace.server_timing()
+    assert header.startswith("embedding;dur=")
+    assert "vector_search;dur=" in header
+    assert "total;dur=" in header
+
+def test_span_is_noop_without_trace():
+    """Test spans outside a request trace record nothing."""
+    trace = start_trace(force=True)
+    
+    def untraced():
+        with span("llm"):
+            pass
+        record_span("embedding", 0.001)
+    
+    # A fresh context has no trace, as in requests outside the middleware
+    contextvars.Context().run(untraced)
+    assert trace.spans == []
+
+@pytest.mark.asyncio
+async def test_sampled_trace_is_exported(tmp_path, monkeypatch):
+    """Test sampled traces are appended to the JSONL sink."""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACE_EXPORT_PATH", str(path))
+    
+    trace = start_trace(force=True)
+    with span("pdf_parse"):
+        pass
+    await export_trace(trace, route="/api/v1/ingest", status=200)
+    
+    exported = json.loads(path.read_text().splitlines()[0])
+    assert exported["trace_id"] == trace.trace_id
+    assert exported["route"] == "/api/v1/ingest"
+    assert exported["spans"][0]["name"] == "pdf_parse"
+
+def test_export_sink_is_rotated(tmp_path, monkeypatch):
+    """Test the JSONL sink rolls over to one backup instead of growing without bound."""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACE_EXPORT_MAX_MB", 100 / (1024 * 1024))
+    
+    for index in range(5):
+        _write_line(str(path), json.dumps({"index": index, "padding": "x" * 20}))
+    
+    assert path.stat().st_size <= 100
+    assert (tmp_path / "traces.jsonl.1").exists()
+    assert json.loads(path.read_text().splitlines()[-1])["index"] == 4
@@ -0,0 +1,157 @@
+import pytest
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import httpx
+from fastapi import FastAPI, Request, Response
+
+from app.config import settings
+from app.models import WebhookSubscription, WebhookDelivery
+from app.services.webhook_service import WebhookService, backoff_delay, claim_lease_seconds
+from app.services.webhook_routes import SubscriptionRoutes
+
+SECRET = "test-secret"
+
+def make_receiver(status_code: int = 200, delay: float = 0.0):
+    """Local stub receiver that verifies signatures and records requests."""
+    receiver = FastAPI()
+    receiver.state.received = []
+    receiver.state.in_flight = 0
+    receiver.state.max_in_flight = 0
+
+    @receiver.post("/hook")
+    async def hook(request: Request):
+        receiver.state.in_flight += 1
+        receiver.state.max_in_flight = max(receiver.state.max_in_flight, receiver.state.in_flight)
+        await asyncio.sleep(delay)
+        receiver.state.in_flight -= 1
+
+        body = (await request.body()).decode()
+        expected = hmac.new(
+            SECRET.encode(),
+            f"{request.headers['X-Webhook-Timestamp']}.{body}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        assert request.headers["X-Webhook-Signature"] == f"sha256={expected}"
+
+        receiver.state.received.append(json.loads(body))
+        return Response(status_code=status_code)
+
+    return receiver
+
+def make_service(receiver: FastAPI) -> WebhookService:
+    service = WebhookService()
+    service.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=receiver))
+    return service
+
+def make_delivery(delivery_id: int, event_type: str = "audit.complete") -> WebhookDelivery:
+    return WebhookDelivery(
+        id=delivery_id,
+        subscription_id=1,
+        event_id=f"event-{delivery_id}",
+        event_type=event_type,
+        payload={"document_id": "doc-1"},
+        attempts=0
+    )
+
+subscription = WebhookSubscription(id=1, url="http://receiver/hook", secret=SECRET, active=1)
+
+@pytest.mark.asyncio
+async def test_delivers_signed_event():
+    """Test an event is POSTed with a valid HMAC signature."""
+    receiver = make_receiver()
+    service = make_service(receiver)
+
+    deliveries, error, _ = await service.deliver(subscription, [make_delivery(1)])
+
+    assert error is None
+    assert receiver.state.received[0]["type"] == "audit.complete"
+    assert receiver.state.received[0]["data"] == {"document_id": "doc-1"}
+
+@pytest.mark.asyncio
+async def test_batches_events(monkeypatch):
+    """Test many events are sent in one POST when batching is enabled."""
+    monkeypatch.setattr(settings, "WEBHOOK_BATCH_MAX_EVENTS", 10)
+    receiver = make_receiver()
+    service = make_service(receiver)
+
+    _, error, _ = await service.deliver(subscription, [make_delivery(i) for i in range(3)])
+
+    assert error is None
+    assert len(receiver.state.received) == 1
+    assert [event["id"] for event in receiver.state.received[0]["events"]] == ["event-0", "event-1", "event-2"]
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried():
+    """Test a non-2xx response is reported as a retryable failure."""
+    service = make_service(make_receiver(status_code=503))
+
+    _, error, retry = await service.deliver(subscription, [make_delivery(1)])
+
+    assert error == "HTTP 503"
+    assert retry
+
+@pytest.mark.asyncio
+async def test_inactive_subscription_is_not_retried():
+    """Test deliveries to an inactive subscription are dead-lettered."""
+    service = make_service(make_receiver())
+    inactive = WebhookSubscription(id=2, url="http://receiver/hook", secret=SECRET, active=0)
+
+    _, error, retry = await service.deliver(inactive, [make_delivery(1)])
+
+    assert error
+    assert not retry
+
+@pytest.mark.asyncio
+async def test_per_endpoint_concurrency(monkeypatch):
+    """Test concurrent POSTs to one endpoint stay within the limit."""
+    monkeypatch.setattr(settings, "WEBHOOK_PER_ENDPOINT_CONCURRENCY", 2)
+    receiver = make_receiver(delay=0.05)
+    service = make_service(receiver)
+
+    await asyncio.gather(*[
+        service.deliver(subscription, [make_delivery(i)]) for i in range(6)
+    ])
+
+    assert len(receiver.state.received) == 6
+    assert receiver.state.max_in_flight <= 2
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    """Test exponential backoff with jitter stays within bounds."""
+    monkeypatch.setattr(settings, "WEBHOOK_BACKOFF_BASE_SECONDS", 2.0)
+    monkeypatch.setattr(settings, "WEBHOOK_BACKOFF_MAX_SECONDS", 60.0)
+
+    assert 1.0 <= backoff_delay(1) <= 2.0
+    assert 8.0 <= backoff_delay(4) <= 16.0
+    assert 30.0 <= backoff_delay(20) <= 60.0
+
+def test_claim_lease_covers_slowest_endpoint(monkeypatch):
+    """Test the lease outlasts sending a full claim to one slow endpoint."""
+    monkeypatch.setattr(settings, "WEBHOOK_CLAIM_LEASE_SECONDS", 60)
+    monkeypatch.setattr(settings, "WEBHOOK_TIMEOUT_SECONDS", 10.0)
+    monkeypatch.setattr(settings, "WEBHOOK_PER_ENDPOINT_CONCURRENCY", 4)
+    monkeypatch.setattr(settings, "WEBHOOK_BATCH_MAX_EVENTS", 1)
+
+    # 200 rows to one URL: 50 rounds of 4 POSTs, each up to 10s
+    assert claim_lease_seconds([200, 3]) == 60 + 500
+    assert claim_lease_seconds([]) == 60
+
+    monkeypatch.setattr(settings, "WEBHOOK_BATCH_MAX_EVENTS", 50)
+    assert claim_lease_seconds([200]) == 60 + 10
+
+@pytest.mark.asyncio
+async def test_routes_answer_from_memory():
+    """Test a loaded routing table serves lookups without querying."""
+    routes = SubscriptionRoutes()
+    routes._routes = {"audit.complete": [1, 2]}
+    routes._complete = True
+    routes._loaded_at = time.monotonic()
+
+    assert await routes.subscribers("audit.complete") == [1, 2]
+    assert await routes.subscribers("extraction.complete") == []
+
+    await routes.invalidate()
+    assert routes._routes == {}
+    assert not routes._complete